@@ -0,0 +1,314 @@
+import numpy as np
+import pandas as pd
+
+from exporter.Normalizer import CarNormalizer, name_keys
+
+_PRIME = (1 << 31) - 1  # MinHash permutations are (a * x + b) mod _PRIME
+
+
+class ListingDeduplicator:
+    """Clusters listings of the same physical car across sources and reposts.
+
+    Each listing becomes a set of tokens: title words, normalized contact
+    number, make / model / year, and mileage and price buckets (two offset
+    buckets each, so nearby values share one). MinHash signatures of those sets
+    are split into `bands`; listings whose band hashes collide are candidates,
+    so the work is linear in the number of listings instead of quadratic.
+    Buckets over `max_bucket` rows are skipped as too generic. Candidates are
+    kept when their signatures agree on at least `threshold` of the slots, make,
+    model and year do not conflict, and the seller, mileage and price say it is
+    the same car; connected components of the kept pairs are the clusters.
+
+    Everything is vectorized with numpy; the cost grows linearly with the listings.
+    """
+
+    MIN_TOKENS = 4  # listings with less to go on stay on their own
+    MILEAGE_BUCKET = 5_000  # km
+    PRICE_BUCKET = 0.05  # relative
+    MILEAGE_TOLERANCE = (1_000, 0.03)  # km, or share of the larger reading
+    PRICE_RATIO = 1.25  # reposts often come back cheaper
+    CLOSE_PRICE_RATIO = 1.05  # price agreement when mileage or the seller cannot tell
+    UNKNOWN_SELLER_MILEAGE = 500  # km; mileage agreement when the seller is unknown
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, threshold: float = 0.5,
+                 max_bucket: int = 200, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.max_bucket = max_bucket
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 1 << 63, num_perm // bands, dtype=np.uint64) | np.uint64(1)
+        self.normalizer = CarNormalizer()
+        self.stats = {}
+
+    def cluster(self, objects) -> np.ndarray:
+        """Cluster label per listing: the position of the cluster's first listing in the input.
+
+        `objects` are Car records, a CarBatch or a raw or normalized frame. Put
+        the listing that should represent its cluster (e.g. the latest) first.
+        """
+        frame = self._features(objects)
+        n = len(frame)
+        signatures, usable = self.signatures(frame)
+        u, v = self.candidate_pairs(signatures, usable)
+        keep = self.verify(frame, signatures, u, v)
+        labels = _components(n, u[keep], v[keep])
+        self.stats = {"listings": n, "fingerprinted": int(usable.sum()), "candidates": len(u),
+                      "matches": int(keep.sum()), "clusters": int((labels == np.arange(n)).sum())}
+        return labels
+
+    @staticmethod
+    def representatives(labels: np.ndarray) -> np.ndarray:
+        """Mask of the one listing kept per cluster."""
+        return labels == np.arange(len(labels))
+
+    @staticmethod
+    def cluster_ids(labels: np.ndarray, ids) -> np.ndarray:
+        """Map labels to stable ids, e.g. the cars.id of each cluster's first row."""
+        return np.asarray(ids)[labels]
+
+    def _features(self, objects) -> pd.DataFrame:
+        raw = CarNormalizer.to_frame(objects)
+        if isinstance(raw, pd.DataFrame) and pd.api.types.is_integer_dtype(raw.get("price", pd.Series(dtype=object))):
+            frame = raw  # already typed
+        else:
+            frame, _ = self.normalizer.normalize(raw)
+        out = pd.DataFrame(index=frame.index)
+        for col in ("make", "model"):
+            out[col] = name_keys(frame[col]) if col in frame else pd.NA
+        out["title"] = frame["title"].astype("string").str.strip().str.lower() if "title" in frame else pd.NA
+        # Last nine digits: drops +94 / leading 0 and separators
+        contact = frame["contact"].astype("string").str.replace(r"\D", "", regex=True) if "contact" in frame else None
+        out["contact"] = contact.str[-9:].mask(contact.str.len() < 7) if contact is not None else pd.NA
+        for col in ("yom", "mileage", "price"):
+            out[col] = frame[col].astype("float64") if col in frame else np.nan
+        return out.reset_index(drop=True)
+
+    def _tokens(self, frame: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """(row, token hash) pairs of every listing's fingerprint."""
+        parts = []
+
+        def add(prefix: str, values: pd.Series):
+            values = values.dropna()
+            if len(values):
+                parts.append((values.index.to_numpy(), prefix + values.astype(str)))
+
+        add("mk:", frame["make"])
+        add("md:", frame["model"])
+        add("y:", frame["yom"].dropna().astype(np.int64))
+        add("c:", frame["contact"])
+        mileage = frame["mileage"].dropna()
+        add("km:", (mileage // self.MILEAGE_BUCKET).astype(np.int64))
+        add("km+:", ((mileage + self.MILEAGE_BUCKET / 2) // self.MILEAGE_BUCKET).astype(np.int64))
+        log_price = np.log(frame["price"].where(frame["price"] > 0).dropna()) / np.log1p(self.PRICE_BUCKET)
+        add("p:", np.floor(log_price).astype(np.int64))
+        add("p+:", np.floor(log_price + 0.5).astype(np.int64))
+        words = frame["title"].dropna().str.findall(r"[a-z0-9]+").explode().dropna()
+        add("t:", words[words.str.len() > 1])
+
+        rows = np.concatenate([r for r, _ in parts]) if parts else np.empty(0, np.int64)
+        hashes = (np.concatenate([pd.util.hash_array(t.to_numpy(dtype=object)) for _, t in parts])
+                  if parts else np.empty(0, np.uint64))
+        order = np.argsort(rows, kind="stable")
+        return rows[order], hashes[order]
+
+    def signatures(self, frame: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """MinHash signature per listing, and the mask of listings with enough tokens to use it."""
+        n = len(frame)
+        rows, hashes = self._tokens(frame)
+        counts = np.bincount(rows, minlength=n)
+        present = np.flatnonzero(counts)
+        starts = np.searchsorted(rows, present)
+        # Permute each distinct token once; listings share most of theirs
+        vocabulary, inverse = np.unique(hashes % np.uint64(_PRIME), return_inverse=True)
+
+        signatures = np.full((n, self.num_perm), _PRIME, dtype=np.uint32)
+        for k in range(self.num_perm):
+            values = ((self._a[k] * vocabulary + self._b[k]) % np.uint64(_PRIME)).astype(np.uint32)[inverse]
+            if len(present):
+                signatures[present, k] = np.minimum.reduceat(values, starts)
+        return signatures, counts >= self.MIN_TOKENS
+
+    def candidate_pairs(self, signatures: np.ndarray, usable: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Distinct (u, v) pairs, u < v, sharing at least one band bucket."""
+        rows = np.flatnonzero(usable)
+        width = self.num_perm // self.bands
+        pairs = []
+        for band in range(self.bands):
+            block = signatures[rows, band * width:(band + 1) * width].astype(np.uint64)
+            keys = (block * self._band_mix).sum(axis=1)  # wraps mod 2**64
+            order = np.argsort(keys, kind="stable")
+            keys, members = keys[order], rows[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            sizes = np.diff(np.r_[starts, len(keys)])
+            ok = (sizes > 1) & (sizes <= self.max_bucket)
+            if not ok.any():
+                continue
+            size = np.repeat(sizes, sizes)
+            head = np.repeat(members[starts], sizes)
+            bucketed = np.repeat(ok, sizes)
+            # Each member pairs with its bucket's head and with its predecessor: linear per bucket,
+            # and enough for the components to join up
+            star = bucketed & (members != head)
+            chain = bucketed[1:] & (keys[1:] == keys[:-1]) & (size[1:] > 2)
+            pairs.append((head[star], members[star]))
+            pairs.append((members[:-1][chain], members[1:][chain]))
+
+        if not pairs:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        u = np.concatenate([p[0] for p in pairs]).astype(np.int64)
+        v = np.concatenate([p[1] for p in pairs]).astype(np.int64)
+        u, v = np.minimum(u, v), np.maximum(u, v)
+        unique = np.unique(u * len(signatures) + v)
+        return unique // len(signatures), unique % len(signatures)
+
+    def verify(self, frame: pd.DataFrame, signatures: np.ndarray, u: np.ndarray, v: np.ndarray,
+               chunk: int = 1_000_000) -> np.ndarray:
+        """Mask of candidate pairs that are the same car."""
+        similar = np.empty(len(u), dtype=bool)
+        for start in range(0, len(u), chunk):
+            su, sv = signatures[u[start:start + chunk]], signatures[v[start:start + chunk]]
+            similar[start:start + chunk] = (su == sv).mean(axis=1) >= self.threshold
+
+        # Integer codes, -1 where unknown, so the comparisons below stay vectorized
+        make, model, yom, contact = (pd.factorize(frame[col])[0] for col in ("make", "model", "yom", "contact"))
+        mileage = frame["mileage"].to_numpy()
+        price = frame["price"].to_numpy()
+
+        def agree(codes):
+            # Equal, or unknown on either side
+            return (codes[u] == codes[v]) | (codes[u] < 0) | (codes[v] < 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            same_car_model = agree(make) & agree(model) & agree(yom)
+            both_mileage = ~np.isnan(mileage[u]) & ~np.isnan(mileage[v])
+            km_gap = np.abs(mileage[u] - mileage[v])
+            km_abs, km_rel = self.MILEAGE_TOLERANCE
+            mileage_ok = km_gap <= np.maximum(km_abs, km_rel * np.fmax(mileage[u], mileage[v]))
+            mileage_close = km_gap <= self.UNKNOWN_SELLER_MILEAGE
+            both_price = ~np.isnan(price[u]) & ~np.isnan(price[v])
+            ratio = np.fmax(price[u], price[v]) / np.fmin(price[u], price[v])
+            price_ok = ~both_price | (ratio <= self.PRICE_RATIO)
+            price_close = both_price & (ratio <= self.CLOSE_PRICE_RATIO)
+        both_contact = (contact[u] >= 0) & (contact[v] >= 0)
+        same_contact = both_contact & (contact[u] == contact[v])
+        # A known seller must match, and then mileage decides (or, without it, the price).
+        # Without a number on both sides, mileage and price must both be nearly equal.
+        identity = np.where(
+            both_contact,
+            same_contact & price_ok & np.where(both_mileage, mileage_ok, price_close),
+            both_mileage & mileage_close & price_close,
+        )
+        return similar & same_car_model & identity
+
+
+def _components(n: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Connected components by root hooking and pointer jumping; each row maps to its smallest member."""
+    labels = np.arange(n)
+    while len(u):
+        ru, rv = labels[u], labels[v]
+        differ = ru != rv
+        if not differ.any():
+            break
+        u, v, ru, rv = u[differ], v[differ], ru[differ], rv[differ]
+        np.minimum.at(labels, np.maximum(ru, rv), np.minimum(ru, rv))
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
+
+
+def _synthetic_listings(cars: int, rng: np.random.Generator) -> tuple[pd.DataFrame, np.ndarray]:
+    """Listings of `cars` distinct cars, a third of them posted again elsewhere; returns (frame, true car per row)."""
+    models = [("Toyota", "Aqua"), ("Toyota", "Vitz"), ("Toyota", "Axio"), ("Honda", "Fit"), ("Honda", "Vezel"),
+              ("Suzuki", "Alto"), ("Suzuki", "Wagon R"), ("Nissan", "Leaf")]
+    pick = rng.integers(0, len(models), cars)
+    yom = rng.integers(2005, 2024, cars)
+    mileage = np.round(rng.uniform(5_000, 200_000, cars), -2)
+    price = np.round(rng.uniform(3e6, 1.5e7, cars), -4)
+    dealers = rng.integers(0, cars // 20 + 1, cars)  # dealers list many cars under one number
+    contact = np.array([f"07{d:08d}" for d in dealers], dtype=object)
+    extras = np.array(["", " G Grade", " 2nd owner", " fresh import", " Hybrid", " Safety"], dtype=object)
+
+    car = np.concatenate([np.arange(cars), rng.choice(cars, cars // 3, replace=False)])
+    repost = np.arange(len(car)) >= cars
+    jitter = np.where(repost, rng.uniform(0.9, 1.0, len(car)), 1.0)  # reposts drop the price a little
+    frame = pd.DataFrame({
+        "title": [f"{models[pick[c]][0]} {models[pick[c]][1]} {yom[c]}{extras[e]}"
+                  for c, e in zip(car, rng.integers(0, len(extras), len(car)))],
+        "make": [models[pick[c]][0] for c in car],
+        "model": [models[pick[c]][1] for c in car],
+        "yom": yom[car],
+        "mileage": (mileage[car] + np.where(repost, rng.integers(0, 500, len(car)), 0)).astype(np.int64),
+        "price": np.round(price[car] * jitter, -3).astype(np.int64),
+        "contact": contact[car],
+    })
+    # Half the reposts give the number in international format
+    international = repost & (rng.random(len(car)) < 0.5)
+    frame.loc[international, "contact"] = "+94 " + frame.loc[international, "contact"].str[1:]
+    return frame, car
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import os
+    import time
+
+    parser = argparse.ArgumentParser(description="Cluster duplicate listings across sources and reposts")
+    parser.add_argument("input_path", nargs="?", help="CSV export or directory of them; writes url,cluster_id")
+    parser.add_argument("--output", default="clusters.csv", help="url -> cluster id mapping for CSV input")
+    parser.add_argument("--db", action="store_true", help="cluster the cars table and store cars.cluster_id")
+    parser.add_argument("--benchmark", type=int, metavar="CARS", help="time and score a synthetic run")
+    args = parser.parse_args()
+
+    dedup = ListingDeduplicator()
+    if args.benchmark:
+        frame, truth = _synthetic_listings(args.benchmark, np.random.default_rng(0))
+        start = time.perf_counter()
+        labels = dedup.cluster(frame)
+        elapsed = time.perf_counter() - start
+        # Pairwise precision / recall against the true car of each row, counted per cluster
+        same_label = pd.Series(labels).groupby(truth).nunique()
+        merged = pd.Series(truth).groupby(labels).nunique()
+        print(f"{len(frame)} listings of {args.benchmark} cars in {elapsed:.2f}s: {dedup.stats}")
+        print(f"cars split over several clusters: {(same_label > 1).mean():.2%}, "
+              f"clusters mixing different cars: {(merged > 1).mean():.2%}")
+    elif args.db:
+        from dotenv import load_dotenv
+
+        from exporter.DbExport import DbExporter
+
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        load_dotenv(os.path.join(project_root, ".env"))
+        db_config = {
+            "host": os.getenv("DB_HOST", "localhost"),
+            "port": int(os.getenv("DB_PORT", "5432")),
+            "database": os.getenv("DB_NAME", "car_analyzer"),
+            "user": os.getenv("DB_USER", "postgres"),
+            "password": os.getenv("DB_PASSWORD", "postgres"),
+            "sslmode": os.getenv("DB_SSLMODE", "require")
+        }
+        with DbExporter(**db_config) as exporter:
+            exporter.create_table()
+            with exporter.connection() as conn:
+                frame = pd.read_sql_query("SELECT id, title, contact, make, model, yom, mileage, price FROM cars "
+                                          "ORDER BY id", conn)
+            labels = dedup.cluster(frame)
+            changed = exporter.assign_clusters(frame["id"].to_numpy(), dedup.cluster_ids(labels, frame["id"]))
+            print(f"{dedup.stats}; {changed} cluster ids updated")
+    elif args.input_path:
+        path = args.input_path
+        csv_files = sorted(glob.glob(os.path.join(path, "*.csv"))) if os.path.isdir(path) else [path]
+        frame = pd.concat([pd.read_csv(f, dtype=str, keep_default_na=False) for f in csv_files], ignore_index=True)
+        labels = dedup.cluster(frame)
+        pd.DataFrame({"url": frame["url"], "cluster_id": labels}).to_csv(args.output, index=False)
+        print(f"{dedup.stats} -> {args.output}")
+    else:
+        parser.print_help()
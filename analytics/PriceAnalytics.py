@@ -0,0 +1,413 @@
+import math
+import pickle
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from exporter.Normalizer import CarNormalizer, name_key, name_keys
+
+
+class GroupIndex:
+    """Maps group key tuples to dense row ids of growable per-group arrays."""
+
+    def __init__(self, key_names: list[str], width: int, dtype=np.int64):
+        self.key_names = key_names
+        self.ids = {}
+        self.keys = []
+        # Capacity doubles as groups appear, so growth is amortized O(1) per group
+        self.data = np.zeros((16, width), dtype=dtype)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rows_for(self, model_codes: np.ndarray, model_keys: list[tuple], extra: np.ndarray = None) -> np.ndarray:
+        """Row id of every input row, registering keys seen for the first time.
+
+        A row's key is model_keys[model_code] (make, model), followed by its
+        `extra` value when given. Codes are combined as integers and factorized,
+        so only the distinct keys of the input are looked up in Python.
+        """
+        if len(model_codes) == 0:
+            return np.empty(0, dtype=np.int64)
+        radix = int(extra.max()) + 1 if extra is not None else 1
+        combined = model_codes * radix + (extra if extra is not None else 0)
+        codes, uniques = pd.factorize(combined)
+        ids = np.empty(len(uniques), dtype=np.int64)
+        for i, value in enumerate(uniques.tolist()):
+            model, rest = divmod(value, radix)
+            key = model_keys[model] + ((rest,) if extra is not None else ())
+            row = self.ids.get(key)
+            if row is None:
+                row = self.ids[key] = len(self.keys)
+                self.keys.append(key)
+            ids[i] = row
+        if len(self.keys) > len(self.data):
+            grown = np.zeros((max(len(self.keys), 2 * len(self.data)), self.data.shape[1]), dtype=self.data.dtype)
+            grown[:len(self.data)] = self.data
+            self.data = grown
+        return ids[codes]
+
+    def key_frame(self, rows: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame([self.keys[r] for r in rows], columns=self.key_names)
+
+    def select(self, make: str = None, model: str = None) -> np.ndarray:
+        """Row ids of groups matching make / model (None matches anything)."""
+        return np.array([row for row, key in enumerate(self.keys)
+                         if (make is None or key[0] == make) and (model is None or key[1] == model)],
+                        dtype=np.int64)
+
+
+class GroupedHistogram(GroupIndex):
+    """Per-group histograms of log10(price) on shared fixed bins.
+
+    Adding rows is a scatter-add of the new rows' (group, bin) pairs, so the cost
+    is proportional to the rows added, not to the history. Quantiles are read
+    from the cumulative counts with linear interpolation inside a bin; with 512
+    bins over 1,000 - 2,000,000,000 a bin spans about 3% of price, which bounds
+    the error. Quantiles are cached per group and only recomputed for groups
+    that received rows since the last read.
+    """
+
+    def __init__(self, key_names: list[str], edges: np.ndarray, quantiles: tuple):
+        super().__init__(key_names, len(edges) - 1)
+        self.edges = edges
+        self.quantiles = np.asarray(quantiles)
+        self._cache = np.full((0, len(quantiles)), np.nan)
+        self._dirty = set()
+
+    def add(self, rows: np.ndarray, log_price: np.ndarray):
+        if len(rows) == 0:
+            return
+        bins = np.clip(np.searchsorted(self.edges, log_price, side="right") - 1, 0, self.data.shape[1] - 1)
+        cells, counts = np.unique(rows * self.data.shape[1] + bins, return_counts=True)
+        self.data.reshape(-1)[cells] += counts
+        self._dirty.update(np.unique(rows).tolist())
+
+    def _refresh(self):
+        if len(self._cache) < len(self.keys):
+            grown = np.full((len(self.keys), len(self.quantiles)), np.nan)
+            grown[:len(self._cache)] = self._cache
+            self._cache = grown
+        if not self._dirty:
+            return
+
+        rows = np.fromiter(self._dirty, dtype=np.int64)
+        self._dirty.clear()
+        counts = self.data[rows]
+        cum = counts.cumsum(axis=1)
+        total = cum[:, -1:]
+        target = self.quantiles[None, :] * total
+        # First bin whose cumulative count reaches the target, then interpolate inside it
+        idx = np.minimum((cum[:, None, :] < target[:, :, None]).sum(axis=2), counts.shape[1] - 1)
+        below = np.take_along_axis(cum, idx, axis=1) - np.take_along_axis(counts, idx, axis=1)
+        in_bin = np.take_along_axis(counts, idx, axis=1)
+        frac = np.clip(np.divide(target - below, in_bin, out=np.zeros_like(target), where=in_bin > 0), 0, 1)
+        width = self.edges[1] - self.edges[0]
+        self._cache[rows] = 10 ** (self.edges[idx] + frac * width)
+
+    def table(self, rows: np.ndarray, labels: list[str]) -> pd.DataFrame:
+        self._refresh()
+        out = self.key_frame(rows)
+        out["listings"] = self.data[rows].sum(axis=1)
+        for label, values in zip(labels, self._cache[rows].T):
+            out[label] = np.round(values).astype("int64")
+        return out
+
+
+class GroupedMoments(GroupIndex):
+    """Per-group running sums for a least-squares fit of y = a + b * x."""
+
+    def __init__(self, key_names: list[str]):
+        super().__init__(key_names, 5, dtype=np.float64)  # n, sx, sxx, sy, sxy
+
+    def add(self, rows: np.ndarray, x: np.ndarray, y: np.ndarray):
+        if len(rows) == 0:
+            return
+        touched, local = np.unique(rows, return_inverse=True)
+        for col, values in enumerate((np.ones_like(x), x, x * x, y, x * y)):
+            self.data[touched, col] += np.bincount(local, weights=values, minlength=len(touched))
+
+    def slopes(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        n, sx, sxx, sy, sxy = self.data[rows].T
+        denom = n * sxx - sx * sx
+        slope = np.divide(n * sxy - sx * sy, denom, out=np.full_like(n, np.nan), where=denom > 0)
+        return n.astype(np.int64), slope
+
+
+class PriceAnalytics:
+    """Incrementally maintained price aggregates over scraped cars.
+
+    Keeps, per make and model:
+      - price percentiles per year of manufacture,
+      - price percentiles per mileage band,
+      - price percentiles per age at listing (listing year - yom), the
+        depreciation curve, plus a log-linear fit of price against age giving an
+        average yearly depreciation rate.
+
+    All aggregates are histograms or running sums keyed by group, so add() costs
+    time proportional to the rows added; nothing is recomputed over the history.
+    The state pickles to a file so a daily run only feeds that day's listings.
+    Each url is counted once, so feeding an export again (or a CSV whose cars
+    the scraper already added) leaves the aggregates as they are. Make and
+    model are compared lower-cased.
+    """
+
+    PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+    PERCENTILE_LABELS = ["p10", "p25", "median", "p75", "p90"]
+    MILEAGE_BANDS = (0, 25_000, 50_000, 100_000, 150_000, 200_000)
+    MAX_AGE = 40
+    PRICE_RANGE = (1_000, 2_000_000_000)
+    BINS = 512
+
+    def __init__(self, today: date = None):
+        self.today = today
+        edges = np.linspace(math.log10(self.PRICE_RANGE[0]), math.log10(self.PRICE_RANGE[1]), self.BINS + 1)
+        self.by_year = GroupedHistogram(["make", "model", "yom"], edges, self.PERCENTILES)
+        self.by_mileage = GroupedHistogram(["make", "model", "mileage_band"], edges, self.PERCENTILES)
+        self.by_age = GroupedHistogram(["make", "model", "age"], edges, self.PERCENTILES)
+        self.trend = GroupedMoments(["make", "model"])
+        self.rows = 0
+        self.last_report = None  # NormalizationReport of the latest add()
+        self.urls = np.empty(0, dtype=np.uint64)  # sorted hashes of the urls counted so far
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault("urls", np.empty(0, dtype=np.uint64))  # saved before urls were tracked
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def mileage_band_labels(cls) -> list[str]:
+        bounds = [f"{b // 1000}k" for b in cls.MILEAGE_BANDS]
+        return [f"{lo}-{hi}" for lo, hi in zip(bounds, bounds[1:])] + [f"{bounds[-1]}+"]
+
+    def add(self, objects) -> int:
+        """Normalize raw cars (CarBatch, list of Car, or frame) and fold them in."""
+        if len(objects) == 0:
+            return 0
+        frame, report = CarNormalizer(self.today).normalize(objects)
+        self.last_report = report
+        return self.add_frame(frame)
+
+    def add_frame(self, frame: pd.DataFrame) -> int:
+        """Fold in an already normalized frame (make, model, yom, price, mileage, date).
+
+        Returns the number of rows used: rows without make, model or price are
+        skipped, and so are rows whose url was counted before.
+        """
+        keep = frame["make"].notna() & frame["model"].notna() & frame["price"].notna()
+        frame = frame.loc[keep]
+        if "url" in frame:
+            frame = frame.loc[self._claim_urls(frame["url"])]
+        frame = frame.loc[:, ["make", "model", "yom", "price", "mileage", "date"]]
+        if frame.empty:
+            return 0
+
+        # (make, model) pairs are factorized once; strings are cleaned per distinct value
+        make_codes, makes = pd.factorize(frame["make"])
+        model_codes, models = pd.factorize(frame["model"])
+        pair_codes, pairs = pd.factorize(make_codes.astype(np.int64) * len(models) + model_codes)
+        makes = name_keys(pd.Series(makes)).tolist()
+        models = name_keys(pd.Series(models)).tolist()
+        model_keys = [(makes[pair // len(models)], models[pair % len(models)]) for pair in pairs.tolist()]
+        pair_codes = pair_codes.astype(np.int64)
+
+        log_price = np.log10(frame["price"].to_numpy(dtype="float64"))
+        yom = frame["yom"].to_numpy(dtype="float64", na_value=np.nan)
+        mileage = frame["mileage"].to_numpy(dtype="float64", na_value=np.nan)
+        listed = pd.to_datetime(frame["date"]).dt.year.to_numpy(dtype="float64", na_value=np.nan)
+        listed = np.where(np.isnan(listed), (self.today or date.today()).year, listed)
+        age = listed - yom
+
+        has_yom = ~np.isnan(yom)
+        has_mileage = ~np.isnan(mileage)
+        has_age = has_yom & (age >= 0) & (age <= self.MAX_AGE)
+
+        with self._lock:
+            self.by_year.add(
+                self.by_year.rows_for(pair_codes[has_yom], model_keys, yom[has_yom].astype(np.int64)),
+                log_price[has_yom])
+            bands = np.searchsorted(self.MILEAGE_BANDS, mileage[has_mileage], side="right") - 1
+            self.by_mileage.add(
+                self.by_mileage.rows_for(pair_codes[has_mileage], model_keys, bands),
+                log_price[has_mileage])
+            self.by_age.add(
+                self.by_age.rows_for(pair_codes[has_age], model_keys, age[has_age].astype(np.int64)),
+                log_price[has_age])
+            self.trend.add(self.trend.rows_for(pair_codes[has_age], model_keys), age[has_age], log_price[has_age])
+            self.rows += len(frame)
+        return len(frame)
+
+    def _claim_urls(self, urls: pd.Series) -> np.ndarray:
+        """Mask of the rows to count, recording their urls; rows without a url always count."""
+        has_url = urls.notna().to_numpy()
+        hashes = pd.util.hash_array(urls[has_url].to_numpy(dtype=object))
+        fresh = ~pd.Series(hashes).duplicated().to_numpy()
+        with self._lock:
+            if len(self.urls):
+                pos = np.minimum(np.searchsorted(self.urls, hashes), len(self.urls) - 1)
+                fresh &= self.urls[pos] != hashes
+            new = np.sort(hashes[fresh])
+            self.urls = np.insert(self.urls, np.searchsorted(self.urls, new), new)
+        mask = np.ones(len(urls), dtype=bool)
+        mask[has_url] = fresh
+        return mask
+
+    def price_percentiles(self, make: str = None, model: str = None) -> pd.DataFrame:
+        """p10 / p25 / median / p75 / p90 price per make, model and yom."""
+        with self._lock:
+            rows = self.by_year.select(self._key(make), self._key(model))
+            out = self.by_year.table(rows, self.PERCENTILE_LABELS)
+        return out.sort_values(["make", "model", "yom"], ignore_index=True)
+
+    def median_by_mileage(self, make: str = None, model: str = None) -> pd.DataFrame:
+        """Median price per make, model and mileage band."""
+        with self._lock:
+            rows = self.by_mileage.select(self._key(make), self._key(model))
+            out = self.by_mileage.table(rows, self.PERCENTILE_LABELS)
+        out = out.sort_values(["make", "model", "mileage_band"], ignore_index=True)
+        out["mileage_band"] = np.asarray(self.mileage_band_labels(), dtype=object)[out["mileage_band"].to_numpy(dtype=np.int64)]
+        return out[["make", "model", "mileage_band", "listings", "median"]]
+
+    def depreciation(self, make: str = None, model: str = None) -> pd.DataFrame:
+        """Median price by age, and the share of the youngest age's median it retains."""
+        with self._lock:
+            rows = self.by_age.select(self._key(make), self._key(model))
+            out = self.by_age.table(rows, self.PERCENTILE_LABELS)
+        out = out.sort_values(["make", "model", "age"], ignore_index=True)[["make", "model", "age", "listings", "median"]]
+        newest = out.groupby(["make", "model"], sort=False)["median"].transform("first")
+        out["retention"] = (out["median"] / newest).round(3)
+        return out
+
+    def depreciation_rates(self, make: str = None, model: str = None) -> pd.DataFrame:
+        """Average yearly depreciation per make and model from the log-price / age fit."""
+        with self._lock:
+            rows = self.trend.select(self._key(make), self._key(model))
+            out = self.trend.key_frame(rows)
+            out["listings"], slope = self.trend.slopes(rows)
+        out["yearly_depreciation"] = np.round(1 - 10 ** slope, 4)
+        return out.sort_values(["make", "model"], ignore_index=True)
+
+    @staticmethod
+    def _key(value):
+        return name_key(value) if value else None
+
+    def save(self, path: str):
+        with self._lock:
+            with open(path, "wb") as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str, today: date = None) -> "PriceAnalytics":
+        """Load saved aggregates, or start empty if the file does not exist yet."""
+        try:
+            with open(path, "rb") as f:
+                analytics = pickle.load(f)
+        except FileNotFoundError:
+            return cls(today)
+        analytics.today = today
+        return analytics
+
+
+def _synthetic_frame(rows: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Normalized-looking frame of plausible listings, for the benchmark."""
+    models = [("toyota", m) for m in ("vitz", "aqua", "axio", "premio", "prius", "corolla")] + \
+             [("honda", m) for m in ("fit", "grace", "vezel", "civic")] + \
+             [("suzuki", m) for m in ("alto", "wagon-r", "swift")] + \
+             [("nissan", m) for m in ("march", "leaf", "x-trail")]
+    pick = rng.integers(0, len(models), rows)
+    yom = rng.integers(1995, 2026, rows)
+    age = 2026 - yom
+    base = rng.uniform(4e6, 2e7, len(models))[pick]
+    price = np.round(base * 0.91 ** age * rng.lognormal(0, 0.15, rows), -3)
+    return pd.DataFrame({
+        "make": np.array([make for make, _ in models], dtype=object)[pick],
+        "model": np.array([model for _, model in models], dtype=object)[pick],
+        "yom": yom,
+        "price": price.astype(np.int64),
+        "mileage": np.round(age * rng.uniform(5_000, 20_000, rows), -3).astype(np.int64),
+        "date": pd.Timestamp("2026-01-17") - pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+    })
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import glob
+    import os
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description="Price percentiles, mileage bands and depreciation curves")
+    parser.add_argument("input_path", nargs="?", help="CSV file or directory of exports to fold into the state")
+    parser.add_argument("--state", default=".price-analytics.pkl", help="saved aggregates to update")
+    parser.add_argument("--make")
+    parser.add_argument("--model")
+    parser.add_argument("--dedup", action="store_true",
+                        help="count each car once, keeping the latest of its listings across files and sources")
+    parser.add_argument("--benchmark", action="store_true", help="time a 10k-row refresh on a 5M-row base")
+    parser.add_argument("--base-rows", type=int, default=5_000_000)
+    parser.add_argument("--new-rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        rng = np.random.default_rng(0)
+        base, new = _synthetic_frame(args.base_rows, rng), _synthetic_frame(args.new_rows, rng)
+        analytics = PriceAnalytics(today=date(2026, 1, 17))
+
+        start = time.perf_counter()
+        analytics.add_frame(base)
+        analytics.price_percentiles()
+        print(f"initial build, {len(base)} rows: {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        analytics.add_frame(new)
+        added = time.perf_counter() - start
+        analytics.price_percentiles()
+        analytics.median_by_mileage()
+        analytics.depreciation()
+        analytics.depreciation_rates()
+        print(f"append {len(new)} rows: {added * 1000:.1f}ms, refreshed tables: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        start = time.perf_counter()
+        combined = pd.concat([base, new], ignore_index=True)
+        combined.groupby(["make", "model", "yom"], observed=True)["price"].quantile(list(PriceAnalytics.PERCENTILES))
+        print(f"full recompute (pandas groupby quantile), {len(combined)} rows: {time.perf_counter() - start:.2f}s")
+        sys.exit(0)
+
+    analytics = PriceAnalytics.load(args.state)
+    if args.input_path:
+        path = args.input_path
+        csv_files = glob.glob(os.path.join(path, "*.csv")) if os.path.isdir(path) else [path]
+        frames = []
+        for csv_file in csv_files:
+            with open(csv_file, "r", encoding="utf-8") as f:
+                frames.append(pd.DataFrame(list(csv.DictReader(f))))
+        if args.dedup:
+            from analytics.ListingDedup import ListingDeduplicator
+
+            # One pass over every file, so duplicates across sources are seen together; latest listing first
+            frame = pd.concat(frames, ignore_index=True)
+            frame = frame.sort_values("date", ascending=False, kind="stable", ignore_index=True)
+            dedup = ListingDeduplicator()
+            frame = frame[dedup.representatives(dedup.cluster(frame))]
+            print(f"dedup: {len(frame)} cars in {dedup.stats['listings']} listings")
+            frames, csv_files = [frame], [path]
+        for csv_file, frame in zip(csv_files, frames):
+            added = analytics.add(frame)
+            print(f"{os.path.basename(csv_file)}: {added} rows added")
+            print(f"  {analytics.last_report}")
+        analytics.save(args.state)
+
+    with pd.option_context("display.max_rows", 200, "display.width", 160):
+        print(analytics.price_percentiles(args.make, args.model))
+        print(analytics.median_by_mileage(args.make, args.model))
+        print(analytics.depreciation(args.make, args.model))
+        print(analytics.depreciation_rates(args.make, args.model))
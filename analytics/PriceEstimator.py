@@ -0,0 +1,258 @@
+import math
+import pickle
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from exporter.Normalizer import CarNormalizer, name_key, name_keys
+
+
+@dataclass
+class PriceEstimate:
+    price: int
+    low: int  # 10th percentile of the comparables, adjusted to the query car
+    high: int  # 90th percentile
+    comparables: int
+    radius: int  # grid rings searched to find them
+
+
+class ModelIndex:
+    """Comparable listings of one make/model on a (yom, mileage band) grid.
+
+    A log-price regression on yom, mileage and engine cc is fitted over the
+    model's listings; every listing is stored as its residual in its grid cell,
+    each cell's residuals sorted and packed into one array. An estimate is the
+    regression value for the query car plus the residual quantiles of the
+    nearest cells, so comparables from a neighbouring year or mileage band are
+    adjusted to the query car instead of pulling the estimate towards their own
+    price.
+    """
+
+    FEATURES = ("yom", "mileage", "engine_cc")
+
+    def __init__(self, frame: pd.DataFrame, mileage_band: int):
+        self.mileage_band = mileage_band
+        self.defaults = {col: float(frame[col].median()) if frame[col].notna().any() else 0.0
+                         for col in self.FEATURES}
+        x = self._design(*(frame[col].to_numpy(dtype="float64", na_value=np.nan) for col in self.FEATURES))
+        y = np.log(frame["price"].to_numpy(dtype="float64"))
+        self.coef = np.linalg.lstsq(x, y, rcond=None)[0]
+        residuals = y - x @ self.coef
+
+        yom = frame["yom"].to_numpy(dtype="float64", na_value=np.nan)
+        yom = np.where(np.isnan(yom), self.defaults["yom"], yom).astype(np.int64)
+        band = self._band(frame["mileage"].to_numpy(dtype="float64", na_value=np.nan))
+        order = np.lexsort((residuals, band, yom))
+        yom, band, self.residuals = yom[order], band[order], residuals[order]
+
+        starts = np.flatnonzero(np.r_[True, (np.diff(yom) != 0) | (np.diff(band) != 0)])
+        stops = np.r_[starts[1:], len(order)]
+        self.cells = {(int(yom[a]), int(band[a])): (int(a), int(b)) for a, b in zip(starts, stops)}
+        self.listings = len(order)
+
+    def _design(self, yom, mileage, engine_cc) -> np.ndarray:
+        columns = [np.ones_like(yom, dtype="float64")]
+        for col, values, scale in (("yom", yom, 1.0), ("mileage", mileage, 1e5), ("engine_cc", engine_cc, 1e3)):
+            values = np.where(np.isnan(values), self.defaults[col], values)
+            columns.append((values - self.defaults[col]) / scale)
+        return np.column_stack(columns)
+
+    def _band(self, mileage):
+        mileage = np.where(np.isnan(mileage), self.defaults["mileage"], mileage)
+        return (mileage // self.mileage_band).astype(np.int64)
+
+    def estimate(self, yom, mileage, engine_cc, min_comparables: int, max_radius: int) -> PriceEstimate:
+        # Plain floats from here on: per-call numpy overhead would dominate a single query
+        yom = self.defaults["yom"] if yom is None else float(yom)
+        mileage = self.defaults["mileage"] if mileage is None else float(mileage)
+        engine_cc = self.defaults["engine_cc"] if engine_cc is None else float(engine_cc)
+        c0, c_yom, c_mileage, c_engine = self.coef.tolist()
+        base = (c0 + c_yom * (yom - self.defaults["yom"])
+                + c_mileage * (mileage - self.defaults["mileage"]) / 1e5
+                + c_engine * (engine_cc - self.defaults["engine_cc"]) / 1e3)
+        y0, b0 = int(round(yom)), int(mileage // self.mileage_band)
+
+        # Grow a diamond of cells around the query cell until enough comparables are found
+        parts, found = [], 0
+        for radius in range(max_radius + 1):
+            for dy in range(-radius, radius + 1):
+                db = radius - abs(dy)
+                for cell in ((y0 + dy, b0 + db), (y0 + dy, b0 - db)) if db else ((y0 + dy, b0),):
+                    span = self.cells.get(cell)
+                    if span:
+                        parts.append(self.residuals[span[0]:span[1]])
+                        found += span[1] - span[0]
+            if found >= min_comparables:
+                break
+
+        if found == 0:
+            residuals = self.residuals
+        elif len(parts) == 1:
+            residuals = parts[0]  # cells are stored sorted
+        else:
+            residuals = np.sort(np.concatenate(parts))
+        low, mid, high = (math.exp(base + self._quantile(residuals, q)) for q in (0.1, 0.5, 0.9))
+        return PriceEstimate(price=int(round(mid, -3)), low=int(round(low, -3)), high=int(round(high, -3)),
+                             comparables=len(residuals), radius=radius)
+
+    @staticmethod
+    def _quantile(ordered: np.ndarray, q: float) -> float:
+        pos = q * (len(ordered) - 1)
+        lo = int(pos)
+        hi = min(lo + 1, len(ordered) - 1)
+        return float(ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo))
+
+
+class PriceEstimator:
+    """Answers "what is this car worth" from precomputed per-model grids.
+
+    build() normalizes listings (CarBatch, list of Car, or a raw frame) and
+    builds one ModelIndex per make/model with enough listings. A query only
+    touches the cells around the query car in its model's grid, so it runs in
+    tens of microseconds regardless of how many listings the index was built
+    from. The index pickles to disk and loads without refitting.
+    """
+
+    MIN_LISTINGS = 10  # per make/model, to fit the regression at all
+    MIN_COMPARABLES = 15
+    MAX_RADIUS = 8
+    MILEAGE_BAND = 20_000
+
+    def __init__(self):
+        self.models: dict[tuple[str, str], ModelIndex] = {}
+        self.last_report = None  # NormalizationReport of the latest build
+
+    def __len__(self):
+        return len(self.models)
+
+    @staticmethod
+    def _key(make: str, model: str) -> tuple[str, str]:
+        return name_key(make), name_key(model)
+
+    def build(self, objects) -> "PriceEstimator":
+        """Rebuild the index from raw listings."""
+        frame, self.last_report = CarNormalizer().normalize(objects)
+        return self.build_frame(frame)
+
+    def build_frame(self, frame: pd.DataFrame) -> "PriceEstimator":
+        """Rebuild the index from a normalized frame (make, model, yom, mileage, engine_cc, price)."""
+        frame = frame[frame["make"].notna() & frame["model"].notna() & frame["price"].notna()]
+        groups = frame.groupby([name_keys(frame["make"]), name_keys(frame["model"])], sort=False)
+        models = {}
+        for key, group in groups:
+            if len(group) >= self.MIN_LISTINGS:
+                models[key] = ModelIndex(group, self.MILEAGE_BAND)
+        self.models = models
+        return self
+
+    def rebuild(self, make: str, model: str, objects):
+        """Refit one make/model from its current raw listings, e.g. after new rows were ingested."""
+        frame, self.last_report = CarNormalizer().normalize(objects)
+        frame = frame[frame["price"].notna()]
+        key = self._key(make, model)
+        if len(frame) >= self.MIN_LISTINGS:
+            self.models[key] = ModelIndex(frame, self.MILEAGE_BAND)
+        else:
+            self.models.pop(key, None)
+
+    def build_from_db(self, exporter) -> "PriceEstimator":
+        """Rebuild the index from the cars table of a DbExporter."""
+        with exporter.connection() as conn:
+            frame = pd.read_sql_query("SELECT make, model, yom, price, mileage, engine, date FROM cars", conn)
+        return self.build(frame)
+
+    def estimate(self, make: str, model: str, yom: int, mileage: int = None,
+                 engine_cc: int = None) -> PriceEstimate | None:
+        """Fair price and 10-90% band for a car, or None for an unknown make/model.
+
+        Missing mileage or engine cc are taken as the model's median.
+        """
+        index = self.models.get(self._key(make, model))
+        if index is None:
+            return None
+        return index.estimate(yom, mileage, engine_cc, self.MIN_COMPARABLES, self.MAX_RADIUS)
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            pickle.dump(self.models, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> "PriceEstimator":
+        estimator = cls()
+        with open(path, "rb") as f:
+            estimator.models = pickle.load(f)
+        return estimator
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import glob
+    import os
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or query the price estimation index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build the index from CSV exports")
+    build.add_argument("input_path", help="CSV file or directory of exports")
+    build.add_argument("--index", default=".price-index.pkl")
+    query = sub.add_parser("query", help="estimate one car")
+    query.add_argument("make")
+    query.add_argument("model")
+    query.add_argument("yom", type=int)
+    query.add_argument("--mileage", type=int)
+    query.add_argument("--engine", type=int, help="engine cc")
+    query.add_argument("--index", default=".price-index.pkl")
+    bench = sub.add_parser("benchmark", help="build from synthetic listings and time queries")
+    bench.add_argument("--rows", type=int, default=1_000_000)
+    bench.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        path = args.input_path
+        csv_files = glob.glob(os.path.join(path, "*.csv")) if os.path.isdir(path) else [path]
+        rows = []
+        for csv_file in csv_files:
+            with open(csv_file, "r", encoding="utf-8") as f:
+                rows.extend(csv.DictReader(f))
+        start = time.perf_counter()
+        estimator = PriceEstimator().build(pd.DataFrame(rows))
+        estimator.save(args.index)
+        print(f"{len(rows)} listings -> {len(estimator)} models in {time.perf_counter() - start:.2f}s -> {args.index}")
+        print(f"  {estimator.last_report}")
+
+    elif args.command == "query":
+        start = time.perf_counter()
+        estimator = PriceEstimator.load(args.index)
+        loaded = time.perf_counter() - start
+        result = estimator.estimate(args.make, args.model, args.yom, args.mileage, args.engine)
+        if result is None:
+            print(f"No listings indexed for {args.make} {args.model}")
+            sys.exit(1)
+        print(f"Rs. {result.price:,} (Rs. {result.low:,} - Rs. {result.high:,}, "
+              f"{result.comparables} comparables; index loaded in {loaded * 1000:.0f}ms)")
+
+    else:
+        from analytics.PriceAnalytics import _synthetic_frame
+
+        rng = np.random.default_rng(0)
+        frame = _synthetic_frame(args.rows, rng)
+        frame["engine_cc"] = rng.choice([660, 1000, 1300, 1500, 1800], args.rows)
+        start = time.perf_counter()
+        estimator = PriceEstimator().build_frame(frame)
+        print(f"build, {args.rows} rows, {len(estimator)} models: {time.perf_counter() - start:.2f}s")
+
+        keys = list(estimator.models)
+        picks = rng.integers(0, len(keys), args.queries)
+        years = rng.integers(1998, 2026, args.queries)
+        mileages = rng.integers(0, 250_000, args.queries)
+        timings = np.empty(args.queries)
+        for i in range(args.queries):
+            make, model = keys[picks[i]]
+            start = time.perf_counter()
+            estimator.estimate(make, model, int(years[i]), int(mileages[i]), 1500)
+            timings[i] = time.perf_counter() - start
+        p50, p99 = np.percentile(timings * 1e6, [50, 99])
+        print(f"{args.queries} queries: p50 {p50:.0f}us, p99 {p99:.0f}us")
@@ -0,0 +1,3 @@
+from .ListingDedup import ListingDeduplicator
+from .PriceAnalytics import PriceAnalytics
+from .PriceEstimator import PriceEstimate, PriceEstimator
@@ -0,0 +1,84 @@
+import argparse
+import http.client
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
+
+import numpy as np
+
+
+def build_paths(models: list[tuple[str, str]], count: int, seed: int = 0) -> list[str]:
+    """A mix of stats, search and estimate requests; popular models are asked for more often."""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(models))]  # Zipf-like popularity
+    paths = []
+    for _ in range(count):
+        make, model = rng.choices(models, weights)[0]
+        kind = rng.random()
+        if kind < 0.4:
+            yom_from = rng.randrange(2005, 2022)
+            params = {"make": make, "model": model, "yom_from": yom_from, "yom_to": yom_from + rng.choice([0, 2, 5])}
+            paths.append(f"/stats?{urlencode(params)}")
+        elif kind < 0.7:
+            params = {"make": make, "model": model, "order": rng.choice(["price", "date"]), "limit": 20}
+            paths.append(f"/listings?{urlencode(params)}")
+        else:
+            params = {"make": make, "model": model, "yom": rng.randrange(2005, 2024),
+                      "mileage": rng.randrange(0, 200_000, 10_000)}
+            paths.append(f"/estimate?{urlencode(params)}")
+    return paths
+
+
+def run(base_url: str, paths: list[str], concurrency: int) -> dict:
+    """Send `paths` over `concurrency` keep-alive connections; returns latencies and cache outcomes."""
+    url = urlparse(base_url)
+    local = threading.local()
+    latencies = np.empty(len(paths))
+    outcomes = [None] * len(paths)
+
+    def fetch(i):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        start = time.perf_counter()
+        conn.request("GET", paths[i])
+        resp = conn.getresponse()
+        resp.read()
+        latencies[i] = time.perf_counter() - start
+        outcomes[i] = resp.status if resp.status != 200 else resp.getheader("X-Cache", "-")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fetch, range(len(paths))))
+    elapsed = time.perf_counter() - start
+    return {"latencies": latencies, "outcomes": outcomes, "elapsed": elapsed}
+
+
+def report(label: str, result: dict):
+    ms = result["latencies"] * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    outcomes = result["outcomes"]
+    hits = sum(1 for o in outcomes if o == "hit")
+    errors = sum(1 for o in outcomes if isinstance(o, int))
+    print(f"{label}: {len(ms)} requests in {result['elapsed']:.2f}s ({len(ms) / result['elapsed']:,.0f} req/s), "
+          f"p50 {p50:.2f}ms, p90 {p90:.2f}ms, p99 {p99:.2f}ms, max {ms.max():.2f}ms, "
+          f"cache hits {hits / len(ms):.0%}, errors {errors}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test for the price API: reports p50 / p99 latency")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--models", default="toyota/aqua,toyota/vitz,toyota/axio,honda/fit,honda/vezel,"
+                                            "suzuki/alto,suzuki/wagon-r,nissan/leaf,toyota/prius,honda/grace",
+                        help="comma-separated make/model pairs to query")
+    args = parser.parse_args()
+
+    models = [tuple(pair.split("/", 1)) for pair in args.models.split(",")]
+    paths = build_paths(models, args.requests)
+    # The first pass fills the cache; the second one replays the same mix against it
+    report("cold", run(args.url, paths, args.concurrency))
+    report("warm", run(args.url, paths, args.concurrency))
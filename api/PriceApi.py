@@ -0,0 +1,358 @@
+import json
+import select
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import psycopg2
+
+from analytics.PriceEstimator import PriceEstimator
+from exporter import IngestEvents
+from exporter.DbExport import DbExporter
+from exporter.Normalizer import name_key
+
+
+class PartitionCache:
+    """LRU cache of API responses, invalidated per (make, model) partition.
+
+    Every entry belongs to one partition; a make-wide query uses (make, "").
+    Writes of new rows for (make, model) drop that partition's entries and the
+    make-wide ones. Each partition has a generation number that an invalidation
+    bumps: a response computed while an ingest was committing carries the old
+    generation and is not stored, so a pre-ingest result cannot be cached after
+    the invalidation that should have removed it.
+    """
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (partition, value)
+        self._by_partition = defaultdict(set)
+        self._generation = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """(True, value) on a hit, (False, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def generation(self, partition) -> int:
+        with self._lock:
+            return self._generation[partition]
+
+    def put(self, partition, key, value, generation: int):
+        with self._lock:
+            if self._generation[partition] != generation:
+                return  # invalidated while the value was being computed
+            self._entries[key] = (partition, value)
+            self._entries.move_to_end(key)
+            self._by_partition[partition].add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, (old_partition, _) = self._entries.popitem(last=False)
+                self._by_partition[old_partition].discard(old_key)
+
+    def invalidate(self, partitions):
+        with self._lock:
+            for make, model in partitions:
+                for partition in {(make, model), (make, "")}:
+                    self._generation[partition] += 1
+                    for key in self._by_partition.pop(partition, ()):
+                        self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop everything, e.g. after missing notifications while disconnected."""
+        with self._lock:
+            for partition in list(self._generation):
+                self._generation[partition] += 1
+            self._entries.clear()
+            self._by_partition.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                    "invalidations": self.invalidations}
+
+
+class PriceApi:
+    """Price statistics, listing search and estimates over the cars table.
+
+    Responses are cached in a PartitionCache. It is invalidated in-process
+    through IngestEvents (DbExporter, CsvExporter and StreamingCsvExporter
+    publish the partitions they write) and, for writers in other processes,
+    through the Postgres NOTIFY that save_to_db / bulk_load send on commit.
+    Estimates come from a PriceEstimator; a make/model that received rows is
+    refitted from the table on its next estimate.
+    """
+
+    MAX_LIMIT = 200
+
+    def __init__(self, exporter: DbExporter, estimator: PriceEstimator = None, cache_size: int = 10_000):
+        self.exporter = exporter
+        self.estimator = estimator or PriceEstimator()
+        self.cache = PartitionCache(cache_size)
+        self._stale_models = set()
+        self._estimator_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._listener = None
+        self.routes = {
+            "/stats": self.stats,
+            "/weekly": self.weekly,
+            "/listings": self.listings,
+            "/estimate": self.estimate,
+        }
+
+    def invalidate(self, partitions):
+        with self._estimator_lock:
+            self._stale_models.update(partitions)
+        self.cache.invalidate(partitions)
+
+    def start(self):
+        """Start receiving ingest notifications (in-process and from Postgres)."""
+        IngestEvents.subscribe(self.invalidate)
+        self._listener = threading.Thread(target=self._listen, name="ingest-listener", daemon=True)
+        self._listener.start()
+
+    def stop(self):
+        IngestEvents.unsubscribe(self.invalidate)
+        self._stop.set()
+
+    def _listen(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**self.exporter.connection_params)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {IngestEvents.CHANNEL}")
+                # Notifications sent while we were not listening are lost
+                self.cache.clear()
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    partitions = set()
+                    while conn.notifies:
+                        partitions.add(IngestEvents.parse_payload(conn.notifies.pop(0).payload))
+                    self.invalidate(partitions)
+            except psycopg2.Error as e:
+                print(f"Ingest listener disconnected ({e}), retrying in 5s")
+                self._stop.wait(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def handle(self, path: str, params: dict) -> tuple[bytes, bool]:
+        """Serve one request from the cache or the handler; returns (JSON body, cache hit).
+
+        The encoded body is cached, so a hit does no work besides the lookup.
+        """
+        handler = self.routes.get(path)
+        if handler is None:
+            raise LookupError(path)
+        make = params.get("make", "")
+        if not make:
+            raise ValueError("make is required")
+        partition = IngestEvents.partition_key(make, params.get("model"))
+
+        key = (path, tuple(sorted(params.items())))
+        hit, body = self.cache.get(key)
+        if hit:
+            return body, True
+        generation = self.cache.generation(partition)
+        body = json.dumps(handler(partition, params), default=str).encode("utf-8")
+        self.cache.put(partition, key, body, generation)
+        return body, False
+
+    @staticmethod
+    def _filters(partition, params) -> tuple[str, list]:
+        make, model = partition
+        clauses, args = ["make_key = %s"], [make]
+        if model:
+            clauses.append("model_key = %s")
+            args.append(model)
+        if "yom_from" in params:
+            clauses.append("yom >= %s")
+            args.append(int(params["yom_from"]))
+        if "yom_to" in params:
+            clauses.append("yom <= %s")
+            args.append(int(params["yom_to"]))
+        if "days" in params:
+            clauses.append("listed_on >= %s")
+            args.append(date.today() - timedelta(days=int(params["days"])))
+        return " AND ".join(clauses), args
+
+    def _query(self, sql: str, args: list) -> list[tuple]:
+        with self.exporter.connection() as conn:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(sql, args)
+                    return cur.fetchall()
+            finally:
+                conn.rollback()  # read-only; do not leave the pooled connection in a transaction
+
+    def stats(self, partition, params) -> dict:
+        where, args = self._filters(partition, params)
+        rows = self._query(f"""
+            SELECT yom, count(*),
+                   percentile_cont(ARRAY[0.1, 0.25, 0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY price),
+                   round(avg(mileage))
+            FROM cars WHERE {where} AND price IS NOT NULL
+            GROUP BY yom ORDER BY yom
+        """, args)
+        return {"make": partition[0], "model": partition[1] or None, "years": [
+            {"yom": yom, "listings": count, "p10": round(p[0]), "p25": round(p[1]), "median": round(p[2]),
+             "p75": round(p[3]), "p90": round(p[4]), "avg_mileage": int(mileage) if mileage is not None else None}
+            for yom, count, p, mileage in rows
+        ]}
+
+    def weekly(self, partition, params) -> dict:
+        """Listings and average price per week, from the car_price_weekly summary table."""
+        make, model = partition
+        where, args = self._filters(partition, {k: v for k, v in params.items() if k != "days"})
+        where += " AND week >= %s"
+        args.append(date.today() - timedelta(weeks=int(params.get("weeks", 12))))
+        rows = self._query(f"""
+            SELECT week, sum(listings), sum(priced), sum(price_sum), min(price_min), max(price_max)
+            FROM car_price_weekly WHERE {where}
+            GROUP BY week ORDER BY week
+        """, args)
+        return {"make": make, "model": model or None, "weeks": [
+            {"week": week, "listings": listings, "avg_price": round(price_sum / priced) if priced else None,
+             "min_price": price_min, "max_price": price_max}
+            for week, listings, priced, price_sum, price_min, price_max in rows
+        ]}
+
+    def listings(self, partition, params) -> dict:
+        where, args = self._filters(partition, params)
+        where += " AND removed_at IS NULL"  # sold or withdrawn ads stay in the stats only
+        if "price_max" in params:
+            where += " AND price <= %s"
+            args.append(int(params["price_max"]))
+        order = {"price": "price ASC NULLS LAST", "date": "listed_on DESC NULLS LAST"}[params.get("order", "date")]
+        limit = min(int(params.get("limit", 50)), self.MAX_LIMIT)
+        columns = ["title", "make", "model", "yom", "price", "mileage", "location", "gear", "url", "date", "engine"]
+        rows = self._query(f"SELECT {', '.join(columns)} FROM cars WHERE {where} ORDER BY {order} LIMIT %s",
+                           args + [limit])
+        return {"count": len(rows), "listings": [dict(zip(columns, row)) for row in rows]}
+
+    def estimate(self, partition, params) -> dict:
+        make, model = partition
+        if not model or "yom" not in params:
+            raise ValueError("make, model and yom are required")
+        with self._estimator_lock:
+            if partition in self._stale_models:
+                self._stale_models.discard(partition)
+                rows = self._query("SELECT make, model, yom, price, mileage, engine, date FROM cars "
+                                   "WHERE make_key = %s AND model_key = %s", [make, model])
+                frame = pd.DataFrame(rows, columns=["make", "model", "yom", "price", "mileage", "engine", "date"])
+                self.estimator.rebuild(make, model, frame)
+        result = self.estimator.estimate(
+            make, model, int(params["yom"]),
+            int(params["mileage"]) if "mileage" in params else None,
+            int(params["engine"]) if "engine" in params else None,
+        )
+        if result is None:
+            return {"make": make, "model": model, "estimate": None}
+        return {"make": make, "model": model, "estimate": result.price, "low": result.low,
+                "high": result.high, "comparables": result.comparables}
+
+
+class PriceApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so load tests measure the API and not TCP setup
+    disable_nagle_algorithm = True  # headers and body are separate writes; avoid the delayed-ACK stall
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: name_key(v[-1]) if k in ("make", "model") else v[-1]
+                  for k, v in parse_qs(url.query).items()}
+        api: PriceApi = self.server.api
+        cache, body = "-", None
+        try:
+            if url.path == "/health":
+                status, body = 200, {"status": "ok", "cache": api.cache.stats()}
+            else:
+                payload, hit = api.handle(url.path, params)
+                status, cache = 200, "hit" if hit else "miss"
+        except LookupError:
+            status, body = 404, {"error": f"unknown path {url.path}"}
+        except (ValueError, KeyError) as e:
+            status, body = 400, {"error": str(e)}
+        except Exception as e:
+            status, body = 500, {"error": str(e)}
+
+        if body is not None:
+            payload = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("X-Cache", cache)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate the latency of cache hits
+
+
+def serve(api: PriceApi, host: str = "127.0.0.1", port: int = 8080):
+    server = ThreadingHTTPServer((host, port), PriceApiHandler)
+    server.daemon_threads = True
+    server.api = api
+    api.start()
+    print(f"Serving price API on http://{host}:{port} (/stats, /weekly, /listings, /estimate, /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    from dotenv import load_dotenv
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    load_dotenv(os.path.join(project_root, ".env"))
+
+    parser = argparse.ArgumentParser(description="Local HTTP API for price stats, listing search and estimates")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--index", help="saved PriceEstimator index (default: build from the cars table)")
+    parser.add_argument("--cache-size", type=int, default=10_000, help="cached responses kept in memory")
+    parser.add_argument("--pool-size", type=int, default=8, help="database connections for cache misses")
+    args = parser.parse_args()
+
+    db_config = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+        "database": os.getenv("DB_NAME", "car_analyzer"),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("DB_PASSWORD", "postgres"),
+        "sslmode": os.getenv("DB_SSLMODE", "require")
+    }
+    exporter = DbExporter(**db_config, pool_size=args.pool_size)
+
+    start = time.perf_counter()
+    estimator = PriceEstimator.load(args.index) if args.index else PriceEstimator().build_from_db(exporter)
+    print(f"Estimator ready: {len(estimator)} models in {time.perf_counter() - start:.2f}s")
+
+    serve(PriceApi(exporter, estimator, cache_size=args.cache_size), args.host, args.port)
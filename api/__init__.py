@@ -0,0 +1 @@
+from .PriceApi import PartitionCache, PriceApi
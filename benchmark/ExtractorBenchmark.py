@@ -0,0 +1,170 @@
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmark.ReplayServer import ReplayConfig, ReplayServer
+
+SOURCES = ("riyasewana", "ikman")
+
+
+def run_extractor(source: str, site_url: str, model: str = "aqua", concurrency: int = 4, parse_workers: int = 2,
+                  queue_size: int = 32, rpm: float = 60_000) -> dict:
+    """Scrape one model from the replay site into a scratch directory and measure the run.
+
+    Meant to run in a fresh process, so CPU time and peak RSS are this
+    extractor's alone and not the replay server's or an earlier run's.
+    """
+    from extractor.IkmanExtractor import IkmanExtractor
+    from extractor.Metrics import Metrics
+    from extractor.RateLimiter import AdaptiveRateLimiter
+    from extractor.RiyasewanaExtractor import RiyasewanaExtractor
+
+    metrics = Metrics()
+    options = dict(concurrency=concurrency, parse_workers=parse_workers, queue_size=queue_size, metrics=metrics,
+                   rate_limiter=AdaptiveRateLimiter(requests_per_minute=rpm, max_rpm=rpm))
+    if source == "riyasewana":
+        extractor = RiyasewanaExtractor(**options)
+        extractor.base_url = f"{site_url}/search"
+        extract = lambda: extractor.extract_data(vehicle_type="cars", make="toyota", model=model)
+    elif source == "ikman":
+        extractor = IkmanExtractor(**options)
+        extractor.base_url = site_url
+        extract = lambda: extractor.extract_data(model=model)
+    else:
+        raise ValueError(f"Unknown source {source!r}, expected one of {SOURCES}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        cpu, wall = time.process_time(), time.perf_counter()
+        extract()
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+
+    listing_pages = metrics.counter("pages", source=source)
+    fetched = metrics.histogram("stage", stage="fetch", source=source)
+    export = metrics.histogram("stage", stage="export", source=source)
+    pages = listing_pages + (fetched.count if fetched else 0)
+    listings = metrics.counter("cars_exported", source=source)
+    return {
+        "listings": listings,
+        "pages": pages,
+        "listing_pages": listing_pages,
+        "retries": metrics.counter("retries", source=source),
+        "wall_s": round(wall, 3),
+        "pages_per_s": round(pages / wall, 2),
+        "listings_per_s": round(listings / wall, 2),
+        "cpu_s": round(cpu, 3),
+        "cpu_ms_per_listing": round(cpu * 1000 / listings, 3) if listings else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # KiB on Linux
+        "export_s": round(export.sum, 4) if export else 0.0,
+    }
+
+
+def _serve(config: ReplayConfig, ready):
+    server = ReplayServer(config)
+    ready.put(server.url)
+    server.serve_forever()
+
+
+def run_suite(config: ReplayConfig, sources=SOURCES, repeat: int = 1, **options) -> dict:
+    """Benchmark each source against a replay server in its own process; metrics are medians over `repeat` runs."""
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(target=_serve, args=(config, ready), name="replay-server", daemon=True)
+    server.start()
+    try:
+        site_url = ready.get(timeout=30)
+        results = {}
+        for source in sources:
+            runs = []
+            for _ in range(repeat):
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    runs.append(pool.submit(run_extractor, source, site_url, **options).result())
+            results[source] = {key: statistics.median(run[key] for run in runs)
+                               if all(run[key] is not None for run in runs) else None for key in runs[0]}
+        with urllib.request.urlopen(f"{site_url}/_replay/stats") as resp:
+            served = json.load(resp)
+    finally:
+        server.terminate()
+        server.join()
+
+    return {
+        "commit": _commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "replay": served.pop("config"),
+        "served": served,
+        "options": {**options, "repeat": repeat},
+        "results": results,
+    }
+
+
+def _commit() -> str | None:
+    """Current commit, marked dirty when the tree has uncommitted changes."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def print_results(report: dict, baseline: dict = None):
+    print(f"commit {report['commit']}, replay {report['replay']}")
+    for source, metrics in report["results"].items():
+        print(f"\n{source}")
+        before = (baseline or {}).get("results", {}).get(source, {})
+        for name, value in metrics.items():
+            line = f"  {name:<20} {value if value is not None else '-':>12}"
+            old = before.get(name)
+            if isinstance(old, (int, float)) and isinstance(value, (int, float)) and old:
+                line += f"   was {old:>12}  ({(value - old) / old:+.1%})"
+            print(line)
+
+
+if __name__ == "__main__":
+    import argparse
+    import logging
+
+    parser = argparse.ArgumentParser(description="Time the extractors end to end against a local replay of the sites")
+    parser.add_argument("--sources", default=",".join(SOURCES), help="comma-separated sources to run")
+    parser.add_argument("--model", default="aqua", help="model searched on every source")
+    parser.add_argument("--pages", type=int, default=5, help="search result pages per model")
+    parser.add_argument("--items-per-page", type=int, default=25,
+                        help="riyasewana listings per page; ikman pages always hold 25")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.02, help="+/- seconds of random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After of an injected 429")
+    parser.add_argument("--concurrency", type=int, default=4, help="detail pages fetched in parallel")
+    parser.add_argument("--parse-workers", type=int, default=2, help="detail pages parsed in parallel")
+    parser.add_argument("--queue-size", type=int, default=32, help="items buffered between pipeline stages")
+    parser.add_argument("--rpm", type=float, default=60_000, help="rate limit; the default leaves it out of the way")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per source; the median is reported")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="earlier results JSON to print the change against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s %(levelname)s %(message)s")
+    config = ReplayConfig(pages=args.pages, items_per_page=args.items_per_page, latency=args.latency,
+                          jitter=args.jitter, error_rate=args.error_rate, retry_after=args.retry_after)
+    report = run_suite(config, sources=args.sources.split(","), repeat=args.repeat, model=args.model,
+                       concurrency=args.concurrency, parse_workers=args.parse_workers,
+                       queue_size=args.queue_size, rpm=args.rpm)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(report, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nResults -> {args.output}")
@@ -0,0 +1,275 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ITEM = re.compile(r"<!-- item -->\n(.*?)<!-- /item -->\n", re.DOTALL)
+
+LOCATIONS = ["Colombo", "Gampaha", "Kandy", "Galle", "Kurunegala", "Negombo", "Matara", "Nugegoda"]
+# IkmanExtractor derives the page count from the ad total at ikman's fixed 25 ads a page
+IKMAN_ITEMS_PER_PAGE = 25
+GEARS = ["Automatic", "Manual", "Tiptronic"]
+FUELS = ["Petrol", "Hybrid", "Diesel"]
+
+
+@dataclass
+class ReplayConfig:
+    pages: int = 5  # search result pages per model
+    items_per_page: int = 25  # riyasewana only; ikman pages always hold IKMAN_ITEMS_PER_PAGE
+    latency: float = 0.05  # seconds added to every response
+    jitter: float = 0.02  # latency varies uniformly by up to this much either way
+    error_rate: float = 0.0  # share of requests answered 429
+    retry_after: float = 0.5  # seconds, sent with an injected 429
+    seed: int = 0
+
+
+class ReplaySite:
+    """Renders riyasewana and ikman pages from the fixture templates.
+
+    Listing fixtures mark one item with <!-- item --> comments; it is repeated
+    `items_per_page` times (IKMAN_ITEMS_PER_PAGE on ikman). Every ad has a
+    stable id, and its values are drawn from a generator seeded with it, so the
+    same URL always serves the same page.
+    """
+
+    def __init__(self, config: ReplayConfig, base_url: str):
+        self.config = config
+        self.base_url = base_url
+        self.templates = {}
+        for name in ("riyasewana-listing", "riyasewana-detail", "ikman-listing", "ikman-detail"):
+            with open(os.path.join(FIXTURES, f"{name}.html"), "r", encoding="utf-8") as f:
+                markup = f.read()
+            item = ITEM.search(markup)
+            if item:
+                self.templates[name] = Template(markup[:item.start()] + "$items" + markup[item.end():])
+                self.templates[f"{name}-item"] = Template(item.group(1))
+            else:
+                self.templates[name] = Template(markup)
+
+    def render(self, path: str, query: dict) -> str | None:
+        """Page for a request path, or None if the site has no such page."""
+        page = int(query.get("page", ["1"])[-1])
+        parts = path.strip("/").split("/")
+        if len(parts) == 4 and parts[0] == "search":
+            return self.riyasewana_listing(*parts[1:], page)
+        if len(parts) == 2 and parts[0] == "buy":
+            return self.riyasewana_detail(parts[1])
+        if path == "/en/ads/sri-lanka/cars":
+            return self.ikman_listing(query.get("query", [""])[-1], page)
+        if len(parts) == 3 and parts[:2] == ["en", "ad"]:
+            return self.ikman_detail(parts[2])
+        return None
+
+    def _ad(self, model: str, page: int, index: int) -> dict:
+        """Values of one ad; the id encodes where it is listed, so its detail page can be rebuilt."""
+        ad_id = zlib.crc32(model.encode("utf-8")) % 10_000 * 1_000_000 + page * 1_000 + index
+        rng = random.Random(self.config.seed * 1_000_003 + ad_id)
+        yom = rng.randint(2005, 2024)
+        return {
+            "id": ad_id,
+            "yom": yom,
+            "price": f"{rng.randrange(3_000_000, 25_000_000, 10_000):,}",
+            "mileage": f"{rng.randrange(1_000, 220_000, 100):,}",
+            "location": rng.choice(LOCATIONS),
+            "gear": rng.choice(GEARS),
+            "fuel": rng.choice(FUELS),
+            "engine": rng.choice([660, 998, 1000, 1300, 1500, 1800, 2000]),
+            "contact": f"07{rng.randrange(10_000_000, 99_999_999)}",
+            "seller": rng.choice(["Nimal", "Kamal", "Sunil", "Auto Traders", "Lanka Motors"]),
+            "age_days": (page - 1) * 2 + index // 10,
+        }
+
+    def _pages(self) -> range:
+        return range(1, self.config.pages + 1)
+
+    def riyasewana_listing(self, vehicle_type: str, make: str, model: str, page: int) -> str | None:
+        if page not in self._pages():
+            return None
+        title = f"{make.title()} {model.replace('-', ' ').title()}"
+        search = f"{self.base_url}/search/{vehicle_type}/{make}/{model}"
+        items = []
+        for index in range(self.config.items_per_page):
+            ad = self._ad(model, page, index)
+            items.append(self.templates["riyasewana-listing-item"].substitute(
+                ad, item_title=f"{title} {ad['yom']}", url=f"{self.base_url}/buy/{make}-{model}-sale-{ad['id']}",
+                date=(date.today() - timedelta(days=ad["age_days"])).isoformat(),
+            ))
+        links = [f'<a href="{search}?page={n}">{n}</a>' for n in self._pages() if n != page]
+        if page < self.config.pages:
+            links.append(f'<a href="{search}?page={page + 1}">Next</a>')
+        return self.templates["riyasewana-listing"].substitute(
+            title=title, page_url=f"{search}?page={page}", items="".join(items), pagination=" ".join(links),
+        )
+
+    def riyasewana_detail(self, slug: str) -> str | None:
+        match = re.fullmatch(r"([a-z0-9]+)-([a-z0-9-]+)-sale-(\d+)", slug)
+        if not match:
+            return None
+        make, model, ad_id = match.group(1), match.group(2), int(match.group(3))
+        ad = self._ad(model, ad_id // 1_000 % 1_000, ad_id % 1_000)
+        return self.templates["riyasewana-detail"].substitute(
+            ad, title=f"{make.title()} {model.replace('-', ' ').title()} {ad['yom']}", make=make.title(),
+            model=model.replace("-", " ").title(), url=f"{self.base_url}/buy/{slug}",
+            date=(date.today() - timedelta(days=ad["age_days"])).isoformat(),
+        )
+
+    def ikman_listing(self, model: str, page: int) -> str | None:
+        if page not in self._pages():
+            return None
+        per_page = IKMAN_ITEMS_PER_PAGE
+        items = []
+        for index in range(per_page):
+            ad = self._ad(model, page, index)
+            items.append(self.templates["ikman-listing-item"].substitute(
+                ad, item_title=f"Toyota {model.title()} {ad['yom']}", path=f"/en/ad/{model}-for-sale-{ad['id']}",
+                age=f"{ad['age_days']} days",
+            ))
+        search = f"{self.base_url}/en/ads/sri-lanka/cars?query={model}"
+        links = [f'<a href="{search}&page={n}">{n}</a>' for n in self._pages() if n != page]
+        return self.templates["ikman-listing"].substitute(
+            query=model, page=page, page_url=f"{search}&page={page}", items="".join(items),
+            first=(page - 1) * per_page + 1, last=page * per_page, total=self.config.pages * per_page,
+            pagination=" ".join(links),
+        )
+
+    def ikman_detail(self, slug: str) -> str | None:
+        match = re.fullmatch(r"([a-z0-9-]+)-for-sale-(\d+)", slug)
+        if not match:
+            return None
+        model, ad_id = match.group(1), int(match.group(2))
+        ad = self._ad(model, ad_id // 1_000 % 1_000, ad_id % 1_000)
+        posted = date.today() - timedelta(days=ad["age_days"])
+        return self.templates["ikman-detail"].substitute(
+            ad, title=f"Toyota {model.title()} {ad['yom']} for sale", make="Toyota", model=model.title(),
+            url=f"{self.base_url}/en/ad/{slug}", posted=f"{posted.day} {posted.strftime('%b')}",
+        )
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real sites
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server: ReplayServer = self.server.replay
+        url = urlparse(self.path)
+        if url.path == "/_replay/stats":
+            self._send(200, json.dumps(server.stats()), "application/json")
+            return
+
+        server.count("requests")
+        config = server.config
+        delay = config.latency + server.rng.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if config.error_rate and server.rng.random() < config.error_rate:
+            server.count("throttled")
+            self._send(429, "Too Many Requests", "text/plain", {"Retry-After": f"{config.retry_after:g}"})
+            return
+        body = server.site.render(url.path, parse_qs(url.query))
+        if body is None:
+            server.count("not_found")
+            self._send(404, "Not Found", "text/plain")
+        else:
+            server.count("pages")
+            self._send(200, body, "text/html; charset=utf-8")
+
+    def _send(self, status: int, body: str, content_type: str, headers: dict = None):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer:
+    """Local stand-in for riyasewana and ikman serving the fixture pages.
+
+    Responses are delayed by `latency` +/- `jitter`, and a share `error_rate`
+    of requests is answered 429 with a Retry-After, so extractors can be timed
+    end to end without touching the real sites. Point an extractor's base_url
+    at `url` (riyasewana: url + "/search").
+    """
+
+    def __init__(self, config: ReplayConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or ReplayConfig()
+        self.rng = random.Random(self.config.seed)  # latency and error injection
+        self._httpd = ThreadingHTTPServer((host, port), ReplayHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.replay = self
+        self.url = f"http://{host}:{self._httpd.server_address[1]}"
+        self.site = ReplaySite(self.config, self.url)
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def count(self, name: str):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"config": asdict(self.config), **self._counts}
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def start(self) -> "ReplayServer":
+        """Serve from a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self.close()
+
+    def close(self):
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the riyasewana / ikman fixture pages locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--pages", type=int, default=5, help="search result pages per model")
+    parser.add_argument("--items-per-page", type=int, default=25,
+                        help="riyasewana listings per page; ikman pages always hold 25")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.02, help="+/- seconds of random latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After of an injected 429")
+    args = parser.parse_args()
+
+    config = ReplayConfig(pages=args.pages, items_per_page=args.items_per_page, latency=args.latency,
+                          jitter=args.jitter, error_rate=args.error_rate, retry_after=args.retry_after)
+    server = ReplayServer(config, args.host, args.port)
+    print(f"Replaying on {server.url} (riyasewana: /search/cars/toyota/aqua, ikman: /en/ads/sri-lanka/cars?query=aqua)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
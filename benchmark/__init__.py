@@ -0,0 +1 @@
+from .ReplayServer import ReplayConfig, ReplayServer
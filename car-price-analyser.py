@@ -1,7 +1,61 @@
+import argparse
+import logging
+
+from analytics.PriceAnalytics import PriceAnalytics
+from exporter.ParquetExport import ParquetExporter
+from extractor.CrawlBudget import CrawlBudget
+from extractor.CrawlHistory import CrawlHistory
+from extractor.CrawlJournal import CrawlJournal
+from extractor.EnrichmentQueue import EnrichmentQueue
 from extractor.IkmanExtractor import IkmanExtractor
+from extractor.Metrics import Metrics
+from extractor.RateLimiter import AdaptiveRateLimiter
+from extractor.ResponseCache import ResponseCache
 from extractor.RiyasewanaExtractor import RiyasewanaExtractor
+from extractor.SessionPool import SessionPool
+from extractor.SweepRunner import SweepRunner
+from extractor.UrlIndex import UrlIndex
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape car listings for the popular vehicle plan")
+    parser.add_argument("--workers", type=int, default=4, help="(type, make, model) jobs run in parallel")
+    parser.add_argument("--concurrency", type=int, default=4, help="detail pages fetched in parallel per job")
+    parser.add_argument("--parse-workers", type=int, default=2, help="detail pages parsed in parallel per job")
+    parser.add_argument("--queue-size", type=int, default=32, help="items buffered between pipeline stages")
+    parser.add_argument("--rpm", type=float, default=60, help="starting request rate per source, in requests per minute")
+    parser.add_argument("--max-rpm", type=float, default=600, help="ceiling for the adaptive request rate")
+    parser.add_argument("--retries", type=int, default=2, help="retries for a failed job")
+    parser.add_argument("--cache", default=".http-cache.sqlite", help="on-disk HTTP response cache")
+    parser.add_argument("--no-cache", action="store_true", help="always go to the network")
+    parser.add_argument("--sessions", type=int, help="scraper sessions shared by all jobs (default: --workers)")
+    parser.add_argument("--connections-per-host", type=int, default=10, help="keep-alive connections per session and host")
+    parser.add_argument("--cookies", default=".scraper-cookies.json",
+                        help="where session cookies (solved challenges) are kept between runs")
+    parser.add_argument("--index", default=".url-index.sqlite", help="persistent index of saved listing URLs")
+    parser.add_argument("--journal", default=".crawl-journal.sqlite",
+                        help="sweep progress journal; an interrupted sweep resumes from it")
+    parser.add_argument("--restart-sweep", action="store_true", help="discard the journal and start the sweep over")
+    parser.add_argument("--history", default=".crawl-history.sqlite",
+                        help="per-model crawl history: high-water marks and new-listing rates")
+    parser.add_argument("--budget", type=int, metavar="N",
+                        help="spend about N requests on the models expected to have the most new ads "
+                             "(default: crawl every model)")
+    parser.add_argument("--max-interval", type=float, default=7,
+                        help="days after which a model is crawled whatever its expected yield")
+    parser.add_argument("--dataset", help="also write new cars to this partitioned Parquet dataset")
+    parser.add_argument("--analytics", help="fold new cars into the price aggregates saved at this path")
+    parser.add_argument("--listing-only", action="store_true",
+                        help="build cars from search pages alone and queue detail pages for enrichment")
+    parser.add_argument("--enrich", type=int, default=0, metavar="N",
+                        help="after the sweep, fetch detail pages for up to N queued listing-only cars")
+    parser.add_argument("--enrichment-queue", default=".enrichment.sqlite", help="queue of cars awaiting detail pages")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="DEBUG also logs every listing and parsed detail page")
+    parser.add_argument("--metrics", help="write Prometheus text metrics to this file (textfile collector)")
+    parser.add_argument("--report", help="write a JSON run report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s [%(threadName)s] %(message)s")
 
     # Popular vehicles in Sri Lanka
     vehicles = {
@@ -38,18 +92,69 @@ if __name__ == "__main__":
         }
     }
 
-    riyasewanaExtractor = RiyasewanaExtractor()
-
-    for vehicle_type, makes in vehicles.items():
-        for make, models in makes.items():
-            for model in models:
-                print(f"Scraping {vehicle_type}/{make}/{model}...")
-                cars = riyasewanaExtractor.extract_data(
-                    vehicle_type=vehicle_type,
-                    make=make,
-                    model=model
-                )
-                print(f"Scraping complete. Total: {len(cars)}")
+    # One rate limiter shared by every worker is the global request budget for the source; it
+    # speeds up while the site answers cleanly and backs off when it pushes back
+    riyasewana_limiter = AdaptiveRateLimiter(requests_per_minute=args.rpm, max_rpm=args.max_rpm)
+    response_cache = None if args.no_cache else ResponseCache(args.cache)
+    # Shared across models so an ad listed under several types (e.g. sorento, every) is fetched once
+    url_index = UrlIndex(args.index)
+    dataset = ParquetExporter(args.dataset) if args.dataset else None
+    analytics = PriceAnalytics.load(args.analytics) if args.analytics else None
+    metrics = Metrics()
+    # Sessions outlive the jobs, so connections and solved challenges carry over from model to model
+    session_pool = SessionPool(size=args.sessions or args.workers, connections_per_host=args.connections_per_host,
+                               cookie_path=args.cookies)
+    journal = CrawlJournal(args.journal)
+    if args.restart_sweep:
+        journal.finish_sweep()
+    else:
+        progress = journal.progress()
+        if progress["done"] or progress["in_progress"]:
+            logging.info("Resuming sweep: %s", progress)
+    history = CrawlHistory(args.history)
+    enrichment = EnrichmentQueue(args.enrichment_queue) if args.listing_only or args.enrich else None
+
+    def make_extractor():
+        return RiyasewanaExtractor(
+            concurrency=args.concurrency,
+            parse_workers=args.parse_workers,
+            queue_size=args.queue_size,
+            rate_limiter=riyasewana_limiter,
+            response_cache=response_cache,
+            url_index=url_index,
+            dataset=dataset,
+            analytics=analytics,
+            metrics=metrics,
+            listing_only=args.listing_only,
+            enrichment=enrichment,
+            journal=journal,
+            session_pool=session_pool,
+            history=history
+        )
+
+    runner = SweepRunner(extractor_factory=make_extractor, workers=args.workers, max_retries=args.retries,
+                         journal=journal)
+    # Closing the pool saves its cookies, so a failed sweep keeps the challenges it solved
+    with session_pool:
+        if args.budget:
+            budget = CrawlBudget(history, "riyasewana", args.budget, max_interval_days=args.max_interval,
+                                 detail_requests=0 if args.listing_only else 1)
+            runner.run_jobs(budget.jobs(vehicles))
+        else:
+            runner.run(vehicles)
+        if args.enrich:
+            # Fill in the long tail after the market view has been refreshed
+            make_extractor().enrich(limit=args.enrich)
+    print(session_pool.report())
+    if response_cache:
+        print(response_cache.report())
+    if analytics:
+        analytics.save(args.analytics)
+        print(f"Price analytics: {analytics.rows} listings -> {args.analytics}")
+    if args.metrics:
+        metrics.write_prometheus(args.metrics)
+    if args.report:
+        metrics.write_report(args.report)
 
     # ikmanExtractor = IkmanExtractor()
     # ikmanExtractor.extract_data(model="vitz")
\ No newline at end of file
@@ -0,0 +1,165 @@
+import sys
+from array import array
+from dataclasses import fields
+
+import numpy as np
+import pandas as pd
+
+from dto.Car import Car
+
+
+class CarBatch:
+    """Column-oriented container for many cars.
+
+    Low-cardinality fields (make, model, location, gear, and the raw yom / price /
+    mileage / engine / date values) are interned: each row stores a 4-byte code
+    into a per-column vocabulary, in a contiguous array. Free-text fields (title,
+    contact, url) are kept as plain lists. No per-row object or dict survives an
+    append, and to_frame() hands the codes to pandas as Categoricals without
+    re-hashing strings, so normalization parses each distinct value only once.
+    The numeric fields also keep a float64 array of parsed values per vocabulary
+    entry, extended as the vocabulary grows, so numeric() is one gather per
+    column rather than a normalization pass.
+    Accepts Car or TypedCar rows; iterating yields Car objects for old callers.
+    """
+
+    FIELDS = [f.name for f in fields(Car)]
+    TEXT = ("title", "contact", "url")
+    INTERNED = ("make", "model", "yom", "price", "mileage", "location", "gear", "date", "engine")
+    NUMERIC = ("yom", "price", "mileage", "engine")
+    NUMERIC_NAMES = {"yom": "yom", "price": "price", "mileage": "mileage", "engine": "engine_cc"}  # as normalized
+
+    def __init__(self, cars=None):
+        self._codes = {name: array("i") for name in self.INTERNED}
+        self._lookup = {name: {} for name in self.INTERNED}  # value -> code
+        self._values = {name: [] for name in self.INTERNED}  # code -> value
+        self._text = {name: [] for name in self.TEXT}
+        self._parsed = {name: np.empty(0) for name in self.NUMERIC}  # code -> parsed value, NaN if invalid
+        self._size = 0
+        if cars is not None:
+            self.extend(cars)
+
+    def __len__(self):
+        return self._size
+
+    def _intern(self, name, value) -> int:
+        if value is None or value == "":
+            return -1
+        lookup = self._lookup[name]
+        code = lookup.get(value)
+        if code is None:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            code = len(self._values[name])
+            lookup[value] = code
+            self._values[name].append(value)
+        return code
+
+    def append(self, car):
+        for name in self.INTERNED:
+            self._codes[name].append(self._intern(name, getattr(car, name)))
+        for name in self.TEXT:
+            self._text[name].append(getattr(car, name))
+        self._size += 1
+
+    def extend(self, cars):
+        if not isinstance(cars, CarBatch):
+            for car in cars:
+                self.append(car)
+            return
+
+        # Re-map the other batch's codes onto this vocabulary, one vocabulary entry at a time
+        for name in self.INTERNED:
+            remap = np.array([self._intern(name, value) for value in cars._values[name]] + [-1], dtype=np.int32)
+            codes = np.frombuffer(cars._codes[name], dtype=np.int32) if len(cars) else np.empty(0, np.int32)
+            self._codes[name].extend(array("i", remap[codes].tobytes()))
+        for name in self.TEXT:
+            self._text[name].extend(cars._text[name])
+        self._size += len(cars)
+
+    def column(self, name) -> list:
+        """Decoded values of one column."""
+        if name in self.TEXT:
+            return list(self._text[name])
+        values = self._values[name]
+        return [values[code] if code >= 0 else None for code in self._codes[name]]
+
+    def rows(self):
+        """Yield plain tuples in Car field order."""
+        columns = [self.column(name) for name in self.FIELDS]
+        return zip(*columns)
+
+    def __iter__(self):
+        for row in self.rows():
+            yield Car(*row)
+
+    def __getitem__(self, index: int) -> Car:
+        if index < 0:
+            index += self._size
+        values = []
+        for name in self.FIELDS:
+            if name in self.TEXT:
+                values.append(self._text[name][index])
+            else:
+                code = self._codes[name][index]
+                values.append(self._values[name][code] if code >= 0 else None)
+        return Car(*values)
+
+    def slice(self, start: int, stop: int) -> "CarBatch":
+        """Rows [start, stop) as a new batch sharing this batch's vocabularies."""
+        part = CarBatch.__new__(CarBatch)
+        part._codes = {name: codes[start:stop] for name, codes in self._codes.items()}
+        part._lookup = self._lookup
+        part._values = self._values
+        part._parsed = self._parsed
+        part._text = {name: values[start:stop] for name, values in self._text.items()}
+        part._size = len(part._text["url"])
+        return part
+
+    def chunks(self, size: int):
+        for start in range(0, self._size, size):
+            yield self.slice(start, start + size)
+
+    def to_frame(self) -> pd.DataFrame:
+        data = {}
+        for name in self.FIELDS:
+            if name in self.TEXT:
+                data[name] = pd.Series(self._text[name], dtype=object)
+            else:
+                codes = np.frombuffer(self._codes[name], dtype=np.int32) if self._size else np.empty(0, np.int32)
+                categories = pd.Index(self._values[name], dtype=object)
+                data[name] = pd.Categorical.from_codes(codes, categories=categories)
+        return pd.DataFrame(data)
+
+    def _parsed_values(self, name) -> np.ndarray:
+        """Parsed value of every vocabulary entry of a numeric field, with NaN appended for code -1."""
+        parsed, values = self._parsed[name], self._values[name]
+        if len(parsed) < len(values):
+            from exporter.Normalizer import CarNormalizer
+
+            # Only the entries added since the last call are parsed
+            new = pd.DataFrame({name: pd.Series(values[len(parsed):], dtype=object)})
+            frame, _ = CarNormalizer().normalize(new)
+            parsed = np.concatenate([parsed, frame[self.NUMERIC_NAMES[name]].to_numpy(dtype="float64", na_value=np.nan)])
+            self._parsed[name] = parsed
+        return np.append(parsed, np.nan)
+
+    def numeric(self) -> dict[str, np.ndarray]:
+        """Typed float64 arrays (NaN for missing) of yom, price, mileage and engine cc."""
+        out = {}
+        for name in self.NUMERIC:
+            codes = np.frombuffer(self._codes[name], dtype=np.int32) if self._size else np.empty(0, np.int32)
+            out[self.NUMERIC_NAMES[name]] = self._parsed_values(name)[codes]
+        return out
+
+    def typed(self):
+        """Yield TypedCar rows built from one vectorized normalization pass."""
+        from dto.TypedCar import TypedCar
+        from exporter.Normalizer import CarNormalizer
+
+        frame, _ = CarNormalizer().normalize(self)
+        frame = frame.rename(columns={"engine_cc": "engine"})
+        frame["date"] = frame["date"].dt.date
+        frame = frame[self.FIELDS].astype(object).where(frame[self.FIELDS].notna(), None)
+        for row in frame.itertuples(index=False, name=None):
+            yield TypedCar(*row)
@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+from datetime import date as Date
+
+
+@dataclass(slots=True)
+class TypedCar:
+    """Slotted, typed counterpart of Car: numbers are ints and the date is a date.
+
+    Field names match Car so exporters and CarBatch accept either.
+    """
+    title: str | None = None
+    make: str | None = None
+    model: str | None = None
+    yom: int | None = None
+    price: int | None = None
+    mileage: int | None = None
+    location: str | None = None
+    gear: str | None = None
+    contact: str | None = None
+    url: str | None = None
+    date: Date | None = None
+    engine: int | None = None
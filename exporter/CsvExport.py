@@ -1,6 +1,9 @@
 import csv
 from dataclasses import fields, asdict, is_dataclass
 
+from dto.CarBatch import CarBatch
+from exporter import IngestEvents
+
 
 class CsvExporter:
 
@@ -9,6 +12,16 @@ class CsvExporter:
         if not objects:
             return
 
+        if isinstance(objects, CarBatch):
+            # Column-backed batch: write tuples straight from the columns, no per-row dict
+            with open(filename, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(CarBatch.FIELDS)
+                writer.writerows(objects.rows())
+            if IngestEvents.has_listeners():
+                IngestEvents.publish(IngestEvents.partitions_of(objects))
+            return
+
         cls = type(objects[0])
 
         if not is_dataclass(objects[0]):
@@ -21,4 +34,6 @@ class CsvExporter:
             )
             writer.writeheader()
             for obj in objects:
-                writer.writerow(asdict(obj))
\ No newline at end of file
+                writer.writerow(asdict(obj))
+        if IngestEvents.has_listeners():
+            IngestEvents.publish(IngestEvents.partitions_of(objects))
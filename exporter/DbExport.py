@@ -1,14 +1,28 @@
-import re
+import csv
+import io
+import itertools
+import threading
+from contextlib import contextmanager
+
 import psycopg2
 from psycopg2.extras import execute_values
-from dataclasses import fields, asdict, is_dataclass
-from typing import List
+from psycopg2.pool import ThreadedConnectionPool
+from dataclasses import fields, is_dataclass
+from typing import Iterable, List
+
+from dto.CarBatch import CarBatch
+from exporter import DbSchema, IngestEvents
+from exporter.Normalizer import CarNormalizer, NormalizationReport
 
 
 class DbExporter:
+    # cars table column -> normalized frame column, where they differ
+    NORMALIZED_COLUMNS = {"engine": "engine_cc"}
+    # Typed columns written next to the Car fields (date stays as the ISO string for older readers)
+    DERIVED_COLUMNS = ["listed_on"]
 
     def __init__(self, host="localhost", port=5432, database="car_analyzer",
-                 user="postgres", password="postgres", sslmode="require"):
+                 user="postgres", password="postgres", sslmode="require", pool_size: int = None):
         self.connection_params = {
             "host": host,
             "port": port,
@@ -18,6 +32,28 @@ class DbExporter:
             "sslmode": sslmode
         }
         self._connection = None
+        # Optional pool so several bulk_load workers can write at once
+        self._pool = ThreadedConnectionPool(1, pool_size, **self.connection_params) if pool_size else None
+        self.normalizer = CarNormalizer()
+        self._local = threading.local()
+
+    @property
+    def last_report(self) -> NormalizationReport:
+        """NormalizationReport of this thread's latest save_to_db / bulk_load call."""
+        return getattr(self._local, "last_report", None)
+
+    @last_report.setter
+    def last_report(self, report: NormalizationReport):
+        self._local.last_report = report
+
+    @property
+    def last_changes(self) -> int:
+        """car_changes rows logged by this thread's last observed save_to_db / bulk_load."""
+        return getattr(self._local, "last_changes", 0)
+
+    @last_changes.setter
+    def last_changes(self, changes: int):
+        self._local.last_changes = changes
 
     def connect(self):
         if self._connection is None or self._connection.closed:
@@ -27,9 +63,23 @@ class DbExporter:
     def close(self):
         if self._connection and not self._connection.closed:
             self._connection.close()
+        if self._pool and not self._pool.closed:
+            self._pool.closeall()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection from the pool, or use the shared one when there is no pool."""
+        if self._pool is None:
+            yield self.connect()
+            return
+        conn = self._pool.getconn()
+        try:
+            yield conn
+        finally:
+            self._pool.putconn(conn)
 
     def create_table(self):
-        """Create the cars table if it doesn't exist."""
+        """Create the cars table if it doesn't exist and apply pending schema migrations."""
         create_sql = """
         CREATE TABLE IF NOT EXISTS cars (
             id SERIAL PRIMARY KEY,
@@ -48,22 +98,25 @@ class DbExporter:
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
 
-        CREATE INDEX IF NOT EXISTS idx_cars_make ON cars(make);
-        CREATE INDEX IF NOT EXISTS idx_cars_model ON cars(model);
         CREATE INDEX IF NOT EXISTS idx_cars_yom ON cars(yom);
         """
         conn = self.connect()
         with conn.cursor() as cur:
             cur.execute(create_sql)
         conn.commit()
+        for version in DbSchema.migrate(conn):
+            print(f"Applied schema migration {version}")
 
-    def save_to_db(self, objects: List, skip_duplicates: bool = True):
+    def save_to_db(self, objects: List, skip_duplicates: bool = True, observed: bool = False):
         """
         Save car objects to the database.
 
         Args:
-            objects: List of Car dataclass instances
+            objects: List of Car dataclass instances, or a CarBatch
             skip_duplicates: If True, skip records with duplicate URLs
+            observed: The rows were just fetched from the site (a revisit): updates
+                log their changes to car_changes, stamp checked_at and clear removed_at.
+                Leave off when re-importing exports, whose values may be stale.
         """
         if not objects:
             return 0
@@ -72,43 +125,229 @@ class DbExporter:
             raise TypeError("Objects must be dataclass instances")
 
         field_names = [f.name for f in fields(type(objects[0]))]
+        columns = field_names + self.DERIVED_COLUMNS
 
         insert_sql = f"""
-        INSERT INTO cars ({', '.join(field_names)})
+        INSERT INTO cars ({', '.join(columns)})
         VALUES %s
-        {'ON CONFLICT (url) DO NOTHING' if skip_duplicates else
-         'ON CONFLICT (url) DO UPDATE SET ' +
-         ', '.join(f'{f} = EXCLUDED.{f}' for f in field_names if f != 'url')}
+        {self._conflict_sql(columns, skip_duplicates, observed)}
         """
 
-        values = [self._to_db_row(obj) for obj in objects]
+        rows, self.last_report = self._to_db_rows(objects, columns)
+        values = list(rows)
+        # One row per url, the last one, as bulk_load keeps: ON CONFLICT DO UPDATE may not touch a row twice
+        url_at = columns.index("url")
+        last = {row[url_at]: i for i, row in enumerate(values) if row[url_at] is not None}
+        if len(last) < len(values):
+            values = [row for i, row in enumerate(values) if row[url_at] is None or last[row[url_at]] == i]
+        partitions = IngestEvents.partitions_of(objects)
+        self.last_changes = 0
+
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                old_groups = set()
+                if not skip_duplicates:
+                    cur.execute(f"SELECT DISTINCT make_key, model_key, yom, {DbSchema.WEEK} FROM cars "
+                                "WHERE url = ANY(%s)", (list(last),))
+                    old_groups = set(cur.fetchall())
+                    if observed:
+                        execute_values(cur, DbSchema.record_changes_sql(f"(VALUES %s) AS s ({', '.join(columns)})"),
+                                       values, page_size=len(values))
+                        self.last_changes = cur.rowcount
+                # One page, so the summary covers the whole batch
+                groups = execute_values(cur, self._merge_sql(insert_sql, skip_duplicates), values,
+                                        page_size=len(values), fetch=True)
+                inserted_count = self._finish_merge(cur, groups, old_groups, skip_duplicates)
+                if inserted_count:
+                    self._notify_ingest(cur, partitions)
+            conn.commit()
+
+        if inserted_count:
+            IngestEvents.publish(partitions)
+        return inserted_count
 
-        conn = self.connect()
-        with conn.cursor() as cur:
-            execute_values(cur, insert_sql, values)
-            inserted_count = cur.rowcount
-        conn.commit()
+    def bulk_load(self, objects: Iterable, skip_duplicates: bool = True, chunk_size: int = 50_000,
+                  observed: bool = False) -> int:
+        """
+        Stream car objects into the database through COPY, one chunk at a time.
 
-        return inserted_count
+        Each chunk is normalized, copied into a session-local staging table and
+        merged into cars with the same ON CONFLICT (url) semantics as save_to_db,
+        then committed. Only one chunk is held in memory, so `objects` can be a
+        generator over an arbitrarily large input. Safe to call from several
+        threads when the exporter was created with a pool_size.
 
-    def _to_db_row(self, obj) -> tuple:
-        """Convert a Car dataclass to a DB-ready tuple, parsing integer fields."""
-        d = asdict(obj)
+        Args:
+            objects: Iterable of Car dataclass instances, or a CarBatch
+            skip_duplicates: If True, skip records with duplicate URLs
+            chunk_size: Rows per COPY / merge transaction
+            observed: As in save_to_db; only rows just fetched from the site count as checked
+        """
+        if isinstance(objects, CarBatch):
+            # Column slices go straight to the normalizer, no Car objects are built
+            chunks = objects.chunks(chunk_size)
+        else:
+            iterator = iter(objects)
+            chunks = iter(lambda: list(itertools.islice(iterator, chunk_size)), [])
+        chunk = next(chunks, None)
+        if not chunk:
+            return 0
 
-        def parse_int(value: str, min_val: int = 0, max_val: int = 2_147_483_647):
-            if not value or not value.strip():
-                return None
-            digits = re.sub(r'[^\d]', '', value)
-            if not digits:
-                return None
-            num = int(digits)
-            return num if min_val <= num <= max_val else None
+        if not is_dataclass(chunk[0]):
+            raise TypeError("Objects must be dataclass instances")
 
-        d['yom'] = parse_int(d.get('yom', ''), min_val=1900, max_val=2100)
-        d['price'] = parse_int(d.get('price', ''))
-        d['mileage'] = parse_int(d.get('mileage', ''))
+        field_names = [f.name for f in fields(type(chunk[0]))] + self.DERIVED_COLUMNS
+        columns = ", ".join(field_names)
+        conflict = self._conflict_sql(field_names, skip_duplicates, observed)
+        merge_sql = self._merge_sql(f"""
+        INSERT INTO cars ({columns})
+        SELECT {columns} FROM cars_staging
+        {conflict}
+        """, skip_duplicates)
+
+        report = NormalizationReport()
+        total = changes = 0
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS cars_staging AS SELECT {columns} FROM cars WITH NO DATA")
+                # Numbers the rows in COPY order, so the last of several rows with one url can win
+                cur.execute("ALTER TABLE cars_staging ADD COLUMN IF NOT EXISTS ord BIGSERIAL")
+            conn.commit()
+
+            while chunk:
+                rows, chunk_report = self._to_db_rows(chunk, field_names)
+                report.merge(chunk_report)
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                buffer.seek(0)
+
+                with conn.cursor() as cur:
+                    cur.execute("TRUNCATE cars_staging")
+                    cur.copy_expert(f"COPY cars_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+                    # One row per url, the last one copied: ON CONFLICT DO UPDATE may not touch a row twice,
+                    # and the change log below must see the same row the merge writes
+                    cur.execute("DELETE FROM cars_staging s USING cars_staging later "
+                                "WHERE later.url = s.url AND later.ord > s.ord")
+                    old_groups = set()
+                    if not skip_duplicates:
+                        cur.execute(f"SELECT DISTINCT make_key, model_key, yom, {DbSchema.WEEK} FROM cars "
+                                    "WHERE url IN (SELECT url FROM cars_staging)")
+                        old_groups = set(cur.fetchall())
+                        if observed:
+                            cur.execute(DbSchema.record_changes_sql("cars_staging s"))
+                            changes += cur.rowcount
+                    cur.execute(merge_sql)
+                    merged = self._finish_merge(cur, cur.fetchall(), old_groups, skip_duplicates)
+                    partitions = IngestEvents.partitions_of(chunk) if merged else set()
+                    if merged:
+                        self._notify_ingest(cur, partitions)
+                conn.commit()
+                IngestEvents.publish(partitions)
+                total += merged
+                chunk = next(chunks, None)
+
+        self.last_report = report
+        self.last_changes = changes
+        return total
+
+    def mark_removed(self, urls: List[str]) -> int:
+        """Flag listings that are gone from the site; returns how many were still active.
+
+        Rows stay in cars for price history and the weekly summary; the removal is
+        logged in car_changes like any other change.
+        """
+        if not urls:
+            return 0
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    WITH removed AS (
+                        UPDATE cars SET removed_at = CURRENT_TIMESTAMP, checked_at = CURRENT_TIMESTAMP
+                        WHERE url = ANY(%s) AND removed_at IS NULL
+                        RETURNING url, make, model
+                    ), logged AS (
+                        INSERT INTO car_changes (url, changes)
+                        SELECT url, '{"removed": [false, true]}'::jsonb FROM removed
+                    )
+                    SELECT make, model FROM removed
+                """, (list(urls),))
+                rows = cur.fetchall()
+                partitions = {IngestEvents.partition_key(make, model) for make, model in rows}
+                if partitions:
+                    self._notify_ingest(cur, partitions)
+            conn.commit()
+        IngestEvents.publish(partitions)
+        return len(rows)
+
+    def assign_clusters(self, ids, cluster_ids) -> int:
+        """Store the duplicate cluster of each car (see analytics.ListingDedup); returns rows changed.
+
+        Ids go through COPY into a temp table, so a full re-clustering is one UPDATE.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(zip(map(int, ids), map(int, cluster_ids)))
+        buffer.seek(0)
+        with self.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("CREATE TEMP TABLE IF NOT EXISTS cluster_staging (id INTEGER, cluster_id BIGINT)")
+                cur.execute("TRUNCATE cluster_staging")
+                cur.copy_expert("COPY cluster_staging (id, cluster_id) FROM STDIN WITH (FORMAT csv)", buffer)
+                cur.execute("""
+                    UPDATE cars SET cluster_id = s.cluster_id
+                    FROM cluster_staging s
+                    WHERE cars.id = s.id AND cars.cluster_id IS DISTINCT FROM s.cluster_id
+                """)
+                changed = cur.rowcount
+            conn.commit()
+        return changed
+
+    @staticmethod
+    def _conflict_sql(columns: List[str], skip_duplicates: bool, observed: bool = False) -> str:
+        """ON CONFLICT (url) clause. Updates keep stored values the new row lacks (e.g. a
+        listing-only row has no contact); observed rows also mark the listing as checked and active."""
+        if skip_duplicates:
+            return "ON CONFLICT (url) DO NOTHING"
+        return ("ON CONFLICT (url) DO UPDATE SET " +
+                ", ".join(f"{f} = COALESCE(EXCLUDED.{f}, cars.{f})" for f in columns if f != "url") +
+                (", checked_at = CURRENT_TIMESTAMP, removed_at = NULL" if observed else ""))
+
+    @staticmethod
+    def _merge_sql(insert_sql: str, skip_duplicates: bool) -> str:
+        """Wrap an INSERT INTO cars so it reports the weekly groups it wrote to.
+
+        Returns one (make_key, model_key, yom, week, rows) row per group. When rows
+        are only inserted, the same statement also adds them onto car_price_weekly.
+        """
+        summary = f", summary AS ({DbSchema.weekly_upsert_sql('merged')})" if skip_duplicates else ""
+        return f"""
+        WITH merged AS (
+            {insert_sql}
+            RETURNING make_key, model_key, yom, price, mileage, {DbSchema.WEEK} AS week
+        ){summary}
+        SELECT make_key, model_key, yom, week, count(*) FROM merged GROUP BY make_key, model_key, yom, week
+        """
 
-        return tuple(d.values())
+    @staticmethod
+    def _finish_merge(cur, groups, old_groups: set, skip_duplicates: bool) -> int:
+        """Bring car_price_weekly up to date after a merge; returns the rows inserted or updated."""
+        if not skip_duplicates:
+            # Updated rows may have moved between groups, so both old and new groups are rebuilt
+            DbSchema.refresh_weekly(cur, old_groups | {tuple(group[:4]) for group in groups})
+        return sum(group[4] for group in groups)
+
+    @staticmethod
+    def _notify_ingest(cur, partitions):
+        """NOTIFY readers in other processes; delivered only when the transaction commits."""
+        cur.execute("SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload",
+                    (IngestEvents.CHANNEL, IngestEvents.notify_payloads(partitions)))
+
+    def _to_db_rows(self, objects, field_names: List[str]):
+        """Normalize a batch of Car records in one pass; returns (DB-ready tuples, report)."""
+        frame, report = self.normalizer.normalize(objects)
+        frame = frame.rename(columns={v: k for k, v in self.NORMALIZED_COLUMNS.items()})
+        frame["engine"] = frame["engine"].astype("string")
+        frame["listed_on"] = frame["date"]
+        return CarNormalizer.to_rows(frame, field_names), report
 
     def __enter__(self):
         self.connect()
@@ -119,10 +358,15 @@ class DbExporter:
 
 
 if __name__ == "__main__":
-    import csv
-    import sys
+    import argparse
+    import json
     import os
     import glob
+    import sys
+    import tempfile
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor, as_completed
     from dotenv import load_dotenv
 
     # Load .env file from project root
@@ -132,38 +376,117 @@ if __name__ == "__main__":
     sys.path.insert(0, project_root)
     from dto.Car import Car
 
-    def load_csv(filepath: str) -> List[Car]:
-        """Load cars from a CSV file."""
-        cars = []
+    def iter_csv(filepath: str, skip: int = 0):
+        """Stream cars from a CSV file, optionally skipping rows already loaded."""
         with open(filepath, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
-            for row in reader:
-                cars.append(Car(**row))
-        return cars
+            for row in itertools.islice(reader, skip, None):
+                yield Car(**row)
+
+    def iter_chunks(iterable, size: int):
+        iterator = iter(iterable)
+        while chunk := list(itertools.islice(iterator, size)):
+            yield chunk
 
     def get_csv_files(path: str) -> List[str]:
         """Get all CSV files from a path (file or directory)."""
         if os.path.isfile(path):
             return [path] if path.endswith('.csv') else []
         elif os.path.isdir(path):
-            return glob.glob(os.path.join(path, "*.csv"))
+            return sorted(glob.glob(os.path.join(path, "*.csv")))
         else:
             return []
 
-    if len(sys.argv) < 2:
-        print("Usage: python DbExport.py <csv_file_or_directory> [--update]")
-        print("  --update: Update existing records instead of skipping duplicates")
-        sys.exit(1)
+    class LoadState:
+        """Per-file progress journal (rows committed, done flag) so an interrupted load can resume.
 
-    input_path = sys.argv[1]
-    skip_duplicates = "--update" not in sys.argv
+        A file is only skipped while its size and mtime match what was loaded.
+        Partially loaded files, and files the scrapers have appended to since,
+        continue after their last committed chunk.
+        """
 
-    csv_files = get_csv_files(input_path)
+        def __init__(self, path: str, restart: bool = False):
+            self.path = path
+            self._lock = threading.Lock()
+            self.files = {}
+            if not restart and os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    self.files = json.load(f)
+
+        def _signature(self, csv_file):
+            stat = os.stat(csv_file)
+            return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+        def entry(self, csv_file) -> dict:
+            key = os.path.abspath(csv_file)
+            entry = self.files.get(key)
+            signature = self._signature(csv_file)
+            if not entry or entry["size"] > signature["size"]:
+                # New, or rewritten (e.g. compacted): load from the top
+                return {**signature, "rows": 0, "done": False}
+            if any(entry.get(k) != v for k, v in signature.items()):
+                # The scrapers only append, so a grown file continues after the loaded rows
+                return {**entry, **signature, "done": False}
+            return entry
+
+        def update(self, csv_file, entry: dict):
+            with self._lock:
+                self.files[os.path.abspath(csv_file)] = entry
+                directory = os.path.dirname(os.path.abspath(self.path))
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self.files, f, indent=1)
+                os.replace(tmp_path, self.path)
+
+    class Progress:
+        def __init__(self, total_files: int):
+            self.total_files = total_files
+            self.files_done = 0
+            self.rows = 0
+            self.written = 0
+            self.report = NormalizationReport()
+            self.start = time.perf_counter()
+            self._lock = threading.Lock()
+
+        def add(self, rows: int, written: int, report: NormalizationReport):
+            with self._lock:
+                self.rows += rows
+                self.written += written
+                self.report.merge(report)
+                self.print()
+
+        def file_done(self):
+            with self._lock:
+                self.files_done += 1
+                self.print()
+
+        def print(self):
+            elapsed = time.perf_counter() - self.start
+            rate = self.rows / elapsed if elapsed else 0.0
+            print(f"  [{self.files_done}/{self.total_files} files] {self.rows} rows loaded, "
+                  f"{self.written} inserted/updated, {rate:,.0f} rows/s")
+
+    parser = argparse.ArgumentParser(description="Load scraped car CSV files into the database")
+    parser.add_argument("input_path", help="CSV file or directory of CSV files")
+    parser.add_argument("--update", action="store_true", help="Update existing records instead of skipping duplicates")
+    parser.add_argument("--bulk", action="store_true", help="Load through COPY into a staging table in fixed-size chunks")
+    parser.add_argument("--workers", type=int, default=4, help="Files loaded in parallel")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Rows read and committed per chunk")
+    parser.add_argument("--state", help="Progress journal (default: .dbexport-state.json next to the input)")
+    parser.add_argument("--restart", action="store_true", help="Ignore the progress journal and reload every file")
+    args = parser.parse_args()
+
+    skip_duplicates = not args.update
+
+    csv_files = get_csv_files(args.input_path)
     if not csv_files:
-        print(f"No CSV files found in: {input_path}")
+        print(f"No CSV files found in: {args.input_path}")
         sys.exit(1)
 
-    print(f"Found {len(csv_files)} CSV file(s)")
+    state_dir = args.input_path if os.path.isdir(args.input_path) else os.path.dirname(os.path.abspath(args.input_path))
+    state = LoadState(args.state or os.path.join(state_dir, ".dbexport-state.json"), restart=args.restart)
+    pending = [csv_file for csv_file in csv_files if not state.entry(csv_file)["done"]]
+    print(f"Found {len(csv_files)} CSV file(s), {len(csv_files) - len(pending)} already loaded")
 
     db_config = {
         "host": os.getenv("DB_HOST", "localhost"),
@@ -174,24 +497,50 @@ if __name__ == "__main__":
         "sslmode": os.getenv("DB_SSLMODE", "require")
     }
 
-    total_loaded = 0
-    total_inserted = 0
+    progress = Progress(len(pending))
 
-    with DbExporter(**db_config) as exporter:
+    def load_file(exporter: DbExporter, csv_file: str):
+        entry = state.entry(csv_file)
+        if entry["rows"]:
+            print(f"Resuming {os.path.basename(csv_file)} after row {entry['rows']}")
+        else:
+            print(f"Processing: {os.path.basename(csv_file)}")
+
+        for chunk in iter_chunks(iter_csv(csv_file, skip=entry["rows"]), args.chunk_size):
+            if args.bulk:
+                count = exporter.bulk_load(chunk, skip_duplicates=skip_duplicates, chunk_size=args.chunk_size)
+            else:
+                count = exporter.save_to_db(chunk, skip_duplicates=skip_duplicates)
+            report = exporter.last_report
+            # The chunk is committed, so the journal can move past it
+            entry["rows"] += len(chunk)
+            state.update(csv_file, entry)
+            progress.add(len(chunk), count, report)
+
+        entry["done"] = True
+        state.update(csv_file, entry)
+        progress.file_done()
+
+    with DbExporter(**db_config, pool_size=args.workers) as exporter:
         print("Creating table if not exists...")
         exporter.create_table()
 
-        for csv_file in csv_files:
-            print(f"\nProcessing: {os.path.basename(csv_file)}")
-            cars = load_csv(csv_file)
-            print(f"  Loaded {len(cars)} cars")
-            total_loaded += len(cars)
-
-            count = exporter.save_to_db(cars, skip_duplicates=skip_duplicates)
-            print(f"  Inserted/updated {count} records")
-            total_inserted += count
-
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(load_file, exporter, csv_file): csv_file for csv_file in pending}
+            failed = []
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(futures[future])
+                    print(f"Failed to load {os.path.basename(futures[future])}: {e}")
+
+    elapsed = time.perf_counter() - progress.start
     print(f"\n--- Summary ---")
-    print(f"Total files processed: {len(csv_files)}")
-    print(f"Total cars loaded: {total_loaded}")
-    print(f"Total records inserted/updated: {total_inserted}")
+    print(f"Total files processed: {progress.files_done} (failed: {len(failed)})")
+    print(f"Total cars loaded: {progress.rows}")
+    print(f"Total records inserted/updated: {progress.written}")
+    print(f"Throughput: {progress.rows / elapsed if elapsed else 0:,.0f} rows/s over {elapsed:.1f}s")
+    print(progress.report)
+    if failed:
+        sys.exit(1)
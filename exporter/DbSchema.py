@@ -0,0 +1,257 @@
+import zlib
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from exporter.Normalizer import CarNormalizer
+
+# Week a row counts towards: its listing date, or the load date for rows without one
+WEEK = "date_trunc('week', COALESCE(listed_on, created_at::date))::date"
+
+# Fields whose changes are kept in car_changes, with their cars column types
+HISTORY_FIELDS = {"title": "varchar", "make": "varchar", "model": "varchar", "yom": "integer",
+                  "price": "integer", "mileage": "integer", "location": "varchar", "gear": "varchar",
+                  "contact": "varchar", "engine": "varchar"}
+
+# Generated make_key / model_key, matching Normalizer.name_key
+NAME_KEY_SQL = "btrim(regexp_replace(lower({column}), '[[:space:]_-]+', ' ', 'g'))"
+
+# One row per physical car: the active, most recently listed member of each cluster
+CARS_UNIQUE_VIEW = """
+    CREATE OR REPLACE VIEW cars_unique AS
+    SELECT DISTINCT ON (COALESCE(cluster_id, id)) *
+    FROM cars
+    ORDER BY COALESCE(cluster_id, id), removed_at IS NOT NULL, listed_on DESC NULLS LAST, id DESC;
+"""
+
+WEEKLY_COLUMNS = ["make_key", "model_key", "yom", "week", "listings", "priced", "price_sum",
+                  "price_min", "price_max", "mileage_sum", "mileage_count"]
+
+
+def weekly_aggregate_sql(source: str, where: str = "TRUE") -> str:
+    """Per make/model/yom/week aggregates of `source`, which must expose the cars columns plus week."""
+    return f"""
+    SELECT make_key, model_key, yom, week, count(*), count(price), COALESCE(sum(price), 0),
+           min(price), max(price), COALESCE(sum(mileage), 0), count(mileage)
+    FROM {source}
+    WHERE make_key IS NOT NULL AND model_key IS NOT NULL AND yom IS NOT NULL AND ({where})
+    GROUP BY make_key, model_key, yom, week
+    ORDER BY make_key, model_key, yom, week
+    """
+
+
+def weekly_upsert_sql(source: str) -> str:
+    """Add the aggregates of the new rows in `source` onto car_price_weekly.
+
+    Rows are upserted in key order so concurrent loads lock summary rows in the
+    same order and cannot deadlock each other.
+    """
+    return f"""
+    INSERT INTO car_price_weekly AS w ({', '.join(WEEKLY_COLUMNS)})
+    {weekly_aggregate_sql(source)}
+    ON CONFLICT (make_key, model_key, yom, week) DO UPDATE SET
+        listings = w.listings + EXCLUDED.listings,
+        priced = w.priced + EXCLUDED.priced,
+        price_sum = w.price_sum + EXCLUDED.price_sum,
+        price_min = LEAST(w.price_min, EXCLUDED.price_min),
+        price_max = GREATEST(w.price_max, EXCLUDED.price_max),
+        mileage_sum = w.mileage_sum + EXCLUDED.mileage_sum,
+        mileage_count = w.mileage_count + EXCLUDED.mileage_count
+    """
+
+
+def refresh_weekly(cur, groups: set[tuple]):
+    """Recompute the given (make_key, model_key, yom, week) summary rows from cars.
+
+    Used when rows were updated in place: their old values cannot be subtracted,
+    so only the affected groups are rebuilt, each through the composite index.
+    """
+    groups = [g for g in groups if None not in g]
+    if not groups:
+        return
+    make_keys, model_keys, yoms, weeks = (list(col) for col in zip(*groups))
+    affected = ("SELECT * FROM unnest(%s::text[], %s::text[], %s::int[], %s::date[]) "
+                "AS g(make_key, model_key, yom, week)")
+    params = (make_keys, model_keys, yoms, weeks)
+    cur.execute(f"""
+        DELETE FROM car_price_weekly w USING ({affected}) g
+        WHERE (w.make_key, w.model_key, w.yom, w.week) = (g.make_key, g.model_key, g.yom, g.week)
+    """, params)
+    cur.execute(f"""
+        INSERT INTO car_price_weekly ({', '.join(WEEKLY_COLUMNS)})
+        {weekly_aggregate_sql(
+            f"(SELECT c.*, g.week FROM cars c JOIN ({affected}) g "
+            f"ON (c.make_key, c.model_key, c.yom) = (g.make_key, g.model_key, g.yom) AND {WEEK} = g.week) rows")}
+    """, params)
+
+
+def record_changes_sql(source: str) -> str:
+    """Log how the rows of `source` (aliased s, one row per url) differ from cars, before a merge overwrites them.
+
+    Each differing row becomes one car_changes row holding only the changed
+    fields, as {field: [old, new]}. A missing new value is not a change: merges
+    keep the stored value for it.
+    """
+    changed = {name: f"s.{name}::{kind} IS NOT NULL AND s.{name}::{kind} IS DISTINCT FROM c.{name}"
+               for name, kind in HISTORY_FIELDS.items()}
+    diff = ", ".join(f"'{name}', CASE WHEN {condition} THEN jsonb_build_array(c.{name}, s.{name}::{HISTORY_FIELDS[name]}) END"
+                     for name, condition in changed.items())
+    return f"""
+    INSERT INTO car_changes (url, changes)
+    SELECT c.url, jsonb_strip_nulls(jsonb_build_object({diff}))
+    FROM {source} JOIN cars c ON c.url = s.url
+    WHERE {" OR ".join(f"({condition})" for condition in changed.values())}
+    """
+
+
+def _typed_listing_date(cur):
+    """Typed listing date, normalized make/model keys and composite indexes."""
+    cur.execute("""
+        ALTER TABLE cars ADD COLUMN IF NOT EXISTS listed_on DATE;
+        ALTER TABLE cars ADD COLUMN IF NOT EXISTS make_key TEXT GENERATED ALWAYS AS (lower(btrim(make))) STORED;
+        ALTER TABLE cars ADD COLUMN IF NOT EXISTS model_key TEXT GENERATED ALWAYS AS (lower(btrim(model))) STORED;
+    """)
+
+    # Backfill through the same date parser the loaders use, once per distinct string
+    cur.execute("SELECT DISTINCT date FROM cars WHERE date IS NOT NULL AND listed_on IS NULL")
+    raw = [row[0] for row in cur.fetchall()]
+    if raw:
+        frame, _ = CarNormalizer().normalize(pd.DataFrame({"date": raw}))
+        parsed = [(value, day.strftime("%Y-%m-%d")) for value, day in zip(raw, frame["date"]) if pd.notna(day)]
+        execute_values(cur, """
+            UPDATE cars SET listed_on = v.day::date FROM (VALUES %s) AS v(raw, day)
+            WHERE cars.date = v.raw
+        """, parsed, page_size=10_000)
+
+    # "make + model + yom range over the last N days" is answered from the index alone
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cars_model_yom_listed
+            ON cars (make_key, model_key, yom, listed_on) INCLUDE (price, mileage);
+        CREATE INDEX IF NOT EXISTS idx_cars_model_listed ON cars (make_key, model_key, listed_on DESC);
+        DROP INDEX IF EXISTS idx_cars_make;
+        DROP INDEX IF EXISTS idx_cars_model;
+    """)
+
+
+def _weekly_summary(cur):
+    """Per make/model/yom/week summary table, filled once from the existing rows."""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS car_price_weekly (
+            make_key TEXT NOT NULL,
+            model_key TEXT NOT NULL,
+            yom INTEGER NOT NULL,
+            week DATE NOT NULL,
+            listings INTEGER NOT NULL,
+            priced INTEGER NOT NULL,
+            price_sum BIGINT NOT NULL,
+            price_min INTEGER,
+            price_max INTEGER,
+            mileage_sum BIGINT NOT NULL,
+            mileage_count INTEGER NOT NULL,
+            PRIMARY KEY (make_key, model_key, yom, week)
+        );
+
+        CREATE OR REPLACE VIEW car_price_weekly_stats AS
+        SELECT make_key, model_key, yom, week, listings, priced, price_min, price_max,
+               round(price_sum::numeric / NULLIF(priced, 0)) AS avg_price,
+               round(mileage_sum::numeric / NULLIF(mileage_count, 0)) AS avg_mileage
+        FROM car_price_weekly;
+
+        TRUNCATE car_price_weekly;
+        INSERT INTO car_price_weekly ({', '.join(WEEKLY_COLUMNS)})
+        {weekly_aggregate_sql(f"(SELECT *, {WEEK} AS week FROM cars) rows")};
+    """)
+
+
+def _change_history(cur):
+    """Per-listing change log plus the check / removal timestamps the revisit scheduler ranks on."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS car_changes (
+            id BIGSERIAL PRIMARY KEY,
+            url VARCHAR(1000) NOT NULL,
+            observed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            changes JSONB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_car_changes_url ON car_changes (url, observed_at);
+
+        ALTER TABLE cars ADD COLUMN IF NOT EXISTS checked_at TIMESTAMP;
+        ALTER TABLE cars ADD COLUMN IF NOT EXISTS removed_at TIMESTAMP;
+        CREATE INDEX IF NOT EXISTS idx_cars_active_checked
+            ON cars (COALESCE(checked_at, created_at)) WHERE removed_at IS NULL;
+
+        CREATE OR REPLACE VIEW car_price_history AS
+        SELECT url, observed_at,
+               (changes -> 'price' ->> 0)::integer AS old_price,
+               (changes -> 'price' ->> 1)::integer AS new_price
+        FROM car_changes WHERE changes ? 'price';
+    """)
+
+
+def _listing_clusters(cur):
+    """cluster_id grouping listings of one physical car, and a view keeping one row per car."""
+    cur.execute("""
+        ALTER TABLE cars ADD COLUMN IF NOT EXISTS cluster_id BIGINT;
+        CREATE INDEX IF NOT EXISTS idx_cars_cluster ON cars (cluster_id);
+    """ + CARS_UNIQUE_VIEW)
+
+
+def _separator_free_keys(cur):
+    """make_key / model_key fold separators, so "Cr V" from a URL slug and "CR-V" from a detail page match.
+
+    Dropping the columns takes their indexes and the cars_unique view (SELECT *) with them; all are
+    recreated and the weekly summary is refilled under the new keys.
+    """
+    cur.execute(f"""
+        DROP VIEW IF EXISTS cars_unique;
+        ALTER TABLE cars DROP COLUMN IF EXISTS make_key, DROP COLUMN IF EXISTS model_key;
+        ALTER TABLE cars
+            ADD COLUMN make_key TEXT GENERATED ALWAYS AS ({NAME_KEY_SQL.format(column="make")}) STORED,
+            ADD COLUMN model_key TEXT GENERATED ALWAYS AS ({NAME_KEY_SQL.format(column="model")}) STORED;
+        CREATE INDEX IF NOT EXISTS idx_cars_model_yom_listed
+            ON cars (make_key, model_key, yom, listed_on) INCLUDE (price, mileage);
+        CREATE INDEX IF NOT EXISTS idx_cars_model_listed ON cars (make_key, model_key, listed_on DESC);
+        {CARS_UNIQUE_VIEW}
+        TRUNCATE car_price_weekly;
+        INSERT INTO car_price_weekly ({', '.join(WEEKLY_COLUMNS)})
+        {weekly_aggregate_sql(f"(SELECT *, {WEEK} AS week FROM cars) rows")};
+    """)
+
+
+# (version, description, migration); append only, never edit an applied one
+MIGRATIONS = [
+    (1, "typed listed_on date, make/model keys, composite indexes", _typed_listing_date),
+    (2, "car_price_weekly summary table", _weekly_summary),
+    (3, "car_changes history, checked_at / removed_at", _change_history),
+    (4, "cluster_id for cross-source duplicates, cars_unique view", _listing_clusters),
+    (5, "make/model keys ignore separators", _separator_free_keys),
+]
+
+
+def migrate(conn) -> list[int]:
+    """Apply pending migrations in order, each in its own transaction; returns the versions applied.
+
+    An advisory lock serializes concurrent migrators (e.g. several loader processes starting at once).
+    """
+    lock_id = zlib.crc32(b"cars schema_migrations")
+    applied_now = []
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    conn.commit()
+
+    for version, description, migration in MIGRATIONS:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (lock_id,))
+            cur.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (version,))
+            if cur.fetchone() is None:
+                migration(cur)
+                cur.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                            (version, description))
+                applied_now.append(version)
+        conn.commit()
+    return applied_now
@@ -0,0 +1,59 @@
+import json
+import threading
+
+from dto.CarBatch import CarBatch
+from exporter.Normalizer import name_key
+
+# Postgres NOTIFY channel carrying the partitions of every committed save_to_db / bulk_load
+CHANNEL = "car_ingest"
+
+_listeners = []
+_lock = threading.Lock()
+
+
+def partition_key(make, model) -> tuple[str, str]:
+    """(make, model) as compared by readers, see Normalizer.name_key."""
+    return name_key(make), name_key(model)
+
+
+def partitions_of(objects) -> set[tuple[str, str]]:
+    """Distinct (make, model) partitions of Car / TypedCar objects or a CarBatch."""
+    if isinstance(objects, CarBatch):
+        return {partition_key(make, model) for make, model in set(zip(objects.column("make"), objects.column("model")))}
+    return {partition_key(obj.make, obj.model) for obj in objects}
+
+
+def subscribe(listener):
+    """Call `listener(partitions)` after every in-process write of new rows."""
+    with _lock:
+        _listeners.append(listener)
+
+
+def unsubscribe(listener):
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def has_listeners() -> bool:
+    return bool(_listeners)
+
+
+def publish(partitions: set[tuple[str, str]]):
+    """Tell in-process listeners that rows of these partitions were just written."""
+    if not partitions:
+        return
+    with _lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        listener(partitions)
+
+
+def notify_payloads(partitions: set[tuple[str, str]]) -> list[str]:
+    """One NOTIFY payload per partition, for readers in other processes."""
+    return [json.dumps(list(key)) for key in sorted(partitions)]
+
+
+def parse_payload(payload: str) -> tuple[str, str]:
+    make, model = json.loads(payload)
+    return make, model
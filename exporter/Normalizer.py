@@ -0,0 +1,191 @@
+import operator
+import re
+from dataclasses import dataclass, field, fields
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Separators that differ between sources for one name: "CR-V" on detail pages, "Cr V" from the search slug "cr-v"
+NAME_SEPARATORS = re.compile(r"[\s_-]+")
+
+
+def name_key(value) -> str:
+    """Make / model as compared everywhere: lower-cased, runs of separators folded to one space, trimmed."""
+    return NAME_SEPARATORS.sub(" ", (value or "").lower()).strip()
+
+
+def name_keys(values: pd.Series) -> pd.Series:
+    """name_key over a column; missing values stay missing."""
+    return values.astype("string").str.lower().str.replace(NAME_SEPARATORS, " ", regex=True).str.strip()
+
+
+@dataclass
+class NormalizationReport:
+    rows: int = 0
+    parsed: dict = field(default_factory=dict)
+    missing: dict = field(default_factory=dict)
+    failed: dict = field(default_factory=dict)
+
+    def merge(self, other: "NormalizationReport"):
+        """Accumulate another batch's counts into this report."""
+        self.rows += other.rows
+        for counts, more in ((self.parsed, other.parsed), (self.missing, other.missing), (self.failed, other.failed)):
+            for col, n in more.items():
+                counts[col] = counts.get(col, 0) + n
+
+    @property
+    def total_failed(self) -> int:
+        return sum(self.failed.values())
+
+    def __str__(self):
+        parts = [f"{col}: {self.parsed[col]} ok / {self.missing[col]} missing / {self.failed[col]} failed"
+                 for col in self.parsed]
+        return f"Normalized {self.rows} rows ({'; '.join(parts)})"
+
+
+class CarNormalizer:
+    """Batch normalization of raw scraped Car fields into typed columns.
+
+    Works column-at-a-time on a pandas frame: numbers are pulled out of strings
+    like "Rs. 5,500,000", "55 lakhs", "85,000 km" or "1.5L" with vectorized regex
+    extraction, dates from either source are coerced to one datetime column, and
+    placeholders such as "Negotiable" count as missing. Values that are present
+    but cannot be parsed, or fall outside a plausible range, count as failed and
+    become null. Shared by the typed exporters (database, Parquet).
+    """
+
+    NUMERIC_COLUMNS = {
+        # column: (raw field, min, max, dtype)
+        "yom": ("yom", 1900, 2100, "Int16"),
+        "price": ("price", 1_000, 2_000_000_000, "Int64"),
+        "mileage": ("mileage", 0, 2_000_000, "Int64"),
+        "engine_cc": ("engine", 50, 20_000, "Int32"),
+    }
+    STRING_COLUMNS = ["title", "make", "model", "location", "gear", "contact", "url"]
+    PLACEHOLDERS = {"negotiable", "-", "--", "n/a", "na", "none", "call", "call for price", "ask"}
+    PRICE_UNITS = {"mn": 1_000_000, "million": 1_000_000, "m": 1_000_000,
+                   "lakh": 100_000, "lakhs": 100_000, "lk": 100_000}
+    ENGINE_UNITS = {"l": 1000, "litre": 1000, "liter": 1000, "ltr": 1000}
+
+    _NUMBER = r"(\d[\d,]*(?:\.\d+)?)\s*([a-z]*)"
+
+    def __init__(self, today: date = None):
+        self.today = today
+
+    @staticmethod
+    def to_frame(objects) -> pd.DataFrame:
+        """Raw string frame from dataclass instances (or a frame / CarBatch passed through)."""
+        if isinstance(objects, pd.DataFrame):
+            return objects
+        if hasattr(objects, "to_frame"):
+            return objects.to_frame()
+        if not objects:
+            return pd.DataFrame()
+        names = [f.name for f in fields(type(objects[0]))]
+        getter = operator.attrgetter(*names)
+        return pd.DataFrame.from_records((getter(obj) for obj in objects), columns=names)
+
+    def normalize(self, objects) -> tuple[pd.DataFrame, NormalizationReport]:
+        raw = self.to_frame(objects)
+        report = NormalizationReport(rows=len(raw))
+        out = pd.DataFrame(index=raw.index)
+
+        for col in self.STRING_COLUMNS:
+            if col in raw:
+                values = raw[col].astype("string").str.strip()
+                out[col] = values.mask(values == "")
+
+        for col, (source, min_val, max_val, dtype) in self.NUMERIC_COLUMNS.items():
+            values = raw[source] if source in raw else pd.Series(None, index=raw.index, dtype="object")
+            out[col] = self._numeric(col, values, min_val, max_val, report).astype(dtype)
+
+        values = raw["date"] if "date" in raw else pd.Series(None, index=raw.index, dtype="object")
+        out["date"] = self._date(values, report)
+        return out, report
+
+    @staticmethod
+    def to_rows(frame: pd.DataFrame, columns: list[str]):
+        """Yield plain tuples (None for nulls, dates as YYYY-MM-DD) ready for a DB driver."""
+        out = frame[columns].astype(object)
+        for col in columns:
+            if pd.api.types.is_datetime64_any_dtype(frame[col]):
+                out[col] = frame[col].dt.strftime("%Y-%m-%d").astype(object)
+        out = out.where(frame[columns].notna(), None)
+        return out.itertuples(index=False, name=None)
+
+    def _by_unique(self, col, values: pd.Series, parse, report: NormalizationReport) -> pd.Series:
+        """Parse each distinct raw value once and broadcast the result back to every row.
+
+        Scraped columns repeat heavily (years, common prices, "Negotiable"), so the
+        regex and date work runs on the factorized uniques, not on every row.
+        """
+        codes, uniques = pd.factorize(values)
+        text = pd.Series(uniques, dtype="string").str.strip().str.lower()
+        parsed = parse(text).reset_index(drop=True)
+
+        ok = parsed.notna().to_numpy(dtype=bool)
+        missing = (text.isna() | (text == "") | text.isin(self.PLACEHOLDERS)).to_numpy(dtype=bool, na_value=True)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        report.parsed[col] = int(counts[ok].sum())
+        report.missing[col] = int(counts[missing & ~ok].sum() + (codes < 0).sum())
+        report.failed[col] = int(counts[~missing & ~ok].sum())
+
+        # Null rows have code -1, which picks the appended null
+        padded = pd.concat([parsed, pd.Series([None], dtype=parsed.dtype)], ignore_index=True)
+        return pd.Series(padded.take(codes).to_numpy(), index=values.index)
+
+    def _numeric(self, col, values: pd.Series, min_val, max_val, report) -> pd.Series:
+        def parse(text: pd.Series) -> pd.Series:
+            parts = text.str.extract(self._NUMBER)
+            nums = pd.to_numeric(parts[0].str.replace(",", "", regex=False), errors="coerce").astype("float64")
+            unit = parts[1].fillna("")
+
+            if col == "price":
+                nums = nums * unit.map(self.PRICE_UNITS).fillna(1.0).to_numpy(dtype="float64")
+            elif col == "engine_cc":
+                litres = unit.isin(self.ENGINE_UNITS.keys()) | (nums < 10)
+                nums = nums.where(~litres, nums * 1000)
+
+            nums = nums.round()
+            return nums.where(nums.between(min_val, max_val))
+
+        return self._by_unique(col, values, parse, report)
+
+    def _date(self, values: pd.Series, report) -> pd.Series:
+        today = pd.Timestamp(self.today or date.today())
+
+        def parse(text: pd.Series) -> pd.Series:
+            # Fast path: ISO dates ("2026-01-17", "2026-01-17 10:30") from ikman.normalize_date and riyasewana
+            parsed = pd.to_datetime(text.str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+
+            rest = parsed.isna() & text.notna() & (text != "")
+            if rest.any():
+                leftovers = text[rest]
+                relative = leftovers.map({"today": today, "yesterday": today - pd.Timedelta(days=1)})
+                other = pd.to_datetime(leftovers.where(relative.isna()), errors="coerce", format="mixed", dayfirst=True)
+                parsed[rest] = relative.astype("datetime64[ns]").fillna(other)
+
+            return parsed.where(parsed <= today + pd.Timedelta(days=1)).dt.normalize()
+
+        return self._by_unique("date", values, parse, report)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Throughput check: python Normalizer.py [rows]
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    sample = pd.DataFrame({
+        "price": rng.choice(["Rs. 5,500,000", "Negotiable", "55 lakhs", "7.2 Mn", "Rs 12,250,000.00"], rows),
+        "mileage": rng.choice(["85,000 km", "120000", "", "45,500"], rows),
+        "yom": rng.choice(["2015", "2018", "1890", "2021"], rows),
+        "engine": rng.choice(["1500cc", "1,000 cc", "1.5L", "660"], rows),
+        "date": rng.choice(["2026-01-17", "2026-01-16 10:30", "Today", "17 Jan 2026"], rows),
+    })
+    start = time.perf_counter()
+    frame, result = CarNormalizer().normalize(sample)
+    print(f"{rows} rows in {time.perf_counter() - start:.2f}s")
+    print(result)
@@ -0,0 +1,114 @@
+import re
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from exporter.Normalizer import CarNormalizer
+
+
+class ParquetExporter:
+    """Columnar dataset exporter, partitioned as source=/make=/model= directories.
+
+    Numeric fields are stored typed (price, mileage, yom, engine_cc) so readers can
+    push predicates and column selections down to the files: a query for the
+    2015-2018 prices of one model only opens that model's partition and only
+    decodes the columns it asks for.
+    """
+
+    PARTITION_COLS = ["source", "make", "model"]
+
+    SCHEMA = pa.schema([
+        ("title", pa.string()),
+        ("yom", pa.int16()),
+        ("price", pa.int64()),
+        ("mileage", pa.int64()),
+        ("engine_cc", pa.int32()),
+        ("location", pa.string()),
+        ("gear", pa.string()),
+        ("contact", pa.string()),
+        ("url", pa.string()),
+        ("date", pa.date32()),
+        ("source", pa.string()),
+        ("make", pa.string()),
+        ("model", pa.string()),
+    ])
+
+    def __init__(self, root: str = "dataset"):
+        self.root = root
+        self.normalizer = CarNormalizer()
+        self.last_report = None  # NormalizationReport of the latest save
+
+    @staticmethod
+    def _partition_value(series: pd.Series) -> pd.Series:
+        """Lower-case slug usable as a directory name ("Land Cruiser" -> "land-cruiser")."""
+        return (series.fillna("unknown").astype(str).str.strip().str.lower()
+                .str.replace(r"[^a-z0-9]+", "-", regex=True).str.strip("-")
+                .replace("", "unknown"))
+
+    def to_table(self, objects, source: str) -> pa.Table:
+        df, self.last_report = self.normalizer.normalize(objects)
+        df["source"] = source
+        df["make"] = self._partition_value(df["make"])
+        df["model"] = self._partition_value(df["model"])
+        return pa.Table.from_pandas(df[self.SCHEMA.names], schema=self.SCHEMA, preserve_index=False)
+
+    def save(self, objects, source: str) -> int:
+        """Append `objects` to the dataset as new files in their partitions."""
+        if len(objects) == 0:
+            return 0
+
+        table = self.to_table(objects, source)
+        pq.write_to_dataset(
+            table,
+            root_path=self.root,
+            partition_cols=self.PARTITION_COLS,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            compression="zstd",
+        )
+        return table.num_rows
+
+    def read(self, columns: list[str] = None, filters=None) -> pd.DataFrame:
+        """Read the dataset with column and predicate pushdown.
+
+        Example: read(columns=["yom", "price"],
+                      filters=[("model", "=", "aqua"), ("yom", ">=", 2015), ("yom", "<=", 2018)])
+        """
+        partitioning = ds.partitioning(
+            pa.schema([(name, pa.string()) for name in self.PARTITION_COLS]), flavor="hive"
+        )
+        return pq.read_table(self.root, columns=columns, filters=filters, partitioning=partitioning).to_pandas()
+
+
+if __name__ == "__main__":
+    import csv
+    import glob
+    import os
+    import sys
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, project_root)
+    from dto.Car import Car
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m exporter.ParquetExport <csv_file_or_directory> [dataset_root]")
+        print("  Converts {model}-{source}.csv exports into the partitioned dataset")
+        sys.exit(1)
+
+    input_path = sys.argv[1]
+    exporter = ParquetExporter(sys.argv[2] if len(sys.argv) > 2 else "dataset")
+    csv_files = glob.glob(os.path.join(input_path, "*.csv")) if os.path.isdir(input_path) else [input_path]
+
+    total = 0
+    for csv_file in csv_files:
+        source = re.sub(r"\.csv$", "", os.path.basename(csv_file)).rsplit("-", 1)[-1]
+        with open(csv_file, "r", encoding="utf-8") as f:
+            cars = [Car(**row) for row in csv.DictReader(f)]
+        written = exporter.save(cars, source=source)
+        print(f"{os.path.basename(csv_file)}: {written} rows -> {exporter.root}")
+        print(f"  {exporter.last_report}")
+        total += written
+    print(f"Total rows written: {total}")
@@ -0,0 +1,207 @@
+import csv
+import operator
+import os
+import tempfile
+import threading
+from dataclasses import fields, is_dataclass
+
+from dto.CarBatch import CarBatch
+from exporter import IngestEvents
+
+
+class StreamingCsvExporter:
+    """Append-only CSV writer: rows go to disk as they are produced.
+
+    The header is written only when the file is new, rows are flushed and
+    fsync'ed every `batch_size` writes (and on close), so a crash loses at most
+    one batch. A torn last line left by a crash is trimmed when the file is
+    reopened. `on_flush`, if given, is called with the urls of the rows each
+    flush made durable, so callers can record them only once they are on disk. Duplicates and torn rows are cleaned up by `compact`, which rewrites
+    the file atomically.
+    """
+
+    def __init__(self, filename: str, batch_size: int = 25, fsync: bool = True, on_flush=None):
+        self.filename = filename
+        self.on_flush = on_flush
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.rows_written = 0
+        self._pending = 0
+        self._file = None
+        self._writer = None
+        self._fieldnames = None
+        self._row = None  # dataclass -> row tuple in header order
+        self._lock = threading.Lock()
+        self._partitions = set()  # written since the last flush, published once durable
+        self._urls = []  # written since the last flush, handed to on_flush once durable
+
+    def _open(self, obj):
+        fieldnames = [f.name for f in fields(type(obj))]
+        if os.path.exists(self.filename) and os.path.getsize(self.filename) > 0:
+            self._trim_torn_line()
+            with open(self.filename, "r", newline="", encoding="utf-8") as f:
+                fieldnames = next(csv.reader(f), fieldnames)
+            self._file = open(self.filename, "a", newline="", encoding="utf-8")
+            # Older files may lack newer fields (e.g. engine); keep their header as is
+            self._writer = csv.writer(self._file)
+        else:
+            self._file = open(self.filename, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(fieldnames)
+        self._fieldnames = fieldnames
+        # Rows are read straight off the attributes, so no per-row dict is built
+        if len(fieldnames) > 1 and all(hasattr(obj, name) for name in fieldnames):
+            self._row = operator.attrgetter(*fieldnames)
+        else:
+            getters = [operator.attrgetter(name) if hasattr(obj, name) else (lambda _: None) for name in fieldnames]
+            self._row = lambda o: tuple(getter(o) for getter in getters)
+
+    def _trim_torn_line(self):
+        """Cut a partially written last row (no trailing newline) left by a crash."""
+        with open(self.filename, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Scan back to the last complete line
+            pos = size
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                chunk = f.read(step)
+                idx = chunk.rfind(b"\n")
+                if idx != -1:
+                    f.truncate(pos + idx + 1)
+                    return
+            f.truncate(0)
+
+    def write(self, obj):
+        if not is_dataclass(obj):
+            raise TypeError("Objects must be dataclass instances")
+
+        with self._lock:
+            if self._file is None:
+                self._open(obj)
+            self._writer.writerow(self._row(obj))
+            if self.on_flush is not None:
+                self._urls.append(getattr(obj, "url", None))
+            if IngestEvents.has_listeners():
+                self._partitions.add(IngestEvents.partition_key(obj.make, obj.model))
+            self.rows_written += 1
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._flush()
+
+    def write_all(self, objects):
+        if isinstance(objects, CarBatch):
+            self.write_batch(objects)
+            return
+        for obj in objects:
+            self.write(obj)
+
+    def write_batch(self, batch: CarBatch):
+        """Append a whole CarBatch as plain tuples and flush once."""
+        if not len(batch):
+            return
+
+        with self._lock:
+            if self._file is None:
+                self._open(batch[0])
+            # Follow the file's header, which may predate a field (e.g. engine)
+            order = [CarBatch.FIELDS.index(name) if name in CarBatch.FIELDS else None
+                     for name in self._fieldnames]
+            rows = batch.rows()
+            if order != list(range(len(CarBatch.FIELDS))):
+                rows = (tuple(row[i] if i is not None else "" for i in order) for row in rows)
+            self._writer.writerows(rows)
+            if self.on_flush is not None:
+                self._urls.extend(batch.column("url"))
+            if IngestEvents.has_listeners():
+                self._partitions |= IngestEvents.partitions_of(batch)
+            self.rows_written += len(batch)
+            self._flush()
+
+    def _flush(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        partitions, self._partitions = self._partitions, set()
+        IngestEvents.publish(partitions)
+        urls, self._urls = self._urls, []
+        if urls:
+            self.on_flush([url for url in urls if url])
+
+    def flush(self):
+        with self._lock:
+            if self._file:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._flush()
+                self._file.close()
+                self._file = None
+                self._writer = None
+                self._row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def compact(filename: str, key: str = "url") -> tuple[int, int]:
+        """Rewrite `filename` keeping the last row per `key`, atomically via a temp file.
+
+        Returns (rows kept, rows dropped).
+        """
+        if not os.path.exists(filename):
+            return 0, 0
+
+        with open(filename, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames
+            rows = {}
+            total = 0
+            for row in reader:
+                total += 1
+                if None in row or any(v is None for v in row.values()):
+                    continue  # torn or malformed row
+                rows[row.get(key) or f"__row_{total}"] = row
+
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".csv.tmp")
+        try:
+            with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows.values())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, filename)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        return len(rows), total - len(rows)
+
+
+if __name__ == "__main__":
+    import glob
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python StreamingCsvExport.py <csv_file_or_directory>")
+        print("  Compacts the CSV file(s): drops duplicate URLs and torn rows, rewriting atomically")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    csv_files = glob.glob(os.path.join(path, "*.csv")) if os.path.isdir(path) else [path]
+    for csv_file in csv_files:
+        kept, dropped = StreamingCsvExporter.compact(csv_file)
+        print(f"{os.path.basename(csv_file)}: kept {kept}, dropped {dropped}")
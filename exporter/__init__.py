@@ -1,2 +1,5 @@
 from .CsvExport import CsvExporter
 from .DbExport import DbExporter
+from .Normalizer import CarNormalizer, NormalizationReport
+from .ParquetExport import ParquetExporter
+from .StreamingCsvExport import StreamingCsvExporter
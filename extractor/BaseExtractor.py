@@ -1,15 +1,127 @@
 import csv
+import logging
 import os
 import random
 import time
+from email.utils import parsedate_to_datetime
+from typing import Iterator
+
+import requests
 
 from dto.Car import Car
+from dto.CarBatch import CarBatch
+from extractor.CrawlJournal import CrawlUnit
+from extractor.Metrics import Metrics
+from extractor.SessionPool import create_scraper
+
+log = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 600  # seconds; longer server requests are capped rather than obeyed
+
+
+def parse_retry_after(value) -> float | None:
+    """Seconds to wait from a Retry-After header, given as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
 
 
 class BaseExtractor:
-    def load_existing_from_csv(self, filename) -> list[Car]:
+    rate_limiter = None  # optional HostRateLimiter shared by every request of the extractor
+    request_timeout = 30  # seconds before a request counts as failed
+    response_cache = None  # optional ResponseCache consulted before going to the network
+    url_index = None  # optional UrlIndex of saved URLs, shared across models, sources and processes
+    dataset = None  # optional ParquetExporter receiving each run's new cars
+    analytics = None  # optional PriceAnalytics folding in each run's new cars
+    _metrics = None
+    journal = None  # optional CrawlJournal letting an interrupted sweep resume where it stopped
+    session_pool = None  # optional SessionPool of long-lived sessions shared across models and workers
+    source = None  # short source name, e.g. "riyasewana"
+
+    @property
+    def metrics(self) -> Metrics:
+        """Metrics receiving the run's counters and stage timings; the extractor's own unless one is set."""
+        if self._metrics is None:
+            self._metrics = Metrics()
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, metrics: Metrics):
+        self._metrics = metrics
+
+    def new_session(self):
+        """A scraper session and the browser-like headers sent with it; from the session pool when there is one."""
+        scraper = self.session_pool.session() if self.session_pool is not None else create_scraper()
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36",
+            "Accept-Language": "en-US,en;q=0.9"
+        }
+        return scraper, headers
+
+    def load_existing(self, filename) -> CarBatch:
+        """Reset dedup state for a new extraction and return the existing cars to keep.
+
+        With a url_index, past URLs are looked up in the shared index instead of
+        loading the model's CSV into memory, so nothing is returned.
+        """
+        self.seen_urls.clear()
+        if self.url_index is not None:
+            self.url_index.import_csv(filename, source=self.source)
+            return CarBatch()
+        return self.load_existing_from_csv(filename)
+
+    def is_seen(self, url) -> bool:
+        return url in self.seen_urls or (self.url_index is not None and url in self.url_index)
+
+    def mark_saved(self, urls: list[str]):
+        """Record exported URLs in the shared index; the CSV exporter's on_flush, so only rows on disk count."""
+        if self.url_index is not None:
+            self.url_index.add_many(urls, source=self.source)
+
+    def journaled_items(self, unit: CrawlUnit, start: str, pages) -> Iterator[Car]:
+        """Yield the listing cars of `unit`, resuming from the journal if there is one.
+
+        `pages(cursor, page_num)` walks the search pages from `cursor`, yielding each
+        page's new listing cars and the cursor of the page after it (None after
+        the last). A page is journaled before its cars are yielded; a resumed unit
+        first re-yields the journaled cars that never reached the export (not
+        seen in the CSV or URL index), then reads on from the saved cursor.
+        Both only hold rows that were fsynced (the index is written by the CSV
+        exporter's on_flush), so a car lost in an unflushed batch is re-queued.
+        """
+        if self.journal is None:
+            for cars, _ in pages(start, 1):
+                yield from cars
+            return
+
+        cursor, read, pending = self.journal.resume(unit, start)
+        # seen_urls holds only what load_existing read back from disk at this point
+        pending = [car for car in pending if not self.is_seen(car.url)]
+        if read:
+            log.info("Resuming %s/%s/%s after %d pages with %d listings pending",
+                     unit.vehicle_type, unit.make, unit.model, read, len(pending))
+        for car in pending:
+            self.seen_urls.add(car.url)
+            yield car
+        if cursor is None:
+            return
+        for cars, cursor in pages(cursor, read + 1):
+            self.journal.page_done(unit, cars, cursor)
+            yield from cars
+        if cursor is not None:
+            self.journal.page_done(unit, [], None)
+
+    def load_existing_from_csv(self, filename) -> CarBatch:
         """Load existing cars from CSV and populate seen_urls set."""
-        existing_cars = []
+        existing_cars = CarBatch()
         if not os.path.exists(filename):
             return existing_cars
 
@@ -33,17 +145,62 @@ class BaseExtractor:
                 if car.url:
                     self.seen_urls.add(car.url)
 
-        print(f"Loaded {len(existing_cars)} existing records from {filename}")
+        log.info("Loaded %d existing records from %s", len(existing_cars), filename)
         return existing_cars
 
-    def fetch_with_retry(self, scraper, url, headers=None, max_retries=5):
-        """Fetch URL with exponential backoff on rate limit."""
+    def fetch_with_retry(self, scraper, url, headers=None, max_retries=5, revalidate=False):
+        """Fetch URL, serving from the response cache when fresh (with `revalidate`, only after a 304).
+
+        429s, 5xx responses, timeouts and connection errors are retried after
+        the server's Retry-After, or an exponential backoff without one. The
+        rate limiter is told about every outcome, so pushback slows all later
+        requests to the host, not just this retry.
+        """
+        cached = None
+        if self.response_cache:
+            cached, fresh = self.response_cache.lookup(url)
+            if fresh and not revalidate:
+                self.metrics.inc("cache_hits", source=self.source)
+                return cached
+            if cached:
+                headers = {**(headers or {}), **self.response_cache.conditional_headers(cached)}
+
         for attempt in range(max_retries):
-            resp = scraper.get(url, headers=headers)
-            if resp.status_code == 429:  # Rate limited
-                wait_time = (2 ** attempt) + random.uniform(0, 1)
-                print(f"Rate limited. Waiting {wait_time:.1f}s before retry {attempt + 1}/{max_retries}...")
+            if self.rate_limiter:
+                self.rate_limiter.acquire(url)
+            retry_after = None
+            try:
+                with self.metrics.timer("request", source=self.source):
+                    resp = scraper.get(url, headers=headers, timeout=self.request_timeout)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                self.metrics.inc("network_errors", source=self.source)
+                reason = type(e).__name__
+            else:
+                self.metrics.inc("responses", source=self.source, status=resp.status_code)
+                self.metrics.inc("bytes_downloaded", len(resp.content), source=self.source)
+                if resp.status_code not in RETRY_STATUSES:
+                    if self.rate_limiter:
+                        self.rate_limiter.succeeded(url)
+                        self.metrics.set("rate_limit_rpm", self.rate_limiter.rpm(url), source=self.source)
+                    if self.response_cache:
+                        if resp.status_code == 304 and cached:
+                            self.response_cache.mark_revalidated(url)
+                            return cached
+                        if resp.status_code == 200:
+                            self.response_cache.store(url, resp)
+                    return resp
+                reason = f"HTTP {resp.status_code}"
+                retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+
+            wait_time = retry_after if retry_after is not None else (2 ** attempt) + random.uniform(0, 1)
+            log.warning("%s from %s. Waiting %.1fs before retry %d/%d...",
+                        reason, url, wait_time, attempt + 1, max_retries)
+            self.metrics.inc("retries", source=self.source)
+            if self.rate_limiter:
+                # The limiter holds every worker for the wait and lowers the host's rate
+                self.rate_limiter.throttled(url, wait_time)
+                self.metrics.set("rate_limit_rpm", self.rate_limiter.rpm(url), source=self.source)
+            else:
                 time.sleep(wait_time)
-                continue
-            return resp
-        raise Exception(f"Failed to fetch {url} after {max_retries} retries")
\ No newline at end of file
+        self.metrics.inc("fetch_failures", source=self.source)
+        raise Exception(f"Failed to fetch {url} after {max_retries} retries")
@@ -0,0 +1,152 @@
+import logging
+import math
+import statistics
+import time
+from dataclasses import dataclass
+
+from extractor.CrawlHistory import DAY, CrawlHistory
+from extractor.CrawlJournal import CrawlUnit
+from extractor.SweepRunner import SweepJob, SweepRunner
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class UnitPlan:
+    job: SweepJob
+    days: float | None  # since the last crawl; None if never crawled
+    expected_new: float | None  # None while the unit's rate is still unknown
+    cost: float  # requests the visit is expected to take
+    reason: str  # "overdue", "learning", "yield" or "skipped"
+
+    @property
+    def yield_per_request(self) -> float:
+        return (self.expected_new or 0.0) / self.cost
+
+
+class CrawlBudget:
+    """Splits a per-run request budget over the (type, make, model) plan to find the most new ads.
+
+    Each unit's new-listing rate is learnt from past runs (CrawlHistory). A
+    unit last crawled `d` days ago is expected to hold `rate * d` unseen ads,
+    which cost one detail request each (`detail_requests`) plus the search
+    pages down to the high-water mark. Units go in this order until the budget
+    is spent:
+
+    1. overdue ones, not crawled for `max_interval_days`, so every rate stays current;
+    2. the rest by expected new ads per request, so a model gaining hundreds
+       of ads a day is visited every run and a slow one only once its backlog
+       is worth the search pages. Units without a rate yet (fewer than two
+       runs) are ranked at the median yield of the known ones, so they are
+       learnt without crowding out the best models.
+
+    Visits are capped at twice their expected search pages, so a burst of
+    new ads cannot eat the rest of the budget; the cap lifts as the rate catches up.
+    A capped (truncated) run leaves the high-water mark where it was, so
+    until a run gets down to it again, pages, cap and the overdue clock are
+    sized from the last complete run rather than the last crawl, and an
+    overdue visit is not capped at all: a unit that keeps hitting its cap
+    still reaches its mark within `max_interval_days`.
+    """
+
+    DEFAULT_LISTINGS_PER_PAGE = 25
+    DEFAULT_COST = 50  # requests assumed for a unit never crawled
+    STOP_PAGES = 1  # pages read past the new ads to confirm the high-water mark
+
+    def __init__(self, history: CrawlHistory, source: str, budget: int, max_interval_days: float = 7,
+                 detail_requests: float = 1.0):
+        self.history = history
+        self.source = source
+        self.budget = budget
+        self.max_interval_days = max_interval_days
+        self.detail_requests = detail_requests  # 0 in listing-only mode
+
+    def estimate(self, job: SweepJob, now: float) -> UnitPlan:
+        stats = self.history.stats(CrawlUnit(self.source, job.vehicle_type, job.make, job.model))
+        if stats is None:
+            return UnitPlan(job, None, None, self.DEFAULT_COST, "learning")
+        # Ads above the mark arrived since the last complete run; truncated runs after it fetched some already
+        days = (now - stats.last_complete) / DAY
+        if stats.rate is None:
+            return UnitPlan(job, days, None, self.DEFAULT_COST, "learning")
+        above_mark = stats.rate * days
+        expected = max(above_mark - stats.new_since_complete, 0.0)
+        pages = math.ceil(above_mark / (stats.listings_per_page or self.DEFAULT_LISTINGS_PER_PAGE)) + self.STOP_PAGES
+        reason = "overdue" if days >= self.max_interval_days else "yield"
+        job.max_pages = None if reason == "overdue" else 2 * pages
+        return UnitPlan(job, days, expected, pages + self.detail_requests * expected, reason)
+
+    def plan(self, vehicles: dict) -> list[UnitPlan]:
+        """Every unit of the plan with its estimate, in visiting order; units left out this run are marked skipped."""
+        now = time.time()
+        plans = [self.estimate(job, now) for job in SweepRunner.plan(vehicles)]
+        known = [p.yield_per_request for p in plans if p.expected_new is not None]
+        prior = statistics.median(known) if known else math.inf
+
+        def rank(plan: UnitPlan) -> tuple:
+            if plan.reason == "overdue":
+                return 0, -plan.days
+            return 1, -(prior if plan.reason == "learning" else plan.yield_per_request)
+
+        plans.sort(key=rank)
+        spent = 0.0
+        for plan in plans:
+            # The cost of overdue and learning units is a guess, so they go in while any budget is left
+            fits = spent < self.budget if plan.reason != "yield" else spent + plan.cost <= self.budget
+            if not fits:
+                plan.reason = "skipped"
+                continue
+            spent += plan.cost
+        chosen = [p for p in plans if p.reason != "skipped"]
+        log.info("Crawl budget %d: %d of %d units, ~%.0f requests, ~%.0f new ads expected",
+                 self.budget, len(chosen), len(plans), spent, sum(p.expected_new or 0 for p in chosen))
+        return plans
+
+    def jobs(self, vehicles: dict) -> list[SweepJob]:
+        return [plan.job for plan in self.plan(vehicles) if plan.reason != "skipped"]
+
+
+def check_backlog(days: int = 30, rate: int = 25, burst: int = 500, per_page: int = 25) -> int | None:
+    """Day a burst of new ads is read down to the high-water mark under capped visits, or None if never.
+
+    Replays a unit gaining `rate` ads a day plus `burst` on day 5, visited daily
+    with the page cap CrawlBudget plans, against a throwaway CrawlHistory.
+    """
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as workdir:
+        history = CrawlHistory(os.path.join(workdir, "history.sqlite"))
+        budget = CrawlBudget(history, "riyasewana", budget=10_000, detail_requests=0)
+        start = time.time()
+        above = seen = 0  # ads above the high-water mark, and how many of them capped runs already read
+        try:
+            for day in range(1, days + 1):
+                now = start + day * DAY
+                above += rate + (burst if day == 5 else 0)
+                job = SweepJob("cars", "toyota", "aqua")
+                budget.estimate(job, now)
+                needed = math.ceil(above / per_page) + CrawlBudget.STOP_PAGES
+                unit = CrawlUnit("riyasewana", "cars", "toyota", "aqua")
+                if job.max_pages is not None and needed > job.max_pages:
+                    read = min(above, job.max_pages * per_page)
+                    history.record(unit, job.max_pages, job.max_pages * per_page, max(read - seen, 0),
+                                   truncated=True, finished_at=now)
+                    seen = max(seen, read)
+                    continue
+                history.record(unit, needed, needed * per_page, above - seen, finished_at=now)
+                if day > 5:
+                    return day
+                above = seen = 0
+        finally:
+            history.close()
+    return None
+
+
+if __name__ == "__main__":
+    import sys
+
+    day = check_backlog()
+    print(f"A 500-ad burst on day 5 is read down to the high-water mark by day {day}" if day
+          else "A capped unit never got back to its high-water mark")
+    sys.exit(0 if day else 1)
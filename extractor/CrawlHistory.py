@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from extractor.CrawlJournal import CrawlUnit
+
+DAY = 86400.0
+
+
+@dataclass
+class UnitStats:
+    runs: int
+    last_crawl: float  # epoch seconds
+    rate: float | None  # new listings per day; None until two runs are known
+    listings_per_page: float
+    pages: float  # pages read per run, on average
+    last_complete: float  # epoch seconds of the last run that reached the high-water mark
+    new_since_complete: int  # new listings found by the truncated runs after it
+
+
+class CrawlHistory:
+    """Per crawl unit: what each past run read and found, and the high-water mark.
+
+    The high-water mark is the listing date of the newest ad a unit has shown;
+    search pages are newest first, so the next crawl can stop once it is past
+    it. Run rows feed the new-listing rate the crawl budget is planned on.
+    """
+
+    RATE_RUNS = 10  # runs the rate is estimated over, newest weighted most
+    RATE_DECAY = 0.8  # weight of each older run relative to the next one
+
+    def __init__(self, path: str = ".crawl-history.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                source TEXT,
+                vehicle_type TEXT,
+                make TEXT,
+                model TEXT,
+                finished_at REAL,
+                pages INTEGER,
+                listings INTEGER,  -- items on the pages read, new or not
+                new_listings INTEGER,
+                truncated INTEGER  -- stopped by a page cap before reaching known ads
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_unit ON runs (source, vehicle_type, make, model, finished_at)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS high_water (
+                source TEXT,
+                vehicle_type TEXT,
+                make TEXT,
+                model TEXT,
+                newest_date TEXT,
+                PRIMARY KEY (source, vehicle_type, make, model)
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _key(unit: CrawlUnit) -> tuple:
+        return unit.source, unit.vehicle_type, unit.make, unit.model
+
+    def high_water(self, unit: CrawlUnit) -> str | None:
+        """ISO date of the newest ad seen for `unit`, or None before its first run."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT newest_date FROM high_water WHERE source = ? AND vehicle_type = ? AND make = ? AND model = ?",
+                self._key(unit)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record(self, unit: CrawlUnit, pages: int, listings: int, new_listings: int, newest_date: str = None,
+               truncated: bool = False, finished_at: float = None):
+        """Log a finished run of `unit` (finishing now unless `finished_at` says otherwise).
+
+        A truncated run stopped at its page cap above the old high-water mark,
+        leaving ads between the two unread, so the mark stays where it was and
+        the next run walks down to it again.
+        """
+        key = self._key(unit)
+        with self._lock:
+            self._conn.execute("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (*key, finished_at or time.time(), pages, listings, new_listings,
+                                int(truncated)))
+            if newest_date and not truncated:
+                # The mark only moves forward
+                self._conn.execute("""
+                    INSERT INTO high_water VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (source, vehicle_type, make, model)
+                    DO UPDATE SET newest_date = MAX(newest_date, excluded.newest_date)
+                """, (*key, newest_date))
+            self._conn.commit()
+
+    def stats(self, unit: CrawlUnit) -> UnitStats | None:
+        """Run summary of `unit`, or None if it was never crawled.
+
+        The rate divides the new listings of the recent runs by the days each
+        run covered (since the run before it), with older runs weighted down.
+        A truncated run did not reach the ads it left for the next run, so its
+        new listings are counted with the next complete run, over both runs' days.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT finished_at, pages, listings, new_listings, truncated FROM runs "
+                "WHERE source = ? AND vehicle_type = ? AND make = ? AND model = ? "
+                "ORDER BY finished_at DESC LIMIT ?", (*self._key(unit), self.RATE_RUNS + 1)
+            ).fetchall()
+        if not rows:
+            return None
+        periods = []  # (new listings, days) per complete run, oldest first
+        pending, start = 0, rows[-1][0]  # the oldest run only marks where the first period starts
+        for finished_at, _, _, new_listings, truncated in reversed(rows[:-1]):
+            pending += new_listings
+            if truncated:
+                continue
+            periods.append((pending, (finished_at - start) / DAY))
+            pending, start = 0, finished_at
+        new = days = 0.0
+        for age, (period_new, period_days) in enumerate(reversed(periods)):
+            weight = self.RATE_DECAY ** age
+            new += weight * period_new
+            days += weight * period_days
+        pages = sum(row[1] for row in rows)
+        return UnitStats(
+            runs=len(rows),
+            last_crawl=rows[0][0],
+            rate=new / days if days > 0 else None,
+            listings_per_page=sum(row[2] for row in rows) / pages if pages else 0.0,
+            pages=pages / len(rows),
+            last_complete=start,
+            new_since_complete=pending,
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, fields
+
+from dto.Car import Car
+
+
+@dataclass(frozen=True)
+class CrawlUnit:
+    """One search crawled from its first page to its last."""
+    source: str
+    vehicle_type: str
+    make: str
+    model: str
+
+
+class CrawlJournal:
+    """Durable record of sweep progress, so an interrupted sweep resumes without redoing network work.
+
+    Per crawl unit the journal keeps the cursor of the next search page (a URL
+    or a page number, whatever the extractor walks by) and the listings found
+    on the pages read so far. A page's listings and the cursor past it are
+    written in one transaction before any of them is fetched. A restarted unit
+    re-queues the listings that never made it into the export and carries on
+    from the cursor, so no search page is read twice; the export itself (CSV
+    or URL index) is the record of which listings are finished, since only it
+    knows what reached the disk. Units that completed are skipped until the
+    whole sweep is done and `finish_sweep` clears the source for the next one.
+    """
+
+    CAR_FIELDS = [f.name for f in fields(Car)]
+
+    def __init__(self, path: str = ".crawl-journal.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS units (
+                source TEXT,
+                vehicle_type TEXT,
+                make TEXT,
+                model TEXT,
+                cursor TEXT,  -- next search page; NULL once every page has been read
+                pages INTEGER DEFAULT 0,
+                done INTEGER DEFAULT 0,
+                started_at REAL,
+                updated_at REAL,
+                PRIMARY KEY (source, vehicle_type, make, model)
+            )
+        """)
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS pending (
+                source TEXT,
+                url TEXT,
+                vehicle_type TEXT,
+                make TEXT,
+                model TEXT,
+                page INTEGER,
+                {", ".join(f"car_{name} TEXT" for name in self.CAR_FIELDS)},
+                PRIMARY KEY (source, url)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_unit ON pending (source, vehicle_type, make, model)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(unit: CrawlUnit) -> tuple:
+        return unit.source, unit.vehicle_type, unit.make, unit.model
+
+    def is_done(self, unit: CrawlUnit) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT done FROM units WHERE source = ? AND vehicle_type = ? AND make = ? AND model = ?",
+                self._key(unit)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def resume(self, unit: CrawlUnit, start: str) -> tuple[str | None, int, list[Car]]:
+        """(cursor, pages read, pending listing cars) of `unit`; a new unit starts at `start`."""
+        now = time.time()
+        key = self._key(unit)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO units (source, vehicle_type, make, model, cursor, started_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (*key, start, now, now)
+            )
+            self._conn.commit()
+            cursor, pages = self._conn.execute(
+                "SELECT cursor, pages FROM units WHERE source = ? AND vehicle_type = ? AND make = ? AND model = ?", key
+            ).fetchone()
+            rows = self._conn.execute(
+                f"SELECT {', '.join(f'car_{n}' for n in self.CAR_FIELDS)} FROM pending "
+                "WHERE source = ? AND vehicle_type = ? AND make = ? AND model = ? ORDER BY page, rowid", key
+            ).fetchall()
+        return cursor, pages, [Car(**dict(zip(self.CAR_FIELDS, row))) for row in rows]
+
+    def page_done(self, unit: CrawlUnit, cars: list[Car], cursor: str | None):
+        """Record a read search page: its new listings become pending and `cursor` points past it."""
+        key = self._key(unit)
+        columns = ["source", "url", "vehicle_type", "make", "model", "page"] + [f"car_{n}" for n in self.CAR_FIELDS]
+        with self._lock:
+            self._conn.execute(
+                "UPDATE units SET cursor = ?, pages = pages + 1, updated_at = ? "
+                "WHERE source = ? AND vehicle_type = ? AND make = ? AND model = ?", (cursor, time.time(), *key)
+            )
+            pages = self._conn.execute(
+                "SELECT pages FROM units WHERE source = ? AND vehicle_type = ? AND make = ? AND model = ?", key
+            ).fetchone()[0]
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO pending ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                ((unit.source, car.url, unit.vehicle_type, unit.make, unit.model, pages,
+                  *(getattr(car, name) for name in self.CAR_FIELDS)) for car in cars if car.url)
+            )
+            self._conn.commit()
+
+    def unit_done(self, unit: CrawlUnit):
+        key = self._key(unit)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE units SET cursor = NULL, done = 1, updated_at = ? "
+                "WHERE source = ? AND vehicle_type = ? AND make = ? AND model = ?", (time.time(), *key)
+            )
+            self._conn.execute(
+                "DELETE FROM pending WHERE source = ? AND vehicle_type = ? AND make = ? AND model = ?", key
+            )
+            self._conn.commit()
+
+    def finish_sweep(self, source: str = None):
+        """Forget the progress of a completed sweep (of one source, or all), so the next run starts over."""
+        where, params = ("WHERE source = ?", (source,)) if source else ("", ())
+        with self._lock:
+            self._conn.execute(f"DELETE FROM units {where}", params)
+            self._conn.execute(f"DELETE FROM pending {where}", params)
+            self._conn.commit()
+
+    def progress(self) -> dict:
+        """Counts of finished units, units in progress and listings journaled for the latter."""
+        with self._lock:
+            done, started = self._conn.execute("SELECT COALESCE(SUM(done), 0), COUNT(*) FROM units").fetchone()
+            pending = self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+        return {"done": done, "in_progress": started - done, "listings": pending}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
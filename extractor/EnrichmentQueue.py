@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+import time
+from dataclasses import fields
+from datetime import datetime
+
+from dto.Car import Car
+
+# Fields only a detail page provides; a listing-only record missing any of them is queued
+REQUIRED_DETAIL_FIELDS = ("contact", "engine", "gear")
+
+UNKNOWN_AGE_DAYS = 365  # records without a parseable listing date go to the back
+
+
+def missing_fields(car: Car) -> list[str]:
+    return [name for name in REQUIRED_DETAIL_FIELDS if not getattr(car, name)]
+
+
+def enrichment_priority(car: Car, missing: list[str]) -> float:
+    """Lower is sooner: fresh listings first, since they are the ones buyers look at and
+    the first to disappear; each missing field moves a record one day forward."""
+    try:
+        listed = datetime.strptime((car.date or "")[:10], "%Y-%m-%d")
+        age = max((datetime.now() - listed).days, 0)
+    except ValueError:
+        age = UNKNOWN_AGE_DAYS
+    return age - len(missing)
+
+
+class EnrichmentQueue:
+    """Persistent priority queue of listing-only records waiting for their detail page.
+
+    Entries keep the listing's Car fields and the CSV it was written to, so an
+    enrichment pass can rebuild the full record and append it where the listing
+    row lives (the later row wins on compaction). Claimed entries are leased, so
+    several enrichers can drain the queue without fetching the same page twice;
+    a failed entry is retried up to `max_attempts` times, then dropped.
+    """
+
+    CAR_FIELDS = [f.name for f in fields(Car)]
+
+    def __init__(self, path: str = ".enrichment.sqlite", lease: float = 15 * 60, max_attempts: int = 3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS pending (
+                url TEXT PRIMARY KEY,
+                source TEXT,
+                filename TEXT,
+                priority REAL,
+                missing TEXT,
+                attempts INTEGER DEFAULT 0,
+                claimed_until REAL DEFAULT 0,
+                queued_at REAL,
+                {", ".join(f"car_{name} TEXT" for name in self.CAR_FIELDS)}
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_priority ON pending (source, priority)")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def push(self, cars, source: str, filename: str) -> int:
+        """Queue the cars still missing a required detail field; returns how many were queued.
+
+        A car already queued keeps its place and attempt count.
+        """
+        now = time.time()
+        rows = []
+        for car in cars:
+            missing = missing_fields(car)
+            if car.url and missing:
+                rows.append((car.url, source, filename, enrichment_priority(car, missing), ",".join(missing), now,
+                             *(getattr(car, name) for name in self.CAR_FIELDS)))
+        if not rows:
+            return 0
+        columns = ["url", "source", "filename", "priority", "missing", "queued_at"] + [f"car_{n}" for n in self.CAR_FIELDS]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO pending ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def claim(self, limit: int, source: str = None) -> list[tuple[Car, str]]:
+        """Lease up to `limit` entries in priority order; returns (listing Car, CSV filename) pairs."""
+        now = time.time()
+        where = "claimed_until < ?" + (" AND source = ?" if source else "")
+        params = (now, source) if source else (now,)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url, filename, {', '.join(f'car_{n}' for n in self.CAR_FIELDS)} FROM pending "
+                f"WHERE {where} ORDER BY priority, queued_at LIMIT ?", (*params, limit)
+            ).fetchall()
+            self._conn.executemany("UPDATE pending SET claimed_until = ? WHERE url = ?",
+                                   ((now + self.lease, row[0]) for row in rows))
+            self._conn.commit()
+        return [(Car(**dict(zip(self.CAR_FIELDS, row[2:]))), row[1]) for row in rows]
+
+    def done(self, url: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM pending WHERE url = ?", (url,))
+            self._conn.commit()
+
+    def failed(self, url: str) -> bool:
+        """Release a failed entry for a later pass; returns False once it has been dropped."""
+        with self._lock:
+            self._conn.execute("UPDATE pending SET attempts = attempts + 1, claimed_until = 0 WHERE url = ?", (url,))
+            cur = self._conn.execute("DELETE FROM pending WHERE url = ? AND attempts >= ?", (url, self.max_attempts))
+            self._conn.commit()
+            return cur.rowcount == 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,127 @@
+import importlib.util
+
+from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
+
+
+class SubtreeFilter(ElementFilter):
+    """Parse-time filter that only builds the subtrees whose root tag matches one of `rules`.
+
+    Each rule is a (tag name, css class) pair and either side may be None to match
+    anything. Everything outside the matched subtrees is discarded while the
+    document is tokenized, so no Tag objects are allocated for it.
+    """
+
+    def __init__(self, rules: list[tuple[str | None, str | None]]):
+        super().__init__()
+        self.rules = rules
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        classes = (attrs or {}).get("class") or ""
+        if isinstance(classes, str):
+            classes = classes.split()
+        return any(
+            (tag is None or tag == name) and (css_class is None or css_class in classes)
+            for tag, css_class in self.rules
+        )
+
+    def allow_string_creation(self, string: str) -> bool:
+        return False
+
+
+class HtmlParser:
+    """Selectable HTML parsing backend shared by the extractors.
+
+    `backend` is "html.parser" (pure Python), "lxml" (C, optional dependency) or
+    "auto", which picks lxml when it is installed. With `partial` on, callers pass
+    the subtrees they need and only those are built; the resulting soup answers
+    the same find/select calls for nodes inside those subtrees.
+    """
+
+    BACKENDS = ("html.parser", "lxml")
+
+    # Subtrees read by each page kind
+    RIYASEWANA_LISTING = [("li", None), ("div", "pagination")]
+    RIYASEWANA_DETAIL = [("table", None), ("div", "card-row"), (None, "moreph")]
+    IKMAN_LISTING = [("li", None), ("span", "ads-count-text--1UYy_")]
+    IKMAN_DETAIL = [("div", "ad-meta--17Bqm"), ("span", "sub-title--37mkY"), ("h1", "title--3s1R8")]
+
+    def __init__(self, backend: str = "auto", partial: bool = True):
+        if backend == "auto":
+            backend = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown parser backend {backend!r}, expected one of {self.BACKENDS}")
+        if backend == "lxml" and not importlib.util.find_spec("lxml"):
+            raise ImportError("The lxml backend requires the lxml package (pip install lxml)")
+        self.backend = backend
+        self.partial = partial
+
+    def parse(self, markup: str, subtrees: list[tuple[str | None, str | None]] = None) -> BeautifulSoup:
+        parse_only = SubtreeFilter(subtrees) if self.partial and subtrees else None
+        return BeautifulSoup(markup, self.backend, parse_only=parse_only)
+
+
+if __name__ == "__main__":
+    # Parity check over saved pages: python -m extractor.HtmlParser [pages_dir]
+    # Files are named <source>-<listing|detail>-*.html, e.g. riyasewana-detail-123.html; the
+    # default directory holds pages rendered from the benchmark replay site
+    import glob
+    import os
+    import sys
+
+    from dto.Car import Car
+    from extractor.IkmanExtractor import IkmanExtractor
+    from extractor.RiyasewanaExtractor import RiyasewanaExtractor
+
+    pages_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                    "saved_pages")
+
+    def checks(parser: HtmlParser) -> dict:
+        """What each page kind yields with `parser`: the listing cars and next page, or the detail page's Car."""
+        riyasewana = RiyasewanaExtractor(parser=parser)
+        ikman = IkmanExtractor(parser=parser)
+        return {
+            "riyasewana-listing": lambda path, markup: (
+                lambda soup: (riyasewana.parse_listing_page(soup), riyasewana.get_next_page(soup))
+            )(parser.parse(markup, HtmlParser.RIYASEWANA_LISTING)),
+            "riyasewana-detail": lambda path, markup: riyasewana.build_car((Car(url=path), markup)),
+            "ikman-listing": lambda path, markup: ikman.parse_listing_page(parser.parse(markup, HtmlParser.IKMAN_LISTING)),
+            "ikman-detail": lambda path, markup: ikman.build_car((Car(url=path), markup)),
+        }
+
+    def run(check, path, markup):
+        try:
+            return check(path, markup)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+
+    parsers = [HtmlParser("html.parser", partial=False)]
+    parsers += [HtmlParser(backend, partial=True) for backend in HtmlParser.BACKENDS
+                if backend != "lxml" or importlib.util.find_spec("lxml")]
+    kinds = [checks(parser) for parser in parsers]
+
+    mismatches = errors = 0
+    pages = sorted(glob.glob(os.path.join(pages_dir, "*.html")))
+    for path in pages:
+        kind = next((k for k in kinds[0] if os.path.basename(path).startswith(k)), None)
+        if kind is None:
+            print(f"Skipping {path}: unknown page kind")
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            markup = f.read()
+        reference = run(kinds[0][kind], path, markup)
+        if isinstance(reference, str):
+            errors += 1
+            print(f"ERROR {path}: {reference}")
+            continue
+        for parser, parser_kinds in zip(parsers[1:], kinds[1:]):
+            result = run(parser_kinds[kind], path, markup)
+            if result != reference:
+                mismatches += 1
+                print(f"MISMATCH {path} [{parser.backend}, partial={parser.partial}]")
+                print(f"  expected: {reference}")
+                print(f"  got:      {result}")
+
+    print(f"Checked {len(pages)} page(s) against {len(parsers) - 1} backend(s), "
+          f"mismatches: {mismatches}, errors: {errors}")
+    sys.exit(1 if mismatches or errors or not pages else 0)
@@ -1,18 +1,55 @@
+import logging
+import math
 import re
-import time
-import random
+from dataclasses import replace
 from datetime import datetime
+from typing import Iterator
 
-import cloudscraper
 from bs4 import BeautifulSoup
 
 from dto.Car import Car
-from exporter.CsvExport import CsvExporter
+from analytics.PriceAnalytics import PriceAnalytics
+from dto.CarBatch import CarBatch
+from exporter.ParquetExport import ParquetExporter
+from exporter.StreamingCsvExport import StreamingCsvExporter
 from extractor.BaseExtractor import BaseExtractor
+from extractor.CrawlJournal import CrawlJournal, CrawlUnit
+from extractor.HtmlParser import HtmlParser
+from extractor.Metrics import Metrics
+from extractor.Pipeline import Pipeline
+from extractor.RateLimiter import AdaptiveRateLimiter, HostRateLimiter
+from extractor.ResponseCache import ResponseCache
+from extractor.SessionPool import SessionPool
+from extractor.UrlIndex import UrlIndex
+
+log = logging.getLogger(__name__)
+
 class IkmanExtractor(BaseExtractor):
-    def __init__(self):
+    ITEMS_PER_PAGE = 25
+
+    def __init__(self, requests_per_minute: float = 30, rate_limiter: HostRateLimiter = None,
+                 response_cache: ResponseCache = None, parser: HtmlParser = None,
+                 url_index: UrlIndex = None,
+                 dataset: ParquetExporter = None, analytics: PriceAnalytics = None,
+                 concurrency: int = 1, parse_workers: int = 2, queue_size: int = 32,
+                 metrics: Metrics = None, journal: CrawlJournal = None,
+                 session_pool: SessionPool = None):
         self.base_url = "https://ikman.lk"
         self.seen_urls = set()  # Track seen URLs to avoid duplicates
+        self.concurrency = concurrency  # Ad pages fetched in parallel
+        self.parse_workers = parse_workers  # Ad pages parsed in parallel
+        self.queue_size = queue_size  # Items buffered between pipeline stages
+        self.duplicates_skipped = 0
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(requests_per_minute=requests_per_minute)
+        self.response_cache = response_cache
+        self.parser = parser or HtmlParser()
+        self.url_index = url_index
+        self.dataset = dataset
+        self.analytics = analytics
+        self.metrics = metrics or Metrics()
+        self.journal = journal
+        self.session_pool = session_pool
+        self.source = "ikman"
 
     def normalize_date(self, raw_date):
         if not raw_date:
@@ -28,151 +65,202 @@ class IkmanExtractor(BaseExtractor):
 
         return guessed_date.strftime("%Y-%m-%d")
 
-    def extract_data(self, model):
-        scraper = cloudscraper.create_scraper(
-            browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False}
-        )
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36",
-            "Accept-Language": "en-US,en;q=0.9"
-        }
-
-        filename = f"{model}-ikman.csv"
-        page_num = 1
-        total_pages = 1
-        items_per_page = 25
-        duplicates_skipped = 0
-        self.seen_urls.clear()  # Reset for new extraction
-
-        # Load existing records from CSV to avoid duplicates
-        existing_cars = self.load_existing_from_csv(filename)
-        cars = []  # New cars only
-
-        while page_num <= total_pages:
-
-            current_url = f"{self.base_url}/en/ads/sri-lanka/cars?sort=relevance&buy_now=0&urgent=0&query={model}&page={page_num}"
-            print(f"Fetching page {page_num}: {current_url}")
-
-            resp = self.fetch_with_retry(scraper, current_url, headers=headers)
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            listings = soup.find_all("li", class_="normal--2QYVk gtm-normal-ad")
-            listings += soup.find_all("li", class_ = "top-ads-container--1Jeoq gtm-top-ad")
-
-            span = soup.select_one("span.ads-count-text--1UYy_")
-
-            total_ads = None
-            if span:
-                text = span.get_text(strip=True)
-                match = re.search(r"of\s+(\d+)", text)
-                if match:
-                    total_ads = int(match.group(1))
-                    total_pages = int(total_ads / items_per_page)
-
-            print(total_pages)
+    def parse_listing_page(self, soup: BeautifulSoup) -> tuple[list[str], int | None]:
+        """Return the ad URLs on a search page and the total ad count it reports."""
+        listings = soup.find_all("li", class_="normal--2QYVk gtm-normal-ad")
+        listings += soup.find_all("li", class_ = "top-ads-container--1Jeoq gtm-top-ad")
 
-            for item in listings:
-                link_tag = item.find("a", href=True)
+        span = soup.select_one("span.ads-count-text--1UYy_")
 
-                if not link_tag:
-                    continue
+        total_ads = None
+        if span:
+            text = span.get_text(strip=True)
+            match = re.search(r"of\s+(\d+)", text)
+            if match:
+                total_ads = int(match.group(1))
 
-                href = link_tag["href"]
-                if href.startswith("/"):
-                    ad_url = self.base_url + href
-                else:
-                    ad_url = href
+        ad_urls = []
+        for item in listings:
+            link_tag = item.find("a", href=True)
 
-                # Skip if already processed (duplicate)
-                if ad_url in self.seen_urls:
-                    print(f"Skipping duplicate: {ad_url}")
-                    duplicates_skipped += 1
-                    if duplicates_skipped > 25:
-                        break
-                    continue
-                duplicates_skipped = 0
-                self.seen_urls.add(ad_url)
+            if not link_tag:
+                continue
 
-                # Add delay between individual car requests
-                print(ad_url)
-                time.sleep(random.uniform(1, 3))
+            href = link_tag["href"]
+            if href.startswith("/"):
+                ad_urls.append(self.base_url + href)
+            else:
+                ad_urls.append(href)
 
-                car_node = self.fetch_with_retry(scraper, ad_url, headers=headers)
-                car_soup = BeautifulSoup(car_node.text, "html.parser")
+        return ad_urls, total_ads
 
-                meta_section = car_soup.find("div", class_="ad-meta--17Bqm")
+    def parse_details(self, car_soup: BeautifulSoup) -> dict:
+        """Collect the labelled fields, price, date, location and title of a detail page."""
+        meta_section = car_soup.find("div", class_="ad-meta--17Bqm")
 
-                car_details = {}
+        car_details = {}
 
-                subtitle = car_soup.select_one("span.sub-title--37mkY")
+        subtitle = car_soup.select_one("span.sub-title--37mkY")
 
-                posted_on = None
-                location = None
+        posted_on = None
+        location = None
 
-                if subtitle:
-                    # Date
-                    text = subtitle.get_text(" ", strip=True)
-                    if "Posted on" in text:
-                        posted_on = text.split("Posted on")[1].split(",")[0].strip()
+        if subtitle:
+            # Date
+            text = subtitle.get_text(" ", strip=True)
+            if "Posted on" in text:
+                posted_on = text.split("Posted on")[1].split(",")[0].strip()
 
-                    # Location
-                    locations = [
-                        span.text.strip()
-                        for span in subtitle.select("a.subtitle-location-link--1q5zA span")
-                    ]
-                    location = ", ".join(locations)
+            # Location
+            locations = [
+                span.text.strip()
+                for span in subtitle.select("a.subtitle-location-link--1q5zA span")
+            ]
+            location = ", ".join(locations)
 
-                print("Posted on:", posted_on)
-                print("Location:", location)
+        car_details["Date"] = self.normalize_date(posted_on)
+        car_details["Location"] = location
 
-                car_details["Date"] = self.normalize_date(posted_on)
-                car_details["Location"] = location
+        if meta_section:
+            price = meta_section.select_one("div.amount--3NTpl")
+            car_details["Price"] = price.text.strip() if price else None
 
-                price = meta_section.select_one("div.amount--3NTpl")
-                car_details["Price"] = price.text.strip() if price else None
+            rows = meta_section.find_all("div", class_="full-width--XovDn")
 
-                rows = meta_section.find_all("div", class_="full-width--XovDn")
+            for row in rows:
+                label = row.find("div", class_="label--3oVZK")
+                value = row.find("div", class_="value--1lKHt")
 
-                for row in rows:
-                    label = row.find("div", class_="label--3oVZK")
-                    value = row.find("div", class_="value--1lKHt")
+                if not label or not value:
+                    continue
 
-                    if not label or not value:
-                        continue
+                key = label.get_text(strip=True).replace(":", "")
+                val = value.get_text(" ", strip=True)
 
-                    key = label.get_text(strip=True).replace(":", "")
-                    val = value.get_text(" ", strip=True)
+                car_details[key] = val
 
-                    car_details[key] = val
+        title_el = car_soup.select_one("h1.title--3s1R8")
 
-                title_el = car_soup.select_one("h1.title--3s1R8")
+        car_details["Title"] = title_el.get_text(strip=True) if title_el else None
 
-                title = title_el.get_text(strip=True) if title_el else None
-                print(title)
-                car_details["Title"] = title
+        return car_details
 
-                print(car_details)
-                if duplicates_skipped > 25:
-                    break
-                car = Car(
-                    title=title,
-                    make=car_details.get("Make"),
-                    model=car_details.get("Model"),
-                    yom=car_details.get("Year of Manufacture"),
-                    price=car_details.get("Price"),
-                    mileage=car_details.get("Mileage"),
-                    location=car_details.get("Location"),
-                    gear=car_details.get("Transmission"),
-                    contact=car_details.get("Contact"),
-                    url=ad_url,
-                    date=car_details.get("Date")
-                )
+    def listing_pages(self, scraper, headers, model, page_num=1) -> Iterator[tuple[list[Car], str | None]]:
+        """Walk the search result pages for `model` from `page_num`, yielding each page's unseen ads
+        (as Cars holding the URL) and the next page number, or None after the last.
 
-                cars.append(car)
+        The page count comes from the ad total each page reports. A page is
+        abandoned after more than 25 consecutive duplicates.
+        """
+        total_pages = page_num
+        consecutive_duplicates = 0
+        while page_num <= total_pages:
+            current_url = f"{self.base_url}/en/ads/sri-lanka/cars?sort=relevance&buy_now=0&urgent=0&query={model}&page={page_num}"
+            log.info("Fetching page %d: %s", page_num, current_url)
+
+            with self.metrics.timer("stage", stage="listing", source=self.source):
+                resp = self.fetch_with_retry(scraper, current_url, headers=headers)
+                soup = self.parser.parse(resp.text, HtmlParser.IKMAN_LISTING)
+                ad_urls, total_ads = self.parse_listing_page(soup)
+            self.metrics.inc("pages", source=self.source)
+            if total_ads is not None:
+                pages = math.ceil(total_ads / self.ITEMS_PER_PAGE)
+                if page_num == 1:
+                    log.info("%d ads over %d pages", total_ads, pages)
+                total_pages = max(pages, page_num)
+
+            new_cars = []
+            for ad_url in ad_urls:
+                # Skip if already processed (duplicate)
+                if self.is_seen(ad_url):
+                    log.debug("Skipping duplicate: %s", ad_url)
+                    self.duplicates_skipped += 1
+                    self.metrics.inc("duplicates", source=self.source)
+                    consecutive_duplicates += 1
+                    if consecutive_duplicates > 25:
+                        break
+                    continue
+                consecutive_duplicates = 0
+                self.seen_urls.add(ad_url)
+                new_cars.append(Car(url=ad_url))
             page_num += 1
+            yield new_cars, str(page_num) if page_num <= total_pages else None
+
+    def fetch_detail(self, scraper, headers, listing: Car) -> tuple[Car, str]:
+        """Network stage: download one ad page."""
+        log.debug("Fetching ad %s", listing.url)
+        with self.metrics.timer("stage", stage="fetch", source=self.source):
+            return listing, self.fetch_with_retry(scraper, listing.url, headers=headers).text
+
+    def build_car(self, fetched: tuple[Car, str]) -> Car:
+        """CPU stage: parse a downloaded ad page and build its Car.
+
+        Ad page values win; the listing's fill in whatever the page lacks.
+        """
+        listing, html = fetched
+        ad_url = listing.url
+        with self.metrics.timer("stage", stage="parse", source=self.source):
+            car_soup = self.parser.parse(html, HtmlParser.IKMAN_DETAIL)
+
+        with self.metrics.timer("stage", stage="extract", source=self.source):
+            car_details = self.parse_details(car_soup)
+        if not (car_details.get("Make") and car_details.get("Model") and car_details.get("Price")):
+            self.metrics.inc("parse_misses", source=self.source)
+            log.warning("Missing make, model or price on %s", ad_url)
+
+        log.debug("%s", car_details)
+        detail = Car(
+            title=car_details.get("Title"),
+            make=car_details.get("Make"),
+            model=car_details.get("Model"),
+            yom=car_details.get("Year of Manufacture"),
+            price=car_details.get("Price"),
+            mileage=car_details.get("Mileage"),
+            location=car_details.get("Location"),
+            gear=car_details.get("Transmission"),
+            contact=car_details.get("Contact"),
+            date=car_details.get("Date")
+        )
+        return replace(listing, **{name: value for name, value in vars(detail).items() if value})
+
+    def extract_data(self, model):
+        scraper, headers = self.new_session()
 
-        # Merge existing and new cars, then save
-        all_cars = existing_cars + cars
-        CsvExporter.save_to_csv(all_cars, filename=filename)
-        print(f"Extraction complete. New cars: {len(cars)}, Existing: {len(existing_cars)}, Total: {len(all_cars)}, Duplicates skipped: {duplicates_skipped}")
+        filename = f"{model}-ikman.csv"
+        self.duplicates_skipped = 0
+
+        # Load existing records (or consult the shared URL index) to avoid duplicates
+        existing_cars = self.load_existing(filename)
+        cars = CarBatch()  # New cars only
+
+        # listing pages -> ad fetchers -> parsers -> CSV sink, overlapping network, CPU and disk
+        pipeline = (Pipeline(queue_size=self.queue_size)
+                    .add_stage("fetch", lambda listing: self.fetch_detail(scraper, headers, listing), workers=self.concurrency)
+                    .add_stage("parse", self.build_car, workers=self.parse_workers))
+
+        # New cars are appended as they are built, so a crash loses at most one batch
+        with StreamingCsvExporter(filename, on_flush=self.mark_saved) as exporter:
+            def export(car: Car):
+                with self.metrics.timer("stage", stage="export", source=self.source):
+                    cars.append(car)
+                    exporter.write(car)
+                self.metrics.inc("cars_exported", source=self.source)
+
+            # Ikman is searched by model alone, within cars; the cursor is the next page number
+            unit = CrawlUnit(self.source, "cars", "", model)
+            listings = self.journaled_items(unit, "1", lambda cursor, page_num: self.listing_pages(
+                scraper, headers, model, int(cursor)))
+            pipeline.run(listings, export)
+
+        if self.journal is not None:
+            self.journal.unit_done(unit)
+        if self.dataset is not None:
+            self.dataset.save(cars, source=self.source)
+        if self.analytics is not None:
+            self.analytics.add(cars)
+
+        all_cars = CarBatch(existing_cars)
+        all_cars.extend(cars)
+        log.info("Extraction complete. New cars: %d, Existing: %d, Total: %d, Duplicates skipped: %d",
+                 len(cars), len(existing_cars), len(all_cars), self.duplicates_skipped)
         return all_cars
\ No newline at end of file
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds; wide enough for a parse (~ms) and a rate-limited fetch (~s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate from the buckets, interpolating linearly inside the one holding the rank."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """Thread-safe counters, gauges and latency histograms for a scraping run.
+
+    One instance is shared by every extractor of a run, like the rate limiter.
+    Updates are a dict lookup under a lock, cheap enough for per-request and
+    per-car calls. Export as Prometheus text (for the node exporter textfile
+    collector) or as a JSON run report.
+    """
+
+    def __init__(self, namespace: str = "scraper"):
+        self.namespace = namespace
+        self.started = time.time()
+        self._counters = {}  # name -> {label key -> value}
+        self._gauges = {}  # name -> {label key -> last value}
+        self._histograms = {}  # name -> {label key -> Histogram}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time the block into histogram `name`, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def histogram(self, name: str, **labels) -> Histogram | None:
+        with self._lock:
+            return self._histograms.get(name, {}).get(_label_key(labels))
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f"{self.namespace}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._gauges.items()):
+                metric = f"{self.namespace}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{metric}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                metric = f"{self.namespace}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, n in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += n
+                        lines.append(f"{metric}_bucket{_format_labels(key, (('le', bound),))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> dict:
+        """Run report: counters, gauges and count / total / mean / p50 / p90 / p99 per histogram series."""
+        def series_name(name, key):
+            return name + "".join(f"[{value}]" for _, value in key)
+
+        with self._lock:
+            counters = {series_name(name, key): value
+                        for name, series in sorted(self._counters.items())
+                        for key, value in sorted(series.items())}
+            gauges = {series_name(name, key): value
+                      for name, series in sorted(self._gauges.items())
+                      for key, value in sorted(series.items())}
+            timers = {}
+            for name, series in sorted(self._histograms.items()):
+                for key, histogram in sorted(series.items()):
+                    timers[series_name(name, key)] = {
+                        "count": histogram.count,
+                        "total_s": round(histogram.sum, 6),
+                        "mean_s": _round(histogram.sum / histogram.count) if histogram.count else None,
+                        **{f"p{int(q * 100)}_s": _round(histogram.quantile(q)) for q in (0.5, 0.9, 0.99)},
+                    }
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "elapsed_s": round(time.time() - self.started, 3),
+            "counters": counters,
+            "gauges": gauges,
+            "timers": timers,
+        }
+
+    def write_prometheus(self, path: str):
+        """Write the text format atomically, so a collector never reads a half-written file."""
+        _write_atomic(path, self.prometheus())
+
+    def write_report(self, path: str):
+        _write_atomic(path, json.dumps(self.report(), indent=2) + "\n")
+
+
+def _round(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds, 6)
+
+
+def _write_atomic(path: str, text: str):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
@@ -0,0 +1,126 @@
+import queue
+import threading
+from typing import Callable, Iterable
+
+_DONE = object()  # end-of-stream marker passed down the queues
+
+
+class _Stopped(Exception):
+    """Raised inside a stage thread when the pipeline is shutting down after an error."""
+
+
+class Pipeline:
+    """Producer/consumer pipeline: source -> stages -> sink, joined by bounded queues.
+
+    The source iterator runs in its own thread, each stage in a pool of worker
+    threads, and the sink in the calling thread. Queues hold at most
+    `queue_size` items, so a slow stage blocks the ones before it instead of
+    letting work pile up in memory: the source only runs ahead of the detail
+    fetchers by one queue, which for a listing walker means fetching the next
+    page while the current page's details are being processed.
+
+    A stage function returns the item for the next stage, or None to drop it.
+    The first exception raised anywhere stops every stage and is re-raised by
+    run(). Items reach the sink in completion order, not source order.
+    """
+
+    def __init__(self, queue_size: int = 32):
+        self.queue_size = queue_size
+        self.stages = []  # (name, func, workers)
+        self.processed = {}  # stage name -> items that went through it
+        self._stop = threading.Event()
+        self._error = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, func: Callable, workers: int = 1) -> "Pipeline":
+        self.stages.append((name, func, max(1, workers)))
+        self.processed[name] = 0
+        return self
+
+    def run(self, source: Iterable, sink: Callable):
+        """Feed `source` through the stages into `sink`; returns when everything has been consumed."""
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self._produce, args=(source, queues[0]), name="pipeline-source", daemon=True)]
+        for i, (name, func, workers) in enumerate(self.stages):
+            remaining = [workers]
+            threads += [threading.Thread(target=self._work, args=(name, func, queues[i], queues[i + 1], remaining),
+                                         name=f"pipeline-{name}-{n}", daemon=True)
+                        for n in range(workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _DONE:
+                    break
+                sink(item)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def _fail(self, error: BaseException):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item):
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set():
+                    raise _Stopped()
+
+    def _get(self, q: queue.Queue):
+        while True:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise _Stopped()
+
+    def _produce(self, source: Iterable, out: queue.Queue):
+        iterator = iter(source)
+        try:
+            for item in iterator:
+                self._put(out, item)
+            self._put(out, _DONE)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+
+    def _work(self, name: str, func: Callable, inbox: queue.Queue, out: queue.Queue, remaining: list):
+        try:
+            while True:
+                item = self._get(inbox)
+                if item is _DONE:
+                    with self._lock:
+                        remaining[0] -= 1
+                        last = remaining[0] == 0
+                    # The last worker of a stage passes the marker on; the others hand it to a sibling
+                    self._put(out if last else inbox, _DONE)
+                    return
+                result = func(item)
+                with self._lock:
+                    self.processed[name] += 1
+                if result is not None:
+                    self._put(out, result)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
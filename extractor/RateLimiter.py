@@ -0,0 +1,121 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Thread-safe token bucket handing out `rate` tokens per second, banking at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._held_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until it is due.
+
+        Callers reserve their token under the lock (the balance may go negative),
+        so concurrent workers queue up behind each other instead of racing.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+            wait = max(wait, self._held_until - now)
+        if wait > 0:
+            time.sleep(wait)
+
+    def set_rate(self, rate: float):
+        """Change the rate; tokens banked so far are kept."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = rate
+
+    def hold(self, seconds: float):
+        """Hand out no token for the next `seconds`, e.g. while the server asks us to back off."""
+        with self._lock:
+            self._held_until = max(self._held_until, time.monotonic() + seconds)
+
+
+class HostRateLimiter:
+    """One token bucket per host, so each site sees a steady, capped request rate."""
+
+    def __init__(self, requests_per_minute: float = 30, burst: float = 1, per_host: dict = None):
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.per_host = per_host or {}  # host -> requests per minute override
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rpm = self.per_host.get(host, self.requests_per_minute)
+                bucket = TokenBucket(rate=rpm / 60.0, capacity=self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def acquire(self, url: str):
+        """Block until a request to the host of `url` is allowed."""
+        self.bucket(urlparse(url).netloc).acquire()
+
+    def rpm(self, url: str) -> float:
+        """Current requests per minute allowed to the host of `url`."""
+        return self.bucket(urlparse(url).netloc).rate * 60.0
+
+    def succeeded(self, url: str):
+        """Feedback: the host answered normally. A fixed limiter ignores it."""
+
+    def throttled(self, url: str, retry_after: float = 0.0):
+        """Feedback: the host pushed back (429, 5xx, timeout). Every worker pauses for `retry_after`."""
+        if retry_after > 0:
+            self.bucket(urlparse(url).netloc).hold(retry_after)
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """Per-host AIMD rate control: speed up while the host is healthy, halve on pushback.
+
+    Every healthy response adds `increase / rpm` requests per minute, so the
+    rate climbs by about `increase` rpm per minute of clean traffic whatever the
+    current speed. Pushback multiplies the rate by `decrease`, at most once per
+    `cooldown` seconds, since several in-flight requests usually fail together
+    for the same overload. The rate stays within [min_rpm, max_rpm] and settles
+    just under the highest rate the host tolerates.
+    """
+
+    def __init__(self, requests_per_minute: float = 30, burst: float = 1, per_host: dict = None,
+                 min_rpm: float = 6, max_rpm: float = 600, increase: float = 6,
+                 decrease: float = 0.5, cooldown: float = 5.0):
+        super().__init__(requests_per_minute, burst, per_host)
+        self.min_rpm = min_rpm
+        self.max_rpm = max_rpm
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._last_cut = {}  # host -> monotonic time of the last decrease
+
+    def succeeded(self, url: str):
+        bucket = self.bucket(urlparse(url).netloc)
+        rpm = bucket.rate * 60.0
+        if rpm < self.max_rpm:
+            bucket.set_rate(min(self.max_rpm, rpm + self.increase / rpm) / 60.0)
+
+    def throttled(self, url: str, retry_after: float = 0.0):
+        host = urlparse(url).netloc
+        bucket = self.bucket(host)
+        now = time.monotonic()
+        with self._lock:
+            cut = now - self._last_cut.get(host, float("-inf")) >= self.cooldown
+            if cut:
+                self._last_cut[host] = now
+        if cut:
+            bucket.set_rate(max(self.min_rpm, bucket.rate * 60.0 * self.decrease) / 60.0)
+        super().throttled(url, retry_after)
@@ -0,0 +1,160 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class CachedResponse:
+    """Minimal stand-in for a requests.Response served from the cache."""
+
+    def __init__(self, url, status_code, text, headers):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+
+class ResponseCache:
+    """On-disk HTTP response cache keyed by URL.
+
+    Freshness is decided per URL class through `ttl_rules` (first matching regex
+    wins), stale entries are revalidated with If-None-Match / If-Modified-Since
+    when the server gave an ETag or Last-Modified, and the total body size is
+    capped with least-recently-used eviction. Bodies are stored zlib-compressed
+    in a single SQLite file, so several extractors and threads can share it.
+    """
+
+    DEFAULT_TTL_RULES = [
+        (r"riyasewana\.com/search", 15 * 60),       # listing pages
+        (r"ikman\.lk/en/ads/", 15 * 60),
+        (r"riyasewana\.com/buy/", 7 * 24 * 3600),   # detail pages
+        (r"ikman\.lk/en/ad/", 7 * 24 * 3600),
+    ]
+
+    def __init__(self, path: str = ".http-cache.sqlite", ttl_rules: list = None,
+                 default_ttl: float = 3600, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in (ttl_rules or self.DEFAULT_TTL_RULES)]
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status INTEGER,
+                body BLOB,
+                size INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def ttl_for(self, url: str) -> float:
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def lookup(self, url: str):
+        """Return (CachedResponse, is_fresh), or (None, False) when the URL is not cached."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, body, etag, last_modified, fetched_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None, False
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+
+        status, body, etag, last_modified, fetched_at = row
+        headers = {}
+        if etag:
+            headers["ETag"] = etag
+        if last_modified:
+            headers["Last-Modified"] = last_modified
+        response = CachedResponse(url, status, zlib.decompress(body).decode("utf-8"), headers)
+
+        fresh = now - fetched_at < self.ttl_for(url)
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1  # turned into a revalidation if the server answers 304
+        return response, fresh
+
+    @staticmethod
+    def conditional_headers(cached: CachedResponse) -> dict:
+        headers = {}
+        if cached.headers.get("ETag"):
+            headers["If-None-Match"] = cached.headers["ETag"]
+        if cached.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+        return headers
+
+    def mark_revalidated(self, url: str):
+        """The server answered 304 Not Modified: the cached body is fresh again."""
+        now = time.time()
+        with self._lock:
+            self.misses -= 1
+            self.revalidated += 1
+            self._conn.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+
+    def store(self, url: str, resp):
+        body = zlib.compress(resp.text.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._total_bytes += len(body) - (previous[0] if previous else 0)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, resp.status_code, body, len(body), resp.headers.get("ETag"),
+                 resp.headers.get("Last-Modified"), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Walk from least recently used until the cache is back under its cap
+        victims = []
+        for url, size in self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at"):
+            if self._total_bytes <= self.max_bytes:
+                break
+            victims.append((url,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", victims)
+        self.evictions += len(victims)
+
+    def report(self) -> str:
+        requests = self.hits + self.misses + self.revalidated
+        hit_rate = (self.hits + self.revalidated) / requests * 100 if requests else 0.0
+        return (f"Cache hits: {self.hits}, revalidated (304): {self.revalidated}, misses: {self.misses}, "
+                f"evictions: {self.evictions}, hit rate: {hit_rate:.1f}%")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
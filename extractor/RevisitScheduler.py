@@ -0,0 +1,189 @@
+import logging
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from dto.Car import Car
+from exporter.DbExport import DbExporter
+from extractor.BaseExtractor import BaseExtractor
+from extractor.Pipeline import Pipeline
+
+log = logging.getLogger(__name__)
+
+# Status codes meaning the ad is gone for good
+GONE_STATUSES = {404, 410}
+
+
+@dataclass
+class Revisit:
+    car: Car  # the stored listing
+    score: float
+    stale_days: float  # since it was last fetched
+    age_days: int  # since it was listed
+    price_changes: int  # logged so far
+    churn: float  # share of its model's listings that appeared or vanished lately
+
+
+class RevisitScheduler:
+    """Spends a per-run request budget re-fetching the known listings most likely to have changed.
+
+    Each active listing is scored in the database as
+
+        stale_days * ln(2 + age_days) * (1 + W_PRICE * price_changes) * (1 + W_CHURN * churn)
+
+    Staleness makes every listing come up eventually. Older ads are the likelier
+    to have sold. Ads that changed price before tend to change again. Fast-moving
+    models (many listings appearing or vanishing in the last CHURN_WINDOW_DAYS)
+    go stale sooner. Re-fetched pages are merged in update mode, which logs
+    changed fields to car_changes; pages that are gone mark the listing removed.
+    """
+
+    W_PRICE = 1.0
+    W_CHURN = 4.0
+    CHURN_WINDOW_DAYS = 7
+
+    CAR_COLUMNS = ["title", "make", "model", "yom", "price", "mileage", "location", "gear",
+                   "contact", "url", "date", "engine"]
+
+    def __init__(self, exporter: DbExporter, extractors: list[BaseExtractor], min_interval_hours: float = 24,
+                 concurrency: int = 2, queue_size: int = 32):
+        self.exporter = exporter
+        self.extractors = {urlparse(extractor.base_url).netloc: extractor for extractor in extractors}
+        self.min_interval_hours = min_interval_hours  # a listing checked more recently is not a candidate
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+
+    def plan(self, budget: int) -> list[Revisit]:
+        """The `budget` highest-scoring active listings not checked within min_interval_hours."""
+        columns = ", ".join(f"c.{name}" for name in self.CAR_COLUMNS)
+        with self.exporter.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"""
+                    WITH churn AS (
+                        SELECT make_key, model_key,
+                               (count(*) FILTER (WHERE created_at >= now() - %(window)s * interval '1 day')
+                                + count(*) FILTER (WHERE removed_at >= now() - %(window)s * interval '1 day')
+                               )::float / count(*) AS churn
+                        FROM cars GROUP BY make_key, model_key
+                    ), price_changes AS (
+                        SELECT url, count(*) AS n FROM car_changes WHERE changes ? 'price' GROUP BY url
+                    ), candidates AS (
+                        SELECT {columns},
+                               EXTRACT(EPOCH FROM now() - COALESCE(c.checked_at, c.created_at)) / 86400 AS stale_days,
+                               GREATEST(CURRENT_DATE - COALESCE(c.listed_on, c.created_at::date), 0) AS age_days,
+                               COALESCE(p.n, 0) AS price_changes,
+                               COALESCE(ch.churn, 0) AS churn
+                        FROM cars c
+                        LEFT JOIN price_changes p ON p.url = c.url
+                        LEFT JOIN churn ch ON ch.make_key = c.make_key AND ch.model_key = c.model_key
+                        WHERE c.removed_at IS NULL AND c.url IS NOT NULL
+                          AND COALESCE(c.checked_at, c.created_at) < now() - %(interval)s * interval '1 hour'
+                    )
+                    SELECT *, stale_days * ln(2 + age_days) * (1 + %(w_price)s * price_changes)
+                              * (1 + %(w_churn)s * churn) AS score
+                    FROM candidates
+                    ORDER BY score DESC
+                    LIMIT %(budget)s
+                """, {"window": self.CHURN_WINDOW_DAYS, "interval": self.min_interval_hours,
+                      "w_price": self.W_PRICE, "w_churn": self.W_CHURN, "budget": budget})
+                rows = cur.fetchall()
+
+        n = len(self.CAR_COLUMNS)
+        return [
+            Revisit(
+                car=Car(**{name: None if value is None else str(value) for name, value in zip(self.CAR_COLUMNS, row[:n])}),
+                stale_days=float(row[n]), age_days=int(row[n + 1]), price_changes=int(row[n + 2]),
+                churn=float(row[n + 3]), score=float(row[n + 4]),
+            )
+            for row in rows
+        ]
+
+    def run(self, budget: int) -> dict:
+        """Re-fetch the planned listings; returns counts of checked, changed, removed and failed ones."""
+        revisits = [r for r in self.plan(budget) if urlparse(r.car.url).netloc in self.extractors]
+        sessions = {host: extractor.new_session() for host, extractor in self.extractors.items()}
+        updated, removed, failed = [], [], []
+
+        def fetch(revisit: Revisit):
+            host = urlparse(revisit.car.url).netloc
+            extractor = self.extractors[host]
+            scraper, headers = sessions[host]
+            try:
+                # Revalidate so a cached copy is only reused when the server confirms it (304)
+                resp = extractor.fetch_with_retry(scraper, revisit.car.url, headers=headers, revalidate=True)
+            except Exception as e:
+                log.warning("Revisit of %s failed: %s", revisit.car.url, e)
+                failed.append(revisit.car.url)
+                return None
+            redirected = urlparse(getattr(resp, "url", None) or revisit.car.url).path != urlparse(revisit.car.url).path
+            if resp.status_code in GONE_STATUSES or redirected:
+                removed.append(revisit.car.url)
+                return None
+            return extractor, revisit.car, resp.text
+
+        def parse(fetched):
+            extractor, listing, html = fetched
+            return extractor.build_car((listing, html))
+
+        pipeline = (Pipeline(queue_size=self.queue_size)
+                    .add_stage("fetch", fetch, workers=self.concurrency)
+                    .add_stage("parse", parse, workers=1))
+        pipeline.run(revisits, updated.append)
+
+        if updated:
+            self.exporter.save_to_db(updated, skip_duplicates=False, observed=True)
+        changed = self.exporter.last_changes if updated else 0
+        gone = self.exporter.mark_removed(removed)
+        summary = {"planned": len(revisits), "checked": len(updated), "changed": changed,
+                   "removed": gone, "failed": len(failed)}
+        log.info("Revisits: %s", summary)
+        return summary
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    from dotenv import load_dotenv
+
+    from extractor.IkmanExtractor import IkmanExtractor
+    from extractor.RiyasewanaExtractor import RiyasewanaExtractor
+    from extractor.SessionPool import SessionPool
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    load_dotenv(os.path.join(project_root, ".env"))
+
+    parser = argparse.ArgumentParser(description="Re-fetch the known listings most likely to have changed or sold")
+    parser.add_argument("--budget", type=int, default=500, help="listings re-fetched this run")
+    parser.add_argument("--min-interval", type=float, default=24, help="hours before a listing may be checked again")
+    parser.add_argument("--concurrency", type=int, default=2, help="pages fetched in parallel")
+    parser.add_argument("--rpm", type=float, default=30, help="starting request rate per site")
+    parser.add_argument("--cookies", default=".scraper-cookies.json", help="session cookies shared with the sweep")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without fetching anything")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    db_config = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+        "database": os.getenv("DB_NAME", "car_analyzer"),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("DB_PASSWORD", "postgres"),
+        "sslmode": os.getenv("DB_SSLMODE", "require")
+    }
+    with DbExporter(**db_config) as exporter, SessionPool(size=1, connections_per_host=args.concurrency + 2,
+                                                          cookie_path=args.cookies) as session_pool:
+        exporter.create_table()
+        scheduler = RevisitScheduler(
+            exporter,
+            [RiyasewanaExtractor(requests_per_minute=args.rpm, session_pool=session_pool),
+             IkmanExtractor(requests_per_minute=args.rpm, session_pool=session_pool)],
+            min_interval_hours=args.min_interval,
+            concurrency=args.concurrency,
+        )
+        if args.dry_run:
+            for revisit in scheduler.plan(args.budget):
+                print(f"{revisit.score:10.1f}  stale {revisit.stale_days:5.1f}d  age {revisit.age_days:4d}d  "
+                      f"price changes {revisit.price_changes}  churn {revisit.churn:.2f}  {revisit.car.url}")
+        else:
+            print(scheduler.run(args.budget))
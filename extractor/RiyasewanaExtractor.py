@@ -1,32 +1,70 @@
 import csv
+import logging
 import os
-import time
-import random
+import re
+from dataclasses import replace
+from typing import Iterator
 
-import cloudscraper
 from bs4 import BeautifulSoup
 
 from dto.Car import Car
-from exporter.CsvExport import CsvExporter
+from analytics.PriceAnalytics import PriceAnalytics
+from dto.CarBatch import CarBatch
+from exporter.ParquetExport import ParquetExporter
+from exporter.StreamingCsvExport import StreamingCsvExporter
 from extractor.BaseExtractor import BaseExtractor
+from extractor.CrawlHistory import CrawlHistory
+from extractor.CrawlJournal import CrawlJournal, CrawlUnit
+from extractor.EnrichmentQueue import EnrichmentQueue
+from extractor.HtmlParser import HtmlParser
+from extractor.Metrics import Metrics
+from extractor.Pipeline import Pipeline
+from extractor.RateLimiter import AdaptiveRateLimiter, HostRateLimiter
+from extractor.ResponseCache import ResponseCache
+from extractor.SessionPool import SessionPool
+from extractor.UrlIndex import UrlIndex
+
+log = logging.getLogger(__name__)
 
 class RiyasewanaExtractor(BaseExtractor):
-    def __init__(self):
+    YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+    MILEAGE_UNIT = re.compile(r"\(?\s*km\s*\)?", re.IGNORECASE)
+    ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+    HWM_CONFIRM = 3  # known ads in a row, dated at or before the high-water mark, that end the walk
+
+    def __init__(self, concurrency: int = 1, requests_per_minute: float = 30,
+                 rate_limiter: HostRateLimiter = None, response_cache: ResponseCache = None,
+                 parser: HtmlParser = None, url_index: UrlIndex = None,
+                 dataset: ParquetExporter = None, analytics: PriceAnalytics = None,
+                 parse_workers: int = 2, queue_size: int = 32, metrics: Metrics = None,
+                 listing_only: bool = False, enrichment: EnrichmentQueue = None, journal: CrawlJournal = None,
+                 session_pool: SessionPool = None, history: CrawlHistory = None):
         self.base_url = "https://riyasewana.com/search"
         self.cars = []
         self.seen_urls = set()  # Track seen URLs to avoid duplicates
-
-    def fetch_with_retry(self, scraper, url, headers=None, max_retries=5):
-        """Fetch URL with exponential backoff on rate limit."""
-        for attempt in range(max_retries):
-            resp = scraper.get(url, headers=headers)
-            if resp.status_code == 429:  # Rate limited
-                wait_time = (2 ** attempt) + random.uniform(0, 1)
-                print(f"Rate limited. Waiting {wait_time:.1f}s before retry {attempt + 1}/{max_retries}...")
-                time.sleep(wait_time)
-                continue
-            return resp
-        raise Exception(f"Failed to fetch {url} after {max_retries} retries")
+        self.concurrency = concurrency  # Detail pages fetched in parallel
+        self.parse_workers = parse_workers  # Detail pages parsed in parallel
+        self.queue_size = queue_size  # Items buffered between pipeline stages
+        self.duplicates_skipped = 0
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(requests_per_minute=requests_per_minute)
+        self.response_cache = response_cache
+        self.parser = parser or HtmlParser()
+        self.url_index = url_index
+        self.dataset = dataset
+        self.analytics = analytics
+        self.metrics = metrics or Metrics()
+        self.listing_only = listing_only  # build cars from search pages alone, skipping detail pages
+        self.enrichment = enrichment  # where listing-only cars wait for their detail page
+        self.journal = journal
+        self.session_pool = session_pool
+        self.history = history  # high-water marks and per-run yields, for CrawlBudget
+        self.high_water = None  # per-run crawl state, reset by extract_data
+        self.max_pages = None
+        self.pages_read = 0
+        self.listings_read = 0
+        self.newest_date = None
+        self.truncated = False
+        self.source = "riyasewana"
 
     def extract_details(self, soup: BeautifulSoup):
         data = {}
@@ -52,6 +90,50 @@ class RiyasewanaExtractor(BaseExtractor):
 
         return data
 
+    def parse_listing_page(self, soup: BeautifulSoup, make: str = None, model: str = None) -> list[Car]:
+        """Return a Car for every listing item on a search page, from what the item shows.
+
+        Items carry the title, link and date, and usually the location, price and
+        mileage. Make and model come from the search; the year from the title.
+        """
+        listings = soup.find_all("li", class_="item round")
+        listings += [li for li in soup.find_all("li") if li.find("div", class_="item")]
+
+        cars = []
+        for item in listings:
+            title_tag = item.select_one("h2.more a")
+            if not title_tag:
+                continue
+
+            title = title_tag.get_text(strip=True)
+            fields = {"date": None, "price": None, "mileage": None, "location": None}
+            for box in item.select("div.boxintxt"):
+                text = box.get_text(strip=True)
+                classes = box.get("class", [])
+                if "s" in classes:
+                    fields["date"] = text
+                elif "b" in classes:
+                    fields["price"] = text
+                elif "km" in text.lower():
+                    fields["mileage"] = self.MILEAGE_UNIT.sub("", text).strip()
+                elif fields["location"] is None:
+                    fields["location"] = text
+            yom = self.YEAR.search(title)
+            cars.append(Car(
+                title=title,
+                make=self._slug_name(make),
+                model=self._slug_name(model),
+                yom=yom.group(0) if yom else None,
+                url=title_tag["href"],
+                **fields
+            ))
+
+        return cars
+
+    @staticmethod
+    def _slug_name(slug: str | None) -> str | None:
+        return slug.replace("-", " ").title() if slug else None
+
     def get_next_page(self, soup) -> str | None:
         """Find the 'Next' link in pagination and return its URL, or None if not found."""
         pagination = soup.select_one("div.pagination")
@@ -64,102 +146,209 @@ class RiyasewanaExtractor(BaseExtractor):
                 return href
         return None
 
-    def extract_data(self, vehicle_type, make, model) -> list[Car]:
-        scraper = cloudscraper.create_scraper(
-            browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False}
-        )
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36",
-            "Accept-Language": "en-US,en;q=0.9"
-        }
-
-        current_url = f"{self.base_url}/{vehicle_type}/{make}/{model}"
-        filename = f"{model}-riyasewana.csv"
-        page_num = 1
-        duplicates_skipped = 0
-        self.seen_urls.clear()  # Reset for new extraction
-
-        # Load existing records from CSV to avoid duplicates
-        existing_cars = self.load_existing_from_csv(filename)
-        cars = []  # New cars only
+    def listing_pages(self, scraper, headers, current_url, page_num=1, make=None,
+                      model=None) -> Iterator[tuple[list[Car], str | None]]:
+        """Walk the search pages from `current_url`, yielding each page's unseen listing cars and the next page's URL.
 
+        Search results are newest first, so the walk stops at the high-water
+        mark: HWM_CONFIRM known ads in a row dated no later than the newest ad
+        of the last run (a few in a row, so a bumped or promoted old ad does
+        not end it early). Without a mark (first run of the unit) or a date on
+        the item it stops after more than 25 duplicates. It also stops after `max_pages` pages.
+        Run as a pipeline source, the next page is fetched as soon as this
+        page's items are queued.
+        """
+        known_in_a_row = 0
         while current_url:
-            print(f"Fetching page {page_num}: {current_url}")
+            if self.max_pages is not None and self.pages_read >= self.max_pages:
+                log.info("Page cap of %d reached before the high-water mark, stopping", self.max_pages)
+                self.truncated = True
+                current_url = None
+                break
+            log.info("Fetching page %d: %s", page_num, current_url)
 
-            resp = self.fetch_with_retry(scraper, current_url, headers=headers)
-            soup = BeautifulSoup(resp.text, "html.parser")
+            with self.metrics.timer("stage", stage="listing", source=self.source):
+                resp = self.fetch_with_retry(scraper, current_url, headers=headers)
+                soup = self.parser.parse(resp.text, HtmlParser.RIYASEWANA_LISTING)
+                listing_cars = self.parse_listing_page(soup, make, model)
+            self.metrics.inc("pages", source=self.source)
+            self.pages_read += 1
+            self.listings_read += len(listing_cars)
 
-            listings = soup.find_all("li", class_="item round")
-            listings += [li for li in soup.find_all("li") if li.find("div", class_="item")]
+            # Check for next page
+            current_url = self.get_next_page(soup)
+            page_num += 1
 
-            for item in listings:
-                title_tag = item.select_one("h2.more a")
-                if not title_tag:
+            new_cars = []
+            for car in listing_cars:
+                dated = car.date if car.date and self.ISO_DATE.fullmatch(car.date) else None
+                if dated and (self.newest_date is None or dated > self.newest_date):
+                    self.newest_date = dated
+                # Skip if already processed (duplicate)
+                if self.is_seen(car.url):
+                    log.debug("Skipping duplicate: %s", car.url)
+                    self.duplicates_skipped += 1
+                    self.metrics.inc("duplicates", source=self.source)
+                    if self.high_water is None or dated is None:
+                        if self.duplicates_skipped > 25:
+                            current_url = None
+                            break
+                    elif dated <= self.high_water:
+                        known_in_a_row += 1
+                        if known_in_a_row >= self.HWM_CONFIRM:
+                            log.info("Reached the high-water mark %s on page %d, stopping", self.high_water, page_num - 1)
+                            current_url = None
+                            break
                     continue
+                known_in_a_row = 0
+                self.seen_urls.add(car.url)
+                new_cars.append(car)
+            yield new_cars, current_url
 
-                title = title_tag.get_text(strip=True)
-                href = title_tag["href"]
+    def fetch_detail(self, scraper, headers, listing: Car) -> tuple[Car, str]:
+        """Network stage: download one listing's detail page."""
+        with self.metrics.timer("stage", stage="fetch", source=self.source):
+            return listing, self.fetch_with_retry(scraper, listing.url, headers=headers).text
 
-                # Skip if already processed (duplicate)
-                if href in self.seen_urls:
-                    print(f"Skipping duplicate: {href}")
-                    duplicates_skipped += 1
-                    if duplicates_skipped > 25:
-                        break
-                    continue
-                self.seen_urls.add(href)
+    def build_car(self, fetched: tuple[Car, str]) -> Car:
+        """CPU stage: parse a downloaded detail page into the full Car.
 
-                date = item.select_one("div.boxintxt.s").get_text(strip=True)
+        Detail page values win; the listing's fill in whatever the page lacks.
+        """
+        listing, html = fetched
+        title, href = listing.title, listing.url
+        with self.metrics.timer("stage", stage="parse", source=self.source):
+            car_soup = self.parser.parse(html, HtmlParser.RIYASEWANA_DETAIL)
 
-                print("Title:", title)
-                print("Link:", href)
+        with self.metrics.timer("stage", stage="extract", source=self.source):
+            data = self.extract_details(car_soup)
+        if not (data.get("Make") and data.get("Model") and data.get("Price")):
+            self.metrics.inc("parse_misses", source=self.source)
+            log.warning("Missing make, model or price on %s", href)
 
-                # Add delay between individual car requests
-                time.sleep(random.uniform(1, 3))
+        # Log required fields as one block so parallel workers don't interleave
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("\n".join([
+                f"Title: {title}",
+                f"Link: {href}",
+                f"Make: {data.get('Make')}",
+                f"Model: {data.get('Model')}",
+                f"YOM: {data.get('YOM')}",
+                f"Contact: {data.get('Contact')}",
+                f"Engine: {data.get('Engine')}",
+                f"Price : {data.get('Price')}",
+                "########################################",
+            ]))
 
-                car_node = self.fetch_with_retry(scraper, href, headers=headers)
-                car_soup = BeautifulSoup(car_node.text, "html.parser")
+        detail = Car(
+            make=data.get("Make"),
+            model=data.get("Model"),
+            yom=data.get("YOM"),
+            price=data.get("Price"),
+            mileage=data.get("Mileage (km)"),
+            location=data.get("Location"),
+            gear=data.get("Gear"),
+            contact=data.get("Contact"),
+            engine=data.get("Engine (cc)")
+        )
+        return replace(listing, **{name: value for name, value in vars(detail).items() if value})
 
-                data = self.extract_details(car_soup)
+    def extract_data(self, vehicle_type, make, model, max_pages: int = None) -> CarBatch:
+        scraper, headers = self.new_session()
 
-                # Print required fields
-                print("Make:", data.get("Make"))
-                print("Model:", data.get("Model"))
-                print("YOM:", data.get("YOM"))
-                print("Contact:", data.get("Contact"))
-                print("Engine:", data.get("Engine"))
-                print("Price :", data.get("Price"))
+        current_url = f"{self.base_url}/{vehicle_type}/{make}/{model}"
+        filename = f"{model}-riyasewana.csv"
+        unit = CrawlUnit(self.source, vehicle_type, make, model)
+        self.duplicates_skipped = 0
+        self.high_water = self.history.high_water(unit) if self.history is not None else None
+        self.max_pages = max_pages
+        self.pages_read = self.listings_read = 0
+        self.newest_date = None
+        self.truncated = False
 
-                print("########################################")
+        # Load existing records (or consult the shared URL index) to avoid duplicates
+        existing_cars = self.load_existing(filename)
+        cars = CarBatch()  # New cars only
 
-                car = Car(
-                    title=title,
-                    make=data.get("Make"),
-                    model=data.get("Model"),
-                    yom=data.get("YOM"),
-                    price=data.get("Price"),
-                    mileage=data.get("Mileage (km)"),
-                    location=data.get("Location"),
-                    gear=data.get("Gear"),
-                    contact=data.get("Contact"),
-                    url=href,
-                    date=date,
-                    engine=data.get("Engine (cc)")
-                )
+        # listing pages -> detail fetchers -> parsers -> CSV sink, overlapping network, CPU and disk.
+        # In listing-only mode the listing cars go straight to the sink.
+        pipeline = Pipeline(queue_size=self.queue_size)
+        if not self.listing_only:
+            pipeline.add_stage("fetch", lambda item: self.fetch_detail(scraper, headers, item), workers=self.concurrency)
+            pipeline.add_stage("parse", self.build_car, workers=self.parse_workers)
 
-                cars.append(car)
+        # New cars are appended as they are built, so a crash loses at most one batch
+        with StreamingCsvExporter(filename, on_flush=self.mark_saved) as exporter:
+            def export(car: Car):
+                with self.metrics.timer("stage", stage="export", source=self.source):
+                    cars.append(car)
+                    exporter.write(car)
+                self.metrics.inc("cars_exported", source=self.source)
 
-            # Check for next page
-            current_url = self.get_next_page(soup)
-            if duplicates_skipped > 25 :
-                break
-            if current_url:
-                page_num += 1
-                # Add delay before fetching next page
-                time.sleep(random.uniform(2, 4))
-
-        # Merge existing and new cars, then save
-        all_cars = existing_cars + cars
-        CsvExporter.save_to_csv(objects=all_cars, filename=filename)
-        print(f"Extraction complete. New cars: {len(cars)}, Existing: {len(existing_cars)}, Total: {len(all_cars)}, Duplicates skipped: {duplicates_skipped}")
+            listings = self.journaled_items(unit, current_url, lambda cursor, page_num: self.listing_pages(
+                scraper, headers, cursor, page_num, make, model))
+            pipeline.run(listings, export)
+
+        if self.journal is not None:
+            self.journal.unit_done(unit)
+        if self.history is not None:
+            self.history.record(unit, self.pages_read, self.listings_read, len(cars), self.newest_date, self.truncated)
+        if self.listing_only and self.enrichment is not None:
+            queued = self.enrichment.push(cars, source=self.source, filename=filename)
+            self.metrics.inc("enrichment_queued", queued, source=self.source)
+        if self.dataset is not None:
+            self.dataset.save(cars, source=self.source)
+        if self.analytics is not None:
+            self.analytics.add(cars)
+
+        all_cars = CarBatch(existing_cars)
+        all_cars.extend(cars)
+        log.info("Extraction complete. New cars: %d, Existing: %d, Total: %d, Duplicates skipped: %d",
+                 len(cars), len(existing_cars), len(all_cars), self.duplicates_skipped)
         return all_cars
+
+    def enrich(self, limit: int = 1000) -> CarBatch:
+        """Fetch detail pages for up to `limit` queued listing-only cars, highest priority first.
+
+        Full records are appended to the CSV their listing row was written to, and
+        the file is compacted so the enriched row replaces it. A page that cannot
+        be fetched goes back to the queue for a later pass.
+        """
+        if self.enrichment is None:
+            raise ValueError("enrich() needs an EnrichmentQueue")
+        scraper, headers = self.new_session()
+        claimed = self.enrichment.claim(limit, source=self.source)
+        targets = {car.url: filename for car, filename in claimed}
+        enriched = CarBatch()
+
+        def fetch(listing: Car):
+            try:
+                return self.fetch_detail(scraper, headers, listing)
+            except Exception as e:
+                log.warning("Enrichment of %s failed: %s", listing.url, e)
+                self.enrichment.failed(listing.url)
+                return None
+
+        pipeline = (Pipeline(queue_size=self.queue_size)
+                    .add_stage("fetch", fetch, workers=self.concurrency)
+                    .add_stage("parse", self.build_car, workers=self.parse_workers))
+        exporters = {}
+        try:
+            def export(car: Car):
+                filename = targets[car.url]
+                if filename not in exporters:
+                    exporters[filename] = StreamingCsvExporter(filename)
+                exporters[filename].write(car)
+                enriched.append(car)
+                self.enrichment.done(car.url)
+                self.metrics.inc("cars_enriched", source=self.source)
+
+            pipeline.run((car for car, _ in claimed), export)
+        finally:
+            for exporter in exporters.values():
+                exporter.close()
+        for filename in exporters:
+            StreamingCsvExporter.compact(filename)
+
+        log.info("Enriched %d of %d queued cars, %d still queued", len(enriched), len(claimed), len(self.enrichment))
+        return enriched
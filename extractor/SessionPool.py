@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import cloudscraper
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+UNHEALTHY_STATUSES = {403, 429}  # blocked or throttled; a fresh session (new challenge) may fare better
+
+
+def create_scraper(connections_per_host: int = 10):
+    """A cloudscraper session keeping up to `connections_per_host` keep-alive connections per host."""
+    scraper = cloudscraper.create_scraper(
+        browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False}
+    )
+    # Remount with bigger connection pools; the https adapter repeats cloudscraper's TLS cipher setup
+    scraper.mount("https://", cloudscraper.CipherSuiteAdapter(
+        cipherSuite=scraper.cipherSuite,
+        ecdhCurve=scraper.ecdhCurve,
+        server_hostname=scraper.server_hostname,
+        source_address=scraper.source_address,
+        ssl_context=scraper.ssl_context,
+        pool_maxsize=connections_per_host
+    ))
+    scraper.mount("http://", HTTPAdapter(pool_maxsize=connections_per_host))
+    return scraper
+
+
+class PooledSession:
+    """Stable handle on one pool slot; requests go to the slot's current cloudscraper session.
+
+    Consecutive 403 / 429 answers count against the session; after
+    `max_failures` of them it is replaced by a fresh one, cookies and all,
+    while callers keep using the same handle.
+    """
+
+    def __init__(self, pool: "SessionPool", slot: int, cookies: list[dict] = None):
+        self.pool = pool
+        self.slot = slot
+        self.failures = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._scraper = create_scraper(pool.connections_per_host)
+        for cookie in cookies or []:
+            self._scraper.cookies.set(**cookie)
+
+    def get(self, url, **kwargs):
+        scraper = self._scraper
+        resp = scraper.get(url, **kwargs)
+        self._record(scraper, resp.status_code)
+        return resp
+
+    def _record(self, scraper, status: int):
+        with self._lock:
+            self.requests += 1
+            if scraper is not self._scraper:
+                return  # answered on a session already recycled
+            if status in UNHEALTHY_STATUSES:
+                self.failures += 1
+                if self.failures >= self.pool.max_failures:
+                    log.warning("Session %d got %d blocked / throttled answers in a row, replacing it",
+                                self.slot, self.failures)
+                    self._scraper = create_scraper(self.pool.connections_per_host)
+                    self.failures = 0
+                    self.pool.recycled += 1
+            elif status < 400:
+                self.failures = 0
+
+    def saved_cookies(self) -> list[dict]:
+        """Unexpired cookies, e.g. the solved Cloudflare challenge, in a JSON-friendly form."""
+        now = time.time()
+        return [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+             "expires": c.expires, "secure": c.secure}
+            for c in self._scraper.cookies if c.expires is None or c.expires > now
+        ]
+
+    def close(self):
+        self._scraper.close()
+
+
+class SessionPool:
+    """Long-lived scraper sessions shared by every extractor instance and worker of a run.
+
+    `new_session` on an extractor hands out the pool's sessions round robin
+    instead of building a cloudscraper per model, so TLS connections stay open
+    across models and a solved challenge is reused rather than solved again.
+    Session cookies (including Cloudflare clearance) are saved to `cookie_path`
+    on close and loaded by the next run. Sessions answered with 403 / 429
+    `max_failures` times in a row are recycled.
+    """
+
+    def __init__(self, size: int = 4, connections_per_host: int = 10, max_failures: int = 3,
+                 cookie_path: str = ".scraper-cookies.json"):
+        self.size = size
+        self.connections_per_host = connections_per_host
+        self.max_failures = max_failures
+        self.cookie_path = cookie_path
+        self.recycled = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        saved = self._load_cookies()
+        self.sessions = [PooledSession(self, slot, saved[slot] if slot < len(saved) else None)
+                         for slot in range(size)]
+
+    def session(self) -> PooledSession:
+        with self._lock:
+            session = self.sessions[self._next % self.size]
+            self._next += 1
+        return session
+
+    def _load_cookies(self) -> list[list[dict]]:
+        if not self.cookie_path or not os.path.exists(self.cookie_path):
+            return []
+        try:
+            with open(self.cookie_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("sessions", [])
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable cookie file %s: %s", self.cookie_path, e)
+            return []
+
+    def save_cookies(self):
+        """Write every session's cookies atomically, so a crash never leaves a half-written file."""
+        if not self.cookie_path:
+            return
+        tmp = f"{self.cookie_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": time.time(), "sessions": [s.saved_cookies() for s in self.sessions]}, f)
+        os.replace(tmp, self.cookie_path)
+
+    def report(self) -> str:
+        requests = sum(s.requests for s in self.sessions)
+        return (f"Sessions: {self.size}, requests: {requests}, "
+                f"recycled after {self.max_failures} blocked / throttled answers: {self.recycled}")
+
+    def close(self):
+        self.save_cookies()
+        for session in self.sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
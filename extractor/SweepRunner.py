@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from extractor.CrawlJournal import CrawlJournal, CrawlUnit
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class SweepJob:
+    vehicle_type: str
+    make: str
+    model: str
+    status: str = "pending"
+    attempts: int = 0
+    records: int = 0
+    elapsed: float = 0.0
+    error: str = None
+    max_pages: int = None  # search pages the job may read; None for no cap
+
+
+class SweepRunner:
+    """Run the (type, make, model) crawl plan across a pool of worker threads.
+
+    Threads rather than processes: the work is network-bound and every worker must
+    draw from the same per-host rate limiter, which is the global request budget
+    of a source. Each worker thread gets its own extractor instance because
+    extractors keep per-run state (seen_urls).
+
+    With a journal (the one the extractors write their page cursors to), jobs
+    finished by an interrupted earlier run are skipped, unfinished ones resume
+    mid-way, and the journal is cleared once every job of the sweep is done.
+    """
+
+    def __init__(self, extractor_factory, workers: int = 4, max_retries: int = 2, retry_delay: float = 30,
+                 journal: CrawlJournal = None):
+        self.extractor_factory = extractor_factory
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.journal = journal
+        self._local = threading.local()
+
+    @staticmethod
+    def plan(vehicles: dict) -> list[SweepJob]:
+        """Flatten vehicles[type][make] -> [models] into a list of jobs."""
+        return [
+            SweepJob(vehicle_type=vehicle_type, make=make, model=model)
+            for vehicle_type, makes in vehicles.items()
+            for make, models in makes.items()
+            for model in models
+        ]
+
+    def _extractor(self):
+        if not hasattr(self._local, "extractor"):
+            self._local.extractor = self.extractor_factory()
+        return self._local.extractor
+
+    def _run_job(self, job: SweepJob):
+        extractor = self._extractor()
+        if self.journal is not None and self.journal.is_done(
+                CrawlUnit(extractor.source, job.vehicle_type, job.make, job.model)):
+            log.info("Skipping %s/%s/%s, finished earlier in this sweep", job.vehicle_type, job.make, job.model)
+            job.status = "skipped"
+            return
+        start = time.perf_counter()
+        while job.attempts <= self.max_retries:
+            job.attempts += 1
+            log.info("Scraping %s/%s/%s (attempt %d)...", job.vehicle_type, job.make, job.model, job.attempts)
+            try:
+                cars = extractor.extract_data(
+                    vehicle_type=job.vehicle_type,
+                    make=job.make,
+                    model=job.model,
+                    max_pages=job.max_pages
+                )
+                job.records = len(cars)
+                job.status = "done"
+                job.error = None
+                break
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                log.exception("Job %s/%s/%s failed: %s", job.vehicle_type, job.make, job.model, e)
+                if job.attempts <= self.max_retries:
+                    time.sleep(self.retry_delay * job.attempts)
+        job.elapsed = time.perf_counter() - start
+
+    def _run_chain(self, jobs: list[SweepJob]):
+        # Jobs sharing a model write the same "{model}-<source>.csv", so they run back to back
+        for job in jobs:
+            self._run_job(job)
+
+    def run(self, vehicles: dict) -> list[SweepJob]:
+        return self.run_jobs(self.plan(vehicles))
+
+    def run_jobs(self, jobs: list[SweepJob]) -> list[SweepJob]:
+        chains = {}
+        for job in jobs:
+            chains.setdefault(job.model, []).append(job)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            # list() re-raises anything that escaped a chain
+            list(pool.map(self._run_chain, chains.values()))
+
+        if self.journal is not None and all(job.status in ("done", "skipped") for job in jobs):
+            self.journal.finish_sweep()
+        self.print_summary(jobs)
+        return jobs
+
+    @staticmethod
+    def print_summary(jobs: list[SweepJob]):
+        header = f"{'type':<6} {'make':<11} {'model':<13} {'status':<7} {'tries':>5} {'records':>8} {'secs':>8}"
+        print("\n--- Sweep summary ---")
+        print(header)
+        print("-" * len(header))
+        for job in jobs:
+            print(f"{job.vehicle_type:<6} {job.make:<11} {job.model:<13} {job.status:<7} "
+                  f"{job.attempts:>5} {job.records:>8} {job.elapsed:>8.1f}")
+        failed = [job for job in jobs if job.status not in ("done", "skipped")]
+        skipped = sum(job.status == "skipped" for job in jobs)
+        print("-" * len(header))
+        print(f"Jobs: {len(jobs)}, done: {len(jobs) - len(failed) - skipped}, skipped: {skipped}, failed: {len(failed)}, "
+              f"records: {sum(job.records for job in jobs)}")
+        for job in failed:
+            print(f"  {job.vehicle_type}/{job.make}/{job.model}: {job.error}")
@@ -0,0 +1,113 @@
+import csv
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class UrlIndex:
+    """Persistent seen-URL store shared by every extractor, thread and process.
+
+    URLs live in an indexed SQLite table, so membership is a primary-key lookup
+    and nothing from past runs is loaded into memory. Existing CSV exports can be
+    bulk-imported once; afterwards extractors record each car as it is saved.
+    """
+
+    def __init__(self, path: str = ".url-index.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_urls (
+                url TEXT PRIMARY KEY,
+                source TEXT,
+                first_seen REAL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS imported_files (
+                path TEXT PRIMARY KEY,
+                rows INTEGER,
+                imported_at REAL
+            )
+        """)
+        self._conn.commit()
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM seen_urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen_urls").fetchone()[0]
+
+    def add(self, url: str, source: str = None) -> bool:
+        """Record `url`; returns False if it was already known."""
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO seen_urls VALUES (?, ?, ?)", (url, source, time.time())
+            )
+            self._conn.commit()
+            return cur.rowcount == 1
+
+    def add_many(self, urls, source: str = None) -> int:
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_urls VALUES (?, ?, ?)",
+                ((url, source, now) for url in urls if url)
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def import_csv(self, filename: str, source: str = None, force: bool = False) -> int:
+        """Bulk-load the URLs of an exported CSV, streaming its rows.
+
+        Each file is imported once; later rows are recorded by the extractors as
+        they write them. Returns the number of newly indexed URLs.
+        """
+        if not os.path.exists(filename):
+            return 0
+        key = os.path.abspath(filename)
+        with self._lock:
+            done = self._conn.execute("SELECT 1 FROM imported_files WHERE path = ?", (key,)).fetchone()
+        if done and not force:
+            return 0
+
+        with open(filename, "r", encoding="utf-8") as f:
+            added = self.add_many((row.get("url") for row in csv.DictReader(f)), source=source)
+
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO imported_files VALUES (?, ?, ?)", (key, added, time.time()))
+            self._conn.commit()
+        log.info("Indexed %d URLs from %s", added, filename)
+        return added
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    import glob
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m extractor.UrlIndex <csv_file_or_directory> [index_path]")
+        sys.exit(1)
+
+    path = sys.argv[1]
+    index = UrlIndex(sys.argv[2] if len(sys.argv) > 2 else ".url-index.sqlite")
+    csv_files = glob.glob(os.path.join(path, "*.csv")) if os.path.isdir(path) else [path]
+    for csv_file in csv_files:
+        # "{model}-{source}.csv"
+        source = os.path.splitext(os.path.basename(csv_file))[0].rsplit("-", 1)[-1]
+        index.import_csv(csv_file, source=source, force=True)
+    print(f"Index holds {len(index)} URLs")
+    index.close()